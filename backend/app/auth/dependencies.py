@@ -1,10 +1,175 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
-from ..auth.jwt_handler import SECRET_KEY, ALGORITHM
+from ..auth.jwt_handler import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_MINUTOS
 
 bearer_scheme = HTTPBearer()
 
+# Máximo de tokens verificados que se mantienen en memoria
+JWT_CACHE_MAX = int(os.getenv("JWT_CACHE_MAX", "10000"))
+# Backend compartido opcional (requiere el paquete redis), el mismo de la caché de catálogos.
+# Sin él las revocaciones viven en el proceso: con varios workers de uvicorn un logout o un cambio
+# de clave solo valdría en el worker que lo atendió
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+# Pasado este tiempo ya vencieron todos los tokens de acceso emitidos antes de una revocación
+VIDA_REVOCACION = ACCESS_TOKEN_MINUTOS * 60
+
+
+# Revocaciones guardadas en el propio proceso (un solo worker)
+class RevocacionesLocales:
+    def __init__(self):
+        # id_usuario -> instante (epoch) desde el que sus tokens anteriores no son válidos
+        self._usuarios = {}
+        # id_sesion -> instante en que vence el último token de acceso que pudo emitir la sesión
+        self._sesiones = {}
+        self._lock = threading.Lock()
+
+    # Dos búsquedas en diccionarios: se consulta en cada request, también con el token en caché
+    def revocado(self, payload: dict) -> bool:
+        if payload.get("sid") in self._sesiones:
+            return True
+        desde = self._usuarios.get(payload.get("id_usuario"))
+        return desde is not None and payload.get("iat", 0) < desde
+
+    def revocar_usuario(self, id_usuario: int, desde: float):
+        self._usuarios[id_usuario] = desde
+
+    # La entrada sobra cuando ya vencieron todos los tokens de acceso de la sesión
+    def revocar_sesion(self, id_sesion: int, hasta: float):
+        with self._lock:
+            ahora = time.time()
+            for sesion, vence in list(self._sesiones.items()):
+                if vence <= ahora:
+                    del self._sesiones[sesion]
+            self._sesiones[id_sesion] = hasta
+
+    def limpiar(self):
+        self._usuarios.clear()
+        self._sesiones.clear()
+
+
+# Revocaciones en Redis, compartidas entre workers y réplicas: un MGET por request.
+# Las claves vencen solas cuando ya no queda ningún token de acceso que revocar
+class RevocacionesRedis:
+    PREFIJO = "refugio:revocado:"
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_REDIS_URL requiere el paquete redis (pip install redis)")
+        self._redis = redis.Redis.from_url(url)
+
+    def revocado(self, payload: dict) -> bool:
+        sesion, desde = self._redis.mget(
+            f"{self.PREFIJO}sesion:{payload.get('sid')}", f"{self.PREFIJO}usuario:{payload.get('id_usuario')}"
+        )
+        if sesion is not None:
+            return True
+        return desde is not None and payload.get("iat", 0) < float(desde)
+
+    def revocar_usuario(self, id_usuario: int, desde: float):
+        self._redis.set(f"{self.PREFIJO}usuario:{id_usuario}", desde, ex=VIDA_REVOCACION)
+
+    def revocar_sesion(self, id_sesion: int, hasta: float):
+        self._redis.set(f"{self.PREFIJO}sesion:{id_sesion}", hasta, ex=max(int(hasta - time.time()), 1))
+
+    def limpiar(self):
+        for clave in self._redis.scan_iter(f"{self.PREFIJO}*"):
+            self._redis.delete(clave)
+
+
+# Caché LRU de claims ya verificados, indexada por el digest del token.
+# Cada entrada vence en el 'exp' del propio token; la revocación se consulta aparte en cada request
+class CacheTokens:
+    def __init__(self, max_entradas: int, revocaciones):
+        self.max_entradas = max_entradas
+        self.revocaciones = revocaciones
+        self._entradas = OrderedDict()  # digest -> (exp, payload)
+        self._por_usuario = {}  # id_usuario -> set(digest)
+        self._lock = threading.Lock()
+
+    def obtener(self, digest: str):
+        with self._lock:
+            entrada = self._entradas.get(digest)
+            if entrada is None:
+                return None
+            exp, payload = entrada
+            if exp <= time.time():
+                self._quitar(digest)
+                return None
+            self._entradas.move_to_end(digest)
+            return payload
+
+    def guardar(self, digest: str, payload: dict):
+        with self._lock:
+            self._entradas[digest] = (payload.get("exp", 0), payload)
+            self._entradas.move_to_end(digest)
+            self._por_usuario.setdefault(payload.get("id_usuario"), set()).add(digest)
+            while len(self._entradas) > self.max_entradas:
+                self._quitar(next(iter(self._entradas)))
+
+    def _quitar(self, digest: str):
+        exp, payload = self._entradas.pop(digest)
+        digests = self._por_usuario.get(payload.get("id_usuario"))
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._por_usuario[payload.get("id_usuario")]
+
+    def revocado(self, payload: dict) -> bool:
+        return self.revocaciones.revocado(payload)
+
+    def revocar_usuario(self, id_usuario: int):
+        with self._lock:
+            for digest in list(self._por_usuario.get(id_usuario, ())):
+                self._quitar(digest)
+        self.revocaciones.revocar_usuario(id_usuario, time.time())
+
+    def revocar_sesion(self, id_sesion: int, hasta: float):
+        self.revocaciones.revocar_sesion(id_sesion, hasta)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_usuario.clear()
+        self.revocaciones.limpiar()
+
+
+cache_tokens = CacheTokens(
+    JWT_CACHE_MAX,
+    RevocacionesRedis(CACHE_REDIS_URL) if CACHE_REDIS_URL else RevocacionesLocales()
+)
+
+
+# Hook de revocación: invalida los tokens emitidos antes de este momento para el usuario
+# (llamar al eliminar un usuario o cambiar sus roles)
+def revocar_tokens_usuario(id_usuario: int):
+    cache_tokens.revocar_usuario(id_usuario)
+
+
+# Invalida los tokens de acceso de una sesión cerrada o comprometida
+def revocar_tokens_sesion(id_sesion: int):
+    cache_tokens.revocar_sesion(id_sesion, time.time() + VIDA_REVOCACION)
+
+
+def verificar_token(token: str) -> dict:
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    payload = cache_tokens.obtener(digest)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        cache_tokens.guardar(digest, payload)
+    if cache_tokens.revocado(payload):
+        raise JWTError("Token revocado")
+    return payload
+
+
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -12,13 +177,16 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return verificar_token(credentials.credentials)
     except JWTError:
         raise credentials_exception
 
 def require_roles(roles_permitidos: list):
+    return _verificador_roles(frozenset(roles_permitidos))
+
+# Un único verificador por conjunto de roles: FastAPI lo resuelve una sola vez por request
+@lru_cache(maxsize=None)
+def _verificador_roles(roles_permitidos: frozenset):
     def role_checker(user=Depends(get_current_user)):
         user_roles = user.get("roles", [])
         if not any(role in roles_permitidos for role in user_roles):
@@ -0,0 +1,140 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# Configuración (variables de entorno)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Procesos dedicados a bcrypt; con 0 no se crea el pool y el hash corre en un hilo (útil en desarrollo)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+# Máximo de operaciones en cola + en ejecución antes de rechazar con 503
+HASH_MAX_PENDIENTES = int(os.getenv("HASH_MAX_PENDIENTES", str(max(HASH_WORKERS, 1) * 8)))
+# Si es verdadero, al iniciar sesión se re-hashea la clave cuando el costo configurado cambió
+HASH_REHASH_AL_LOGIN = os.getenv("HASH_REHASH_AL_LOGIN", "false").lower() in ("1", "true", "si", "yes")
+
+
+@lru_cache(maxsize=None)
+def _contexto(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+# Funciones que se ejecutan dentro de los procesos del pool; devuelven también el
+# instante en que comenzaron para medir el tiempo de espera en cola
+def _hashear(clave: str, rounds: int):
+    return time.time(), _contexto(rounds).hash(clave)
+
+
+def _verificar(clave: str, hash_guardado: str, rounds: int, rehash: bool):
+    inicio = time.time()
+    contexto = _contexto(rounds)
+    if rehash:
+        return inicio, contexto.verify_and_update(clave, hash_guardado)
+    return inicio, (contexto.verify(clave, hash_guardado), None)
+
+
+class ServicioHash:
+    def __init__(self, rounds: int, workers: int, max_pendientes: int, rehash_al_login: bool):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pendientes = max_pendientes
+        self.rehash_al_login = rehash_al_login
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Métricas
+        self.pendientes = 0
+        self.operaciones = 0
+        self.rechazadas = 0
+        self.tiempo_cola_total = 0.0
+        self.tiempo_cola_max = 0.0
+        # Callback opcional que recibe cada tiempo de espera en cola (p. ej. un histograma)
+        self.observador_espera = None
+
+    def _obtener_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn evita heredar hilos y conexiones abiertas del proceso del servidor
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _admitir(self):
+        with self._lock:
+            if self.pendientes >= self.max_pendientes:
+                self.rechazadas += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Servicio de autenticación saturado, intenta nuevamente",
+                    headers={"Retry-After": "1"}
+                )
+            self.pendientes += 1
+
+    def _registrar(self, enviado: float, inicio: float):
+        espera = max(inicio - enviado, 0.0)
+        with self._lock:
+            self.pendientes -= 1
+            self.operaciones += 1
+            self.tiempo_cola_total += espera
+            self.tiempo_cola_max = max(self.tiempo_cola_max, espera)
+        if self.observador_espera is not None:
+            self.observador_espera(espera)
+
+    def _liberar(self):
+        with self._lock:
+            self.pendientes -= 1
+
+    async def _ejecutar_async(self, funcion, *args):
+        self._admitir()
+        enviado = time.time()
+        try:
+            if self.workers <= 0:
+                # Sin pool: se ejecuta en un hilo para no bloquear el event loop
+                inicio, resultado = await asyncio.to_thread(funcion, *args)
+            else:
+                inicio, resultado = await asyncio.wrap_future(self._obtener_pool().submit(funcion, *args))
+        except BaseException:
+            self._liberar()
+            raise
+        self._registrar(enviado, inicio)
+        return resultado
+
+    async def hashear_async(self, clave: str) -> str:
+        return await self._ejecutar_async(_hashear, clave, self.rounds)
+
+    # Devuelve (valida, nuevo_hash); nuevo_hash solo se calcula si rehash_al_login está activo
+    async def verificar_async(self, clave: str, hash_guardado: str, rehash: bool = False) -> tuple[bool, Optional[str]]:
+        return await self._ejecutar_async(_verificar, clave, hash_guardado, self.rounds, rehash and self.rehash_al_login)
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pendientes": self.max_pendientes,
+                "pendientes": self.pendientes,
+                "en_cola": max(self.pendientes - max(self.workers, 1), 0),
+                "operaciones": self.operaciones,
+                "rechazadas": self.rechazadas,
+                "tiempo_cola_total_segundos": self.tiempo_cola_total,
+                "tiempo_cola_max_segundos": self.tiempo_cola_max,
+            }
+
+    def cerrar(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+servicio_hash = ServicioHash(
+    rounds=BCRYPT_ROUNDS,
+    workers=HASH_WORKERS,
+    max_pendientes=HASH_MAX_PENDIENTES,
+    rehash_al_login=HASH_REHASH_AL_LOGIN
+)
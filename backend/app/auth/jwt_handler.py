@@ -1,11 +1,31 @@
+import hashlib
+import os
+import secrets
+import time
 from datetime import datetime, timedelta
 from jose import jwt
 
 SECRET_KEY = "TU_SECRETO"  # Cambia esto y usa variables de entorno en producción
 ALGORITHM = "HS256"
 
-def crear_token(data: dict, expires_delta: int = 60):
+# Vida del token de acceso: corta, porque se renueva con el refresh token sin volver a pedir la clave
+ACCESS_TOKEN_MINUTOS = int(os.getenv("ACCESS_TOKEN_MINUTOS", "15"))
+# Vida del refresh token; cada renovación lo rota y vuelve a contar desde cero
+REFRESH_TOKEN_DIAS = int(os.getenv("REFRESH_TOKEN_DIAS", "30"))
+
+def crear_token(data: dict, expires_delta: int = ACCESS_TOKEN_MINUTOS):
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=expires_delta)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
\ No newline at end of file
+    ahora = datetime.utcnow()
+    expire = ahora + timedelta(minutes=expires_delta)
+    # iat permite invalidar los tokens emitidos antes de una revocación. Va con decimales
+    # (un datetime se truncaría al segundo) para no confundir tokens renovados justo después
+    to_encode.update({"exp": expire, "iat": time.time()})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+# Refresh token opaco (no es un JWT): en la base solo se guarda su hash
+def crear_refresh_token() -> tuple[str, str]:
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
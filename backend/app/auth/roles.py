@@ -0,0 +1,113 @@
+import os
+import time
+from itertools import groupby
+from typing import NamedTuple, Optional
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
+
+# Segundos que se reutiliza la tabla de roles antes de volver a leerla (cambia muy rara vez)
+ROLES_CACHE_TTL = float(os.getenv("ROLES_CACHE_TTL", "300"))
+
+# Cada módulo es un bit de la máscara de un rol, en este orden
+MODULOS = ("modulo_principal", "modulo_adopciones", "modulo_mascotas", "modulo_cuentas")
+# Diccionario de módulos ya armado para cada máscara posible (2^4 combinaciones)
+_MODULOS_POR_MASCARA = tuple(
+    {modulo: bool(mascara & (1 << i)) for i, modulo in enumerate(MODULOS)}
+    for mascara in range(1 << len(MODULOS))
+)
+
+
+def mascara_rol(rol: models.Rol) -> int:
+    return sum(1 << i for i, modulo in enumerate(MODULOS) if getattr(rol, modulo))
+
+
+def modulos_de_mascara(mascara: int) -> dict:
+    return dict(_MODULOS_POR_MASCARA[mascara])
+
+
+class UsuarioConRoles(NamedTuple):
+    usuario: models.Usuario
+    roles: list
+    modulos: dict
+
+
+# Roles activos en memoria: id_rol -> (descripcion, máscara de módulos)
+class CatalogoRoles:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._roles: Optional[dict] = None
+        self._vence = 0.0
+
+    async def obtener(self, db: AsyncSession) -> dict:
+        if self._roles is None or self._vence <= time.monotonic():
+            roles = (await db.scalars(select(models.Rol).where(models.Rol.estado == True))).all()
+            self._roles = {rol.id_rol: (rol.descripcion, mascara_rol(rol)) for rol in roles}
+            self._vence = time.monotonic() + self.ttl
+        return self._roles
+
+    def invalidar(self):
+        self._roles = None
+
+    async def id_por_descripcion(self, db: AsyncSession, descripcion: str) -> Optional[int]:
+        for id_rol, (nombre, _) in (await self.obtener(db)).items():
+            if nombre == descripcion:
+                return id_rol
+        return None
+
+    # Descripciones y módulos combinados (OR de máscaras) de un conjunto de roles asignados.
+    # Los roles inactivos no están en el catálogo y se ignoran
+    def resolver(self, roles: dict, ids_roles) -> tuple[list, dict]:
+        nombres = []
+        mascara = 0
+        for id_rol in ids_roles:
+            rol = roles.get(id_rol)
+            if rol is not None:
+                nombres.append(rol[0])
+                mascara |= rol[1]
+        return nombres, modulos_de_mascara(mascara)
+
+
+catalogo_roles = CatalogoRoles(ROLES_CACHE_TTL)
+
+
+# Usuarios con sus roles en una sola consulta: usuarios LEFT JOIN usuario_rol (asignaciones activas),
+# ordenada por usuario para agrupar las filas. Descripciones y módulos salen del catálogo en memoria
+async def cargar_usuarios_con_roles(db: AsyncSession, *condiciones) -> list:
+    filas = (await db.execute(
+        select(models.Usuario, models.UsuarioRol.id_rol)
+        .outerjoin(models.UsuarioRol, and_(
+            models.UsuarioRol.id_usuario == models.Usuario.id_usuario,
+            models.UsuarioRol.estado == True
+        ))
+        .where(*condiciones)
+        .order_by(models.Usuario.id_usuario, models.UsuarioRol.id_ur)
+    )).all()
+    roles = await catalogo_roles.obtener(db)
+    resultado = []
+    for usuario, grupo in groupby(filas, key=lambda fila: fila[0]):
+        nombres, modulos = catalogo_roles.resolver(roles, [id_rol for _, id_rol in grupo if id_rol is not None])
+        resultado.append(UsuarioConRoles(usuario, nombres, modulos))
+    return resultado
+
+
+# Para condiciones que identifican a un único usuario (id o alias)
+async def cargar_usuario_con_roles(db: AsyncSession, *condiciones) -> Optional[UsuarioConRoles]:
+    resultado = await cargar_usuarios_con_roles(db, *condiciones)
+    return resultado[0] if resultado else None
+
+
+# Roles de usuarios ya cargados (p. ej. una página del directorio): una consulta a usuario_rol
+async def roles_de_usuarios(db: AsyncSession, ids_usuarios: list) -> dict:
+    if not ids_usuarios:
+        return {}
+    filas = (await db.execute(
+        select(models.UsuarioRol.id_usuario, models.UsuarioRol.id_rol)
+        .where(models.UsuarioRol.id_usuario.in_(ids_usuarios), models.UsuarioRol.estado == True)
+        .order_by(models.UsuarioRol.id_usuario, models.UsuarioRol.id_ur)
+    )).all()
+    roles = await catalogo_roles.obtener(db)
+    return {
+        id_usuario: catalogo_roles.resolver(roles, [id_rol for _, id_rol in grupo])
+        for id_usuario, grupo in groupby(filas, key=lambda fila: fila[0])
+    }
@@ -1,136 +1,189 @@
+import os
+import re
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models, schemas
 from ..database import get_db
-from ..auth.jwt_handler import crear_token
-from ..auth.dependencies import get_current_user, require_roles
+from ..auth.jwt_handler import ACCESS_TOKEN_MINUTOS, crear_token, hash_refresh_token
+from ..auth.dependencies import get_current_user, require_roles, revocar_tokens_usuario
+from ..auth.hashing import servicio_hash
+from ..auth.roles import catalogo_roles, cargar_usuario_con_roles
+from ..auth.sesiones import abrir_sesion, cerrar_sesiones, rotar_sesion
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# Ruta para registrar un nuevo usuario
+# Rol asignado a las cuentas nuevas; su id sale del catálogo de roles en memoria
+ROL_POR_DEFECTO = os.getenv("ROL_POR_DEFECTO", "Usuario")
+
+
+async def id_rol_por_defecto(db: AsyncSession) -> int:
+    id_rol = await catalogo_roles.id_por_descripcion(db, ROL_POR_DEFECTO)
+    if id_rol is None:
+        raise HTTPException(status_code=500, detail=f"No existe el rol por defecto '{ROL_POR_DEFECTO}'")
+    return id_rol
+
+
+# Columna única que violó el INSERT: "(alias)=" en el detalle de Postgres, "usuarios.alias" en SQLite
+_COLUMNA_DUPLICADA = re.compile(r"(?:\(|\.)(alias|correo|dni)(?:\)=|\b)")
+MENSAJES_DUPLICADO = {
+    "alias": "El alias o correo ya existe",
+    "correo": "El alias o correo ya existe",
+    "dni": "El DNI ya existe",
+}
+
+
+# Ruta para registrar un nuevo usuario. Usuario, persona y rol se insertan en una sola
+# transacción; los duplicados los detectan las restricciones únicas de la base
 @router.post("/registro", summary="Registrar un nuevo usuario")
-def registrar_usuario(usuario: schemas.UsuarioCreate, db: Session = Depends(get_db)):
-    # Verifica si el alias o correo ya existen
-    db_usuario = db.query(models.Usuario).filter(
-        (models.Usuario.alias == usuario.alias) | (models.Usuario.correo == usuario.correo),
-        models.Usuario.estado == True
-    ).first()
-    if db_usuario:
-        raise HTTPException(status_code=400, detail="El alias o correo ya existe")
-
-    db_dni = db.query(models.Persona).filter(
-        models.Persona.dni == usuario.persona.dni,
-        models.Persona.estado == True
-    ).first()
-    if db_dni:
-        raise HTTPException(status_code=400, detail="El DNI ya existe")
-    
-    # 1. Crea el usuario primero
-    hashed_password = pwd_context.hash(usuario.clave)
+async def registrar_usuario(usuario: schemas.UsuarioCreate, db: AsyncSession = Depends(get_db)):
+    hashed_password = await servicio_hash.hashear_async(usuario.clave)
     nuevo_usuario = models.Usuario(
         alias=usuario.alias,
         clave=hashed_password,
         correo=usuario.correo,
         pregunta_seguridad=usuario.pregunta_seguridad,
         respuesta_seguridad=usuario.respuesta_seguridad,
+        # La persona no lleva correo: vive en el usuario
+        persona=models.Persona(
+            nombre=usuario.persona.nombre,
+            apellido=usuario.persona.apellido,
+            dni=usuario.persona.dni,
+            telefono=usuario.persona.telefono,
+            direccion=usuario.persona.direccion,
+            estado=True
+        ),
+        roles=[models.UsuarioRol(id_rol=await id_rol_por_defecto(db))]
     )
     db.add(nuevo_usuario)
-    db.commit()
-    db.refresh(nuevo_usuario)
-
-    # 2. Crea la persona asociada a ese usuario (sin correo)
-    persona = models.Persona(
-        id_usuario=nuevo_usuario.id_usuario,
-        nombre=usuario.persona.nombre,
-        apellido=usuario.persona.apellido,
-        dni=usuario.persona.dni,
-        telefono=usuario.persona.telefono,
-        direccion=usuario.persona.direccion,
-        estado=True
-    )
-    db.add(persona)
-    db.commit()
-    db.refresh(persona)
-
-    # Asigna un rol por defecto (por ejemplo, id_rol=1)
-    usuario_rol = models.UsuarioRol(id_usuario=nuevo_usuario.id_usuario, id_rol=3)
-    db.add(usuario_rol)
-    db.commit()
+    try:
+        # El flush del commit inserta las tres filas en orden; si una falla no queda ninguna
+        await db.commit()
+    except IntegrityError as error:
+        await db.rollback()
+        columna = _COLUMNA_DUPLICADA.search(str(error.orig))
+        if columna is None:
+            raise
+        raise HTTPException(status_code=400, detail=MENSAJES_DUPLICADO[columna.group(1)])
     return {"mensaje": "Usuario registrado exitosamente"}
 
-# Inicia sesión y genera un token JWT
-@router.post("/login", summary="Iniciar sesión")
-def login(datos: schemas.UsuarioLogin, db: Session = Depends(get_db)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.alias == datos.alias).first()
-    if not usuario or not pwd_context.verify(datos.clave, usuario.clave):
-        raise HTTPException(status_code=401, detail="Credenciales incorrectas")
-    # Obtiene los roles y módulos del usuario
-    roles = []
-    modulos = {
-        "modulo_principal": False,
-        "modulo_adopciones": False,
-        "modulo_mascotas": False,
-        "modulo_cuentas": False
-    }
-    for ur in usuario.roles:
-        if ur.rol.estado:
-            roles.append(ur.rol.descripcion)
-            for modulo in modulos.keys():
-                if getattr(ur.rol, modulo):
-                    modulos[modulo] = True
+# Token de acceso (corto, con roles y módulos vigentes) y refresh token de la sesión
+def emitir_tokens(encontrado, id_sesion: int, refresh_token: str) -> dict:
+    usuario, roles, modulos = encontrado
     token_data = {
         "sub": usuario.alias,
         "id_usuario": usuario.id_usuario,
+        "sid": id_sesion,
         "roles": roles,
         "modulos": modulos
     }
-    token = crear_token(token_data)
-    return {"access_token": token, "token_type": "bearer", "roles": roles, "modulos": modulos}
+    return {
+        "access_token": crear_token(token_data),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_MINUTOS * 60,
+        "refresh_token": refresh_token,
+        "roles": roles,
+        "modulos": modulos
+    }
+
+# Inicia sesión: abre una sesión de refresco y genera un token JWT
+@router.post("/login", summary="Iniciar sesión")
+async def login(datos: schemas.UsuarioLogin, db: AsyncSession = Depends(get_db)):
+    # Usuario, roles y módulos en una consulta
+    # Solo usuarios activos: una cuenta dada de baja no puede abrir sesiones nuevas
+    encontrado = await cargar_usuario_con_roles(db, models.Usuario.alias == datos.alias, models.Usuario.estado == True)
+    if not encontrado:
+        raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+    usuario = encontrado.usuario
+    valida, nuevo_hash = await servicio_hash.verificar_async(datos.clave, usuario.clave, rehash=True)
+    if not valida:
+        raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+    # Re-hashea la clave si el costo configurado cambió (HASH_REHASH_AL_LOGIN)
+    if nuevo_hash:
+        usuario.clave = nuevo_hash
+    id_sesion, refresh_token = await abrir_sesion(db, usuario.id_usuario)
+    await db.commit()
+    return emitir_tokens(encontrado, id_sesion, refresh_token)
+
+# Renueva el token de acceso sin pedir la clave (sin bcrypt). Rota el refresh token y vuelve a leer
+# los roles, así un cambio de roles llega al cliente en la siguiente renovación
+@router.post("/refresh", summary="Renovar el token de acceso")
+async def renovar_token(datos: schemas.RefreshToken, db: AsyncSession = Depends(get_db)):
+    id_sesion, id_usuario, refresh_token = await rotar_sesion(db, datos.refresh_token)
+    encontrado = await cargar_usuario_con_roles(db, models.Usuario.id_usuario == id_usuario, models.Usuario.estado == True)
+    if not encontrado:
+        await cerrar_sesiones(db, models.Sesion.id_sesion == id_sesion)
+        await db.commit()
+        raise HTTPException(status_code=401, detail="Refresh token inválido o vencido")
+    await db.commit()
+    return emitir_tokens(encontrado, id_sesion, refresh_token)
+
+# Cierra la sesión del refresh token; sus tokens de acceso dejan de valer de inmediato
+@router.post("/logout", summary="Cerrar sesión")
+async def logout(datos: schemas.RefreshToken, db: AsyncSession = Depends(get_db)):
+    await cerrar_sesiones(db, models.Sesion.hash_token == hash_refresh_token(datos.refresh_token))
+    await db.commit()
+    return {"mensaje": "Sesión cerrada"}
+
+# Cierra todas las sesiones del usuario actual (todos los dispositivos)
+@router.post("/logout-todas", summary="Cerrar todas las sesiones")
+async def logout_todas(db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    await cerrar_sesiones(db, models.Sesion.id_usuario == user["id_usuario"])
+    await db.commit()
+    revocar_tokens_usuario(user["id_usuario"])
+    return {"mensaje": "Sesiones cerradas"}
 
 # Cambia la contraseña de un usuario (solo propietario o administrador)
 @router.put("/cambiar-clave", summary="Cambiar contraseña")
-def cambiar_clave(
+async def cambiar_clave(
     datos: schemas.CambiarClave,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user)
 ):
     es_admin = "Administrador" in user.get("roles", [])
     es_propietario = user.get("id_usuario") == datos.id_usuario
     if not (es_admin or es_propietario):
         raise HTTPException(status_code=403, detail="No tienes permisos para cambiar la contraseña de este usuario")
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == datos.id_usuario).first()
-    if not usuario or (not es_admin and not pwd_context.verify(datos.clave_actual, usuario.clave)):
+    usuario = await db.scalar(select(models.Usuario).where(models.Usuario.id_usuario == datos.id_usuario))
+    if not usuario or (not es_admin and not (await servicio_hash.verificar_async(datos.clave_actual, usuario.clave))[0]):
         raise HTTPException(status_code=401, detail="Clave actual incorrecta")
-    usuario.clave = pwd_context.hash(datos.nueva_clave)
-    db.commit()
+    usuario.clave = await servicio_hash.hashear_async(datos.nueva_clave)
+    # Cierra las demás sesiones (un refresh token robado deja de servir) en la misma transacción;
+    # el propietario conserva la sesión desde la que cambió la clave
+    condiciones = [models.Sesion.id_usuario == usuario.id_usuario]
+    if es_propietario and user.get("sid") is not None:
+        condiciones.append(models.Sesion.id_sesion != user["sid"])
+    await cerrar_sesiones(db, *condiciones)
+    await db.commit()
+    # Los tokens de acceso vigentes también caen; la sesión conservada se renueva con /refresh
+    revocar_tokens_usuario(usuario.id_usuario)
     return {"mensaje": "Contraseña cambiada correctamente"}
 
 # Cambia las preguntas de seguridad de un usuario (solo propietario o administrador)
 @router.put("/cambiar-preguntas", summary="Cambiar preguntas de seguridad")
-def cambiar_preguntas(
+async def cambiar_preguntas(
     datos: schemas.CambiarPreguntas,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user)
 ):
     es_admin = "Administrador" in user.get("roles", [])
     es_propietario = user.get("id_usuario") == datos.id_usuario
     if not (es_admin or es_propietario):
         raise HTTPException(status_code=403, detail="No tienes permisos para cambiar las preguntas de este usuario")
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == datos.id_usuario).first()
-    if not usuario or (not es_admin and not pwd_context.verify(datos.clave_actual, usuario.clave)):
+    usuario = await db.scalar(select(models.Usuario).where(models.Usuario.id_usuario == datos.id_usuario))
+    if not usuario or (not es_admin and not (await servicio_hash.verificar_async(datos.clave_actual, usuario.clave))[0]):
         raise HTTPException(status_code=401, detail="Clave actual incorrecta")
     usuario.pregunta_seguridad = datos.pregunta_seguridad
     usuario.respuesta_seguridad = datos.respuesta_seguridad
-    db.commit()
+    await db.commit()
     return {"mensaje": "Preguntas de seguridad actualizadas correctamente"}
 
 # Cambia el alias de un usuario (solo propietario o administrador)
 @router.put("/cambiar-usuario", summary="Cambiar nombre de usuario")
-def cambiar_alias(
+async def cambiar_alias(
     datos: schemas.CambiarAlias,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user)
 ):
     # Permitir solo al propietario o al administrador
@@ -138,25 +191,25 @@ def cambiar_alias(
     es_propietario = user.get("id_usuario") == datos.id_usuario
     if not (es_admin or es_propietario):
         raise HTTPException(status_code=403, detail="No tienes permisos para cambiar este alias")
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == datos.id_usuario).first()
+    usuario = await db.scalar(select(models.Usuario).where(models.Usuario.id_usuario == datos.id_usuario))
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     # Verifica si el alias ya existe en otro usuario activo
-    if db.query(models.Usuario).filter(models.Usuario.alias == datos.nuevo_alias, models.Usuario.id_usuario != datos.id_usuario, models.Usuario.estado == True).first():
+    if await db.scalar(select(models.Usuario).where(models.Usuario.alias == datos.nuevo_alias, models.Usuario.id_usuario != datos.id_usuario, models.Usuario.estado == True)):
         raise HTTPException(status_code=400, detail="El alias ya existe")
     usuario.alias = datos.nuevo_alias
-    db.commit()
+    await db.commit()
     return {"mensaje": "Alias actualizado correctamente"}
 
 # Cambiar correo
 @router.put("/cambiar-correo", summary="Cambiar correo del usuario")
-def cambiar_correo(datos: schemas.CambiarCorreo, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == user["id_usuario"]).first()
+async def cambiar_correo(datos: schemas.CambiarCorreo, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    usuario = await db.scalar(select(models.Usuario).where(models.Usuario.id_usuario == user["id_usuario"]))
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     # Verifica si el correo ya existe en otro usuario activo
-    if db.query(models.Usuario).filter(models.Usuario.correo == datos.nuevo_correo, models.Usuario.id_usuario != usuario.id_usuario, models.Usuario.estado == True).first():
+    if await db.scalar(select(models.Usuario).where(models.Usuario.correo == datos.nuevo_correo, models.Usuario.id_usuario != usuario.id_usuario, models.Usuario.estado == True)):
         raise HTTPException(status_code=400, detail="El correo ya existe")
     usuario.correo = datos.nuevo_correo
-    db.commit()
+    await db.commit()
     return {"mensaje": "Correo actualizado correctamente"}
\ No newline at end of file
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
+from .jwt_handler import REFRESH_TOKEN_DIAS, crear_refresh_token, hash_refresh_token
+from .dependencies import revocar_tokens_sesion
+
+# Sesiones de refresco: el login abre una y cada /security/refresh la rota (nuevo refresh token,
+# el anterior queda solo como hash para detectar su reutilización). Ninguna función hace commit
+
+
+async def abrir_sesion(db: AsyncSession, id_usuario: int) -> tuple[int, str]:
+    token, hash_token = crear_refresh_token()
+    id_sesion = await db.scalar(
+        insert(models.Sesion)
+        .values(id_usuario=id_usuario, hash_token=hash_token, estado=True,
+                expira=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_DIAS))
+        .returning(models.Sesion.id_sesion)
+    )
+    return id_sesion, token
+
+
+# Cierra las sesiones activas que cumplen las condiciones y revoca sus tokens de acceso en memoria
+async def cerrar_sesiones(db: AsyncSession, *condiciones) -> list:
+    ids = (await db.scalars(
+        update(models.Sesion)
+        .where(*condiciones, models.Sesion.estado == True)
+        .values(estado=False)
+        .returning(models.Sesion.id_sesion)
+        .execution_options(synchronize_session=False)
+    )).all()
+    for id_sesion in ids:
+        revocar_tokens_sesion(id_sesion)
+    return ids
+
+
+# Cambia el refresh token de la sesión por uno nuevo en un solo UPDATE: si dos pedidos usan el mismo
+# token, solo uno encuentra la fila. Devuelve (id_sesion, id_usuario, nuevo refresh token)
+async def rotar_sesion(db: AsyncSession, token: str) -> tuple[int, int, str]:
+    hash_actual = hash_refresh_token(token)
+    nuevo, hash_nuevo = crear_refresh_token()
+    ahora = datetime.utcnow()
+    fila = (await db.execute(
+        update(models.Sesion)
+        .where(models.Sesion.hash_token == hash_actual, models.Sesion.estado == True, models.Sesion.expira > ahora)
+        .values(hash_token=hash_nuevo, hash_anterior=hash_actual, ultimo_uso=ahora,
+                expira=ahora + timedelta(days=REFRESH_TOKEN_DIAS))
+        .returning(models.Sesion.id_sesion, models.Sesion.id_usuario)
+        .execution_options(synchronize_session=False)
+    )).first()
+    if fila is None:
+        # Un token ya rotado que vuelve a usarse pudo ser robado: se cierra la sesión entera
+        if await cerrar_sesiones(db, models.Sesion.hash_anterior == hash_actual):
+            await db.commit()
+        raise HTTPException(status_code=401, detail="Refresh token inválido o vencido")
+    return fila.id_sesion, fila.id_usuario, nuevo
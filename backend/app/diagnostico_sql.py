@@ -0,0 +1,148 @@
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from .database import engine, async_engine
+
+logger = logging.getLogger("refugio.sql")
+
+# Configuración (variables de entorno). Pensado para desarrollo y staging: SQL_DIAGNOSTICO=1 lo activa
+SQL_DIAGNOSTICO = os.getenv("SQL_DIAGNOSTICO", "false").lower() in ("1", "true", "si", "yes")
+# Consultas más lentas que este umbral se registran con sus parámetros
+SQL_LENTA_MS = float(os.getenv("SQL_LENTA_MS", "100"))
+# Una misma forma de sentencia repetida esta cantidad de veces en un request se marca como N+1
+SQL_REPETICIONES_N1 = int(os.getenv("SQL_REPETICIONES_N1", "3"))
+# Máximo de sentencias por request (0 = sin límite); con SQL_PRESUPUESTO_ESTRICTO el exceso lanza un error
+SQL_PRESUPUESTO = int(os.getenv("SQL_PRESUPUESTO", "0"))
+SQL_PRESUPUESTO_ESTRICTO = os.getenv("SQL_PRESUPUESTO_ESTRICTO", "false").lower() in ("1", "true", "si", "yes")
+
+
+class PresupuestoConsultasExcedido(AssertionError):
+    pass
+
+
+# Listas de parámetros (IN ($1, $2, ...), VALUES (...), (...)) y literales que varían entre
+# ejecuciones de la misma consulta
+_PARAMETROS = re.compile(r"\(\s*(?:\$\d+|\?|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])(?:\s*,\s*(?:\$\d+|\?|%\(\w+\)s|:\w+))*\s*\)")
+_FILAS = re.compile(r"(?:\(\?\)\s*,\s*)+\(\?\)")
+_NUMEROS = re.compile(r"\b\d+\b")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def forma_sentencia(sentencia: str) -> str:
+    forma = _ESPACIOS.sub(" ", sentencia).strip()
+    forma = _PARAMETROS.sub("(?)", forma)
+    forma = _FILAS.sub("(?)", forma)
+    return _NUMEROS.sub("?", forma)
+
+
+# Sentencias ejecutadas dentro de un request (o de un bloque presupuesto_consultas)
+class RegistroConsultas:
+    def __init__(self, etiqueta: str):
+        self.etiqueta = etiqueta
+        self.sentencias = []  # (forma, duracion)
+
+    @property
+    def cantidad(self) -> int:
+        return len(self.sentencias)
+
+    @property
+    def tiempo(self) -> float:
+        return sum(duracion for _, duracion in self.sentencias)
+
+    def repetidas(self, minimo: int = SQL_REPETICIONES_N1) -> list[tuple[str, int]]:
+        conteo = Counter(forma for forma, _ in self.sentencias)
+        return [(forma, veces) for forma, veces in conteo.most_common() if veces >= minimo]
+
+    def resumen(self) -> str:
+        lineas = [f"{self.etiqueta}: {self.cantidad} sentencias en {self.tiempo * 1000:.1f} ms"]
+        for forma, veces in self.repetidas(2):
+            lineas.append(f"  {veces}x {forma}")
+        return "\n".join(lineas)
+
+
+registro_actual: ContextVar[Optional[RegistroConsultas]] = ContextVar("registro_consultas", default=None)
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_diagnostico", []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    duracion = time.perf_counter() - conn.info["inicio_diagnostico"].pop()
+    registro = registro_actual.get()
+    if registro is not None:
+        registro.sentencias.append((forma_sentencia(statement), duracion))
+    if duracion * 1000 >= SQL_LENTA_MS:
+        logger.warning(
+            "Consulta lenta (%.1f ms) en %s: %s | parámetros: %r",
+            duracion * 1000, registro.etiqueta if registro else "-", statement, parameters
+        )
+
+
+_activo = False
+
+
+def activar():
+    global _activo
+    if _activo:
+        return
+    for motor in (engine, async_engine.sync_engine):
+        event.listen(motor, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(motor, "after_cursor_execute", _despues_de_ejecutar)
+    _activo = True
+
+
+def revisar(registro: RegistroConsultas, presupuesto: Optional[int] = SQL_PRESUPUESTO or None,
+            estricto: bool = SQL_PRESUPUESTO_ESTRICTO):
+    for forma, veces in registro.repetidas():
+        logger.warning("Posible N+1 en %s: %d ejecuciones de %s", registro.etiqueta, veces, forma)
+    if presupuesto is not None and registro.cantidad > presupuesto:
+        mensaje = f"{registro.etiqueta} superó el presupuesto de {presupuesto} sentencias\n{registro.resumen()}"
+        if estricto:
+            raise PresupuestoConsultasExcedido(mensaje)
+        logger.error(mensaje)
+    logger.debug(registro.resumen())
+
+
+# Para pruebas (con httpx.AsyncClient + ASGITransport, que comparte el contexto):
+#   with presupuesto_consultas(3): await client.get("/mascotas/")
+# falla si dentro del bloque se ejecutan más de 3 sentencias
+@contextmanager
+def presupuesto_consultas(maximo: int, etiqueta: str = "bloque"):
+    activar()
+    registro = RegistroConsultas(etiqueta)
+    token = registro_actual.set(registro)
+    try:
+        yield registro
+    finally:
+        registro_actual.reset(token)
+    revisar(registro, presupuesto=maximo, estricto=True)
+
+
+# Middleware ASGI: abre un registro por request y lo revisa al terminar
+class DiagnosticoSQLMiddleware:
+    def __init__(self, app):
+        self.app = app
+        activar()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Si ya hay un registro abierto (presupuesto_consultas en una prueba) se reutiliza
+        if registro_actual.get() is not None:
+            await self.app(scope, receive, send)
+            return
+        registro = RegistroConsultas(f"{scope['method']} {scope['path']}")
+        token = registro_actual.set(registro)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            registro_actual.reset(token)
+        revisar(registro)
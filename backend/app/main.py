@@ -1,13 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 # Importa los routers (debes crearlos en la carpeta routers)
-from .routers import usuarios, mascotas, adopciones, especies, razas, perfil_adopcion, personas
+from .routers import usuarios, mascotas, adopciones, especies, razas, perfil_adopcion, personas, media, entrevistas
 from .auth import security
+from .auth.hashing import servicio_hash
+from .utils.almacen import MEDIA_URL
+from .utils.imagenes import procesador_imagenes
+from .metricas import MetricasMiddleware, exponer_metricas
+from .diagnostico_sql import SQL_DIAGNOSTICO, DiagnosticoSQLMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Libera los procesos dedicados a bcrypt y a las imágenes al apagar el servidor
+    servicio_hash.cerrar()
+    procesador_imagenes.cerrar()
+
 
 app = FastAPI(
     title="Sistema de Refugio de Animales",
     description="API para la gestión de usuarios, roles, mascotas y adopciones.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configuración de CORS
@@ -18,6 +34,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Conteos, latencias y consultas SQL por ruta (expuestos en /metrics)
+app.add_middleware(MetricasMiddleware)
+# Detector de consultas lentas y N+1 (solo desarrollo/staging, SQL_DIAGNOSTICO=1)
+if SQL_DIAGNOSTICO:
+    app.add_middleware(DiagnosticoSQLMiddleware)
 
 # Incluye los routers principales
 app.include_router(security.router, prefix="/security", tags=["Seguridad"])
@@ -25,11 +46,19 @@ app.include_router(usuarios.router, prefix="/usuarios", tags=["Usuarios"])
 app.include_router(personas.router, prefix="/personas", tags=["Personas"])
 app.include_router(mascotas.router, prefix="/mascotas", tags=["Mascotas"])
 app.include_router(adopciones.router, prefix="/adopciones", tags=["Adopciones"])
+app.include_router(entrevistas.router, prefix="/entrevistas", tags=["Entrevistas"])
 app.include_router(especies.router, prefix="/especies", tags=["Especies"])
 app.include_router(razas.router, prefix="/razas", tags=["Razas"])
 app.include_router(perfil_adopcion.router, prefix="/perfil-adopcion", tags=["Perfil Adopción"])
+# Fotos subidas y sus variantes (almacén local)
+app.include_router(media.router, prefix=MEDIA_URL, tags=["Media"], include_in_schema=False)
 
 
 @app.get("/")
 def root():
-    return {"mensaje": "Bienvenido a la API del Refugio de Animales"}
\ No newline at end of file
+    return {"mensaje": "Bienvenido a la API del Refugio de Animales"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return exponer_metricas()
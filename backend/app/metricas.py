@@ -0,0 +1,147 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily, REGISTRY
+from sqlalchemy import event
+from starlette.responses import Response
+from .database import engine, async_engine, metricas_pool
+from .auth.hashing import servicio_hash
+
+# Métricas HTTP
+REQUESTS = Counter(
+    "refugio_http_requests_total", "Requests atendidos", ["metodo", "ruta", "estado"]
+)
+LATENCIA = Histogram(
+    "refugio_http_request_duration_seconds", "Latencia de los requests", ["metodo", "ruta"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+EN_CURSO = Gauge("refugio_http_requests_in_progress", "Requests en curso")
+
+# Métricas de base de datos por request
+DB_CONSULTAS = Histogram(
+    "refugio_db_queries_per_request", "Sentencias SQL ejecutadas por request", ["ruta"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+DB_TIEMPO = Histogram(
+    "refugio_db_time_per_request_seconds", "Tiempo en base de datos por request", ["ruta"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# Tiempo de espera en la cola de bcrypt
+HASH_ESPERA = Histogram(
+    "refugio_bcrypt_queue_seconds", "Espera en cola antes de ejecutar bcrypt",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+servicio_hash.observador_espera = HASH_ESPERA.observe
+
+
+# Contador de consultas del request en curso (None fuera de un request)
+class ConsultasRequest:
+    __slots__ = ("cantidad", "tiempo")
+
+    def __init__(self):
+        self.cantidad = 0
+        self.tiempo = 0.0
+
+
+consultas_request: ContextVar[Optional[ConsultasRequest]] = ContextVar("consultas_request", default=None)
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info["inicio_consulta"].pop()
+    actual = consultas_request.get()
+    if actual is not None:
+        actual.cantidad += 1
+        actual.tiempo += time.perf_counter() - inicio
+
+
+for _motor in (engine, async_engine.sync_engine):
+    event.listen(_motor, "before_cursor_execute", _antes_de_ejecutar)
+    event.listen(_motor, "after_cursor_execute", _despues_de_ejecutar)
+
+
+# Plantilla de la ruta que atendió el request (/mascotas/{id_mascota}), tal como la declara el
+# router, para acotar la cardinalidad de las etiquetas. Sin ruta (404) se agrupa en "sin_ruta"
+def plantilla_ruta(scope) -> str:
+    ruta = scope.get("route")
+    if ruta is None:
+        return "sin_ruta"
+    # Según la versión de FastAPI, la ruta de un router incluido puede no llevar el prefijo de
+    # include_router: el prefijo es lo que queda del path antes del tramo que reconoció la ruta
+    path = scope["path"]
+    reconocido = ruta.path_format.format(**scope.get("path_params", {}))
+    prefijo = path[:-len(reconocido)] if reconocido and path.endswith(reconocido) else ""
+    return prefijo + ruta.path
+
+
+# Middleware ASGI (sin BaseHTTPMiddleware para no interferir con StreamingResponse)
+class MetricasMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        estado = {"codigo": 500}
+
+        async def send_con_estado(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+            await send(mensaje)
+
+        consultas = ConsultasRequest()
+        token = consultas_request.set(consultas)
+        EN_CURSO.inc()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_con_estado)
+        finally:
+            duracion = time.perf_counter() - inicio
+            EN_CURSO.dec()
+            consultas_request.reset(token)
+            ruta = plantilla_ruta(scope)
+            metodo = scope["method"]
+            REQUESTS.labels(metodo, ruta, str(estado["codigo"])).inc()
+            LATENCIA.labels(metodo, ruta).observe(duracion)
+            DB_CONSULTAS.labels(ruta).observe(consultas.cantidad)
+            DB_TIEMPO.labels(ruta).observe(consultas.tiempo)
+
+
+# Estadísticas que ya llevan el pool y el servicio de hash, leídas al momento del scrape
+class ColectorEstado:
+    def collect(self):
+        pool = metricas_pool()
+        if "en_uso" in pool:
+            for nombre, clave, ayuda in (
+                ("refugio_db_pool_size", "pool_size", "Tamaño configurado del pool"),
+                ("refugio_db_pool_checked_out", "en_uso", "Conexiones en uso"),
+                ("refugio_db_pool_checked_in", "disponibles", "Conexiones libres en el pool"),
+                ("refugio_db_pool_overflow", "overflow", "Conexiones en overflow"),
+                ("refugio_db_pool_saturation", "saturacion", "Conexiones en uso / capacidad máxima"),
+            ):
+                yield GaugeMetricFamily(nombre, ayuda, value=pool[clave])
+            yield CounterMetricFamily("refugio_db_pool_checkouts", "Checkouts del pool", value=pool["checkouts"])
+            yield CounterMetricFamily("refugio_db_pool_timeouts", "Checkouts que agotaron pool_timeout", value=pool["timeouts"])
+            yield CounterMetricFamily(
+                "refugio_db_pool_checkout_wait_seconds", "Tiempo total esperando una conexión",
+                value=pool["espera_total_segundos"]
+            )
+        hash_ = servicio_hash.metricas()
+        yield GaugeMetricFamily("refugio_bcrypt_pending", "Operaciones bcrypt en cola o en ejecución", value=hash_["pendientes"])
+        yield GaugeMetricFamily("refugio_bcrypt_queued", "Operaciones bcrypt esperando un proceso", value=hash_["en_cola"])
+        yield CounterMetricFamily("refugio_bcrypt_operations", "Operaciones bcrypt completadas", value=hash_["operaciones"])
+        yield CounterMetricFamily("refugio_bcrypt_rejected", "Operaciones bcrypt rechazadas por saturación", value=hash_["rechazadas"])
+
+
+REGISTRY.register(ColectorEstado())
+
+
+def exponer_metricas():
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Text, Date, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Text, Date, DateTime, Time, Index, JSON, Float, CheckConstraint, Computed, UniqueConstraint, func, text
+from sqlalchemy.dialects.postgresql import TSRANGE, TSVECTOR, ExcludeConstraint
+from sqlalchemy.orm import deferred, relationship
 from datetime import datetime
+from typing import NamedTuple
 from .database import Base
 
 class Usuario(Base):
@@ -22,6 +24,14 @@ class Usuario(Base):
     adopciones_solicitadas = relationship("Adopcion", back_populates="usuario", foreign_keys="Adopcion.id_usuario")
     adopciones_entrevistadas = relationship("Adopcion", back_populates="entrevistador", foreign_keys="Adopcion.id_entrevistador")
 
+    # Búsqueda por prefijo (sin distinguir mayúsculas) en el directorio de usuarios activos
+    __table_args__ = (
+        Index("ix_usuarios_activos_alias_prefijo", func.lower(alias).label("alias_minusculas"),
+              postgresql_ops={"alias_minusculas": "text_pattern_ops"}, postgresql_where=text("estado = true")),
+        Index("ix_usuarios_activos_correo_prefijo", func.lower(correo).label("correo_minusculas"),
+              postgresql_ops={"correo_minusculas": "text_pattern_ops"}, postgresql_where=text("estado = true")),
+    )
+
 class Rol(Base):
     __tablename__ = "roles"
     
@@ -40,7 +50,7 @@ class UsuarioRol(Base):
     
     id_ur = Column(Integer, primary_key=True, index=True)
     id_usuario = Column(Integer, ForeignKey('usuarios.id_usuario'))
-    id_rol = Column(Integer, ForeignKey('roles.id_rol'))
+    id_rol = Column(Integer, ForeignKey('roles.id_rol'), index=True)
     descripcion = Column(Text)
     estado = Column(Boolean, default=True)
     fecha_asignacion = Column(DateTime, default=datetime.utcnow)
@@ -48,6 +58,11 @@ class UsuarioRol(Base):
     usuario = relationship("Usuario", back_populates="roles")
     rol = relationship("Rol", back_populates="usuarios")
 
+    # Un rol se asigna una sola vez por usuario; el índice de la restricción cubre las búsquedas por id_usuario
+    __table_args__ = (
+        UniqueConstraint("id_usuario", "id_rol", name="uq_usuario_rol_usuario_rol"),
+    )
+
 class Persona(Base):
     __tablename__ = "personas"
     
@@ -64,6 +79,14 @@ class Persona(Base):
     usuario = relationship("Usuario", back_populates="persona")
     perfiles_adopcion = relationship("PerfilAdopcion", back_populates="persona")
 
+    # Directorio: prefijo de DNI, apellido por similitud (pg_trgm) y orden por apellido
+    __table_args__ = (
+        Index("ix_personas_activas_dni_prefijo", dni, postgresql_ops={"dni": "text_pattern_ops"}, postgresql_where=text("estado = true")),
+        Index("ix_personas_activas_apellido_trgm", apellido, postgresql_using="gin",
+              postgresql_ops={"apellido": "gin_trgm_ops"}, postgresql_where=text("estado = true")),
+        Index("ix_personas_activas_apellido", apellido, id_usuario, postgresql_where=text("estado = true")),
+    )
+
 class Especie(Base):
     __tablename__ = "especies"
     
@@ -78,7 +101,7 @@ class Raza(Base):
     __tablename__ = "razas"
     
     id_raza = Column(Integer, primary_key=True, index=True)
-    id_especie = Column(Integer, ForeignKey('especies.id_especie'))
+    id_especie = Column(Integer, ForeignKey('especies.id_especie'), index=True)
     nombre = Column(String(50), nullable=False)
     estado = Column(Boolean, default=True)
     fecha_registro = Column(DateTime, default=datetime.utcnow)
@@ -90,7 +113,7 @@ class PerfilAdopcion(Base):
     __tablename__ = "perfil_adopcion"
     
     id_perfil = Column(Integer, primary_key=True, index=True)
-    id_persona = Column(Integer, ForeignKey('personas.id_persona'))
+    id_persona = Column(Integer, ForeignKey('personas.id_persona'), index=True)
     direccion = Column(String(200))
     tipo_vivienda = Column(String(50))
     familia = Column(Text)
@@ -114,44 +137,181 @@ class Mascota(Base):
     edad = Column(Integer)
     estado_mascota = Column(String(20))
     descripcion = Column(String(255))  # o Text si quieres más largo
-    fecha_registro = Column(DateTime, default=datetime.utcnow)
+    fecha_registro = Column(DateTime, default=datetime.utcnow, nullable=False)
     fecha_regreso = Column(Date)
-    registrado_por = Column(Integer, ForeignKey('usuarios.id_usuario'))
+    registrado_por = Column(Integer, ForeignKey('usuarios.id_usuario'), index=True)
     estado = Column(Boolean, default=True)
+    # Versión de la fila para ETag/Last-Modified; se incrementa al editar la mascota o sus fotos
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    fecha_actualizacion = Column(DateTime, nullable=False, default=datetime.utcnow, server_default=text("now()"))
+    # Vector de búsqueda (nombre, especie, raza, descripción); lo mantiene un trigger en la base.
+    # Diferido para no traerlo en cada SELECT de mascotas
+    busqueda = deferred(Column(TSVECTOR))
     
     fotos = relationship("FotoMascota", back_populates="mascota")
+    # Solo fotos activas; de solo lectura, pensada para cargarse con selectinload
+    fotos_activas = relationship(
+        "FotoMascota",
+        primaryjoin="and_(Mascota.id_mascota == FotoMascota.id_mascota, FotoMascota.estado == True)",
+        order_by="FotoMascota.id_foto",
+        viewonly=True
+    )
     especie = relationship("Especie", back_populates="mascotas")
     raza = relationship("Raza", back_populates="mascotas")
     adopciones = relationship("Adopcion", back_populates="mascota")
     registrador = relationship("Usuario", back_populates="mascotas_registradas")
 
+    # Índices parciales (solo mascotas activas) para la paginación por cursor del catálogo
+    __table_args__ = (
+        Index("ix_mascotas_activas_registro", fecha_registro.desc(), id_mascota.desc(), postgresql_where=text("estado = true")),
+        Index("ix_mascotas_activas_especie", id_especie, fecha_registro.desc(), id_mascota.desc(), postgresql_where=text("estado = true")),
+        Index("ix_mascotas_activas_raza", id_raza, fecha_registro.desc(), id_mascota.desc(), postgresql_where=text("estado = true")),
+        Index("ix_mascotas_activas_estado_mascota", estado_mascota, fecha_registro.desc(), id_mascota.desc(), postgresql_where=text("estado = true")),
+        # Búsqueda de texto completo y por similitud (pg_trgm) sobre el nombre
+        Index("ix_mascotas_activas_busqueda", "busqueda", postgresql_using="gin", postgresql_where=text("estado = true")),
+        Index(
+            "ix_mascotas_activas_nombre_trgm", nombre_mascota, postgresql_using="gin",
+            postgresql_ops={"nombre_mascota": "gin_trgm_ops"}, postgresql_where=text("estado = true")
+        ),
+        Index("ix_mascotas_activas_especie_edad", id_especie, edad, postgresql_where=text("estado = true")),
+    )
+
 class FotoMascota(Base):
     __tablename__ = "fotos_mascota"
 
     id_foto = Column(Integer, primary_key=True, index=True)
-    id_mascota = Column(Integer, ForeignKey('mascotas.id_mascota'))
+    id_mascota = Column(Integer, ForeignKey('mascotas.id_mascota'), index=True)
     url = Column(String(255), nullable=False)
     descripcion = Column(String(255))
     estado = Column(Boolean, default=True)
     fecha_registro = Column(DateTime, default=datetime.utcnow)
+    # Fotos subidas al almacén local: sha256 del original y variantes WebP generadas ({"320": url, ...})
+    hash_contenido = Column(String(64), index=True)
+    variantes = Column(JSON(none_as_null=True))
 
     mascota = relationship("Mascota", back_populates="fotos")
 
+    # Fotos activas de cada mascota en el orden de Mascota.fotos_activas
+    __table_args__ = (
+        Index("ix_fotos_mascota_activas", id_mascota, id_foto, postgresql_where=text("estado = true")),
+    )
+
+    # URL más liviana disponible: la variante más chica, o la original mientras no haya variantes
+    @property
+    def miniatura(self):
+        if self.variantes:
+            return self.variantes[min(self.variantes, key=int)]
+        return self.url
+
 class Adopcion(Base):
     __tablename__ = "adopciones"
     
     id_adopcion = Column(Integer, primary_key=True, index=True)
-    id_perfil = Column(Integer, ForeignKey("perfil_adopcion.id_perfil"))
-    id_mascota = Column(Integer, ForeignKey("mascotas.id_mascota"))
-    id_usuario = Column(Integer, ForeignKey('usuarios.id_usuario'))
+    id_perfil = Column(Integer, ForeignKey("perfil_adopcion.id_perfil"), index=True)
+    id_mascota = Column(Integer, ForeignKey("mascotas.id_mascota"), index=True)
+    id_usuario = Column(Integer, ForeignKey('usuarios.id_usuario'), index=True)
     estado_adopcion = Column(String(20))
     fecha_solicitud = Column(DateTime, default=datetime.utcnow)
     fecha_entrevista = Column(DateTime)
-    id_entrevistador = Column(Integer, ForeignKey('usuarios.id_usuario'))
+    id_entrevistador = Column(Integer, ForeignKey('usuarios.id_usuario'), index=True)
     respuesta = Column(Text)
     estado = Column(Boolean, default=True)
+    duracion_entrevista = Column(Integer, nullable=False, default=60, server_default=text("60"))  # minutos
+    # Intervalo [inicio, fin) de la entrevista, calculado por la base. NULL sin fecha: tsrange(NULL, NULL)
+    # sería el rango infinito (,), que se solapa con todo y bloquearía la agenda del entrevistador
+    franja_entrevista = Column(
+        TSRANGE,
+        Computed(
+            "CASE WHEN fecha_entrevista IS NULL THEN NULL "
+            "ELSE tsrange(fecha_entrevista, fecha_entrevista + duracion_entrevista * interval '1 minute') END",
+            persisted=True
+        )
+    )
     
     perfil = relationship("PerfilAdopcion", back_populates="adopciones")
     mascota = relationship("Mascota", back_populates="adopciones")
     usuario = relationship("Usuario", foreign_keys=[id_usuario], back_populates="adopciones_solicitadas")
-    entrevistador = relationship("Usuario", foreign_keys=[id_entrevistador], back_populates="adopciones_entrevistadas")
\ No newline at end of file
+    entrevistador = relationship("Usuario", foreign_keys=[id_entrevistador], back_populates="adopciones_entrevistadas")
+
+    # Un entrevistador no puede tener dos entrevistas solapadas (índice GiST, requiere btree_gist)
+    __table_args__ = (
+        ExcludeConstraint(
+            ("id_entrevistador", "="), ("franja_entrevista", "&&"),
+            name="ex_adopciones_entrevista_solapada", using="gist", where=text("estado = true")
+        ),
+        # Listado y exportación de solicitudes activas, en orden de llegada
+        Index("ix_adopciones_activas_solicitud", fecha_solicitud, id_adopcion, postgresql_where=text("estado = true")),
+        # Solicitudes activas de un usuario (mis-solicitudes)
+        Index("ix_adopciones_activas_usuario", id_usuario, fecha_solicitud, postgresql_where=text("estado = true")),
+    )
+
+# Ventanas semanales en las que un voluntario puede tomar entrevistas
+class DisponibilidadEntrevistador(Base):
+    __tablename__ = "disponibilidad_entrevistador"
+
+    id_disponibilidad = Column(Integer, primary_key=True, index=True)
+    id_usuario = Column(Integer, ForeignKey('usuarios.id_usuario'), nullable=False, index=True)
+    dia_semana = Column(Integer, nullable=False)  # 0 = lunes ... 6 = domingo
+    hora_inicio = Column(Time, nullable=False)
+    hora_fin = Column(Time, nullable=False)
+    estado = Column(Boolean, default=True)
+
+    usuario = relationship("Usuario")
+
+    __table_args__ = (
+        CheckConstraint("dia_semana BETWEEN 0 AND 6", name="ck_disponibilidad_dia_semana"),
+        CheckConstraint("hora_inicio < hora_fin", name="ck_disponibilidad_horas"),
+    )
+
+# Resumen de solicitudes por mes, especie y estado. Lo mantiene un trigger sobre adopciones
+# (solo filas activas) para que las estadísticas no dependan del tamaño del historial
+class ResumenAdopcion(Base):
+    __tablename__ = "resumen_adopciones"
+
+    mes = Column(Date, primary_key=True)
+    id_especie = Column(Integer, primary_key=True)  # 0 si la mascota no tiene especie
+    estado_adopcion = Column(String(20), primary_key=True)
+    cantidad = Column(Integer, nullable=False, default=0)
+    con_entrevista = Column(Integer, nullable=False, default=0)
+    # Suma de (fecha_entrevista - fecha_solicitud) en segundos, para el promedio hasta la entrevista
+    segundos_hasta_entrevista = Column(Float, nullable=False, default=0)
+
+
+# Sesiones de refresco (auth/sesiones.py). Solo se guardan hashes: el del refresh token vigente
+# y el del anterior, para detectar la reutilización de un token ya rotado
+class Sesion(Base):
+    __tablename__ = "sesiones"
+
+    id_sesion = Column(Integer, primary_key=True, index=True)
+    id_usuario = Column(Integer, ForeignKey('usuarios.id_usuario'), nullable=False, index=True)
+    hash_token = Column(String(64), nullable=False, unique=True)
+    hash_anterior = Column(String(64), index=True)
+    expira = Column(DateTime, nullable=False)
+    estado = Column(Boolean, default=True)
+    fecha_creacion = Column(DateTime, default=datetime.utcnow)
+    ultimo_uso = Column(DateTime)
+
+# Baja lógica en cascada (utils/bajas.py). Al dar de baja filas de un modelo se dan de baja las filas
+# activas de cada dependiente cuya columna las referencia y que cumplen las condiciones extra
+class Cascada(NamedTuple):
+    modelo: type
+    columna: Column
+    condiciones: tuple = ()
+
+# Solicitudes que todavía no tienen resolución: se cancelan si el solicitante se da de baja
+ESTADOS_ADOPCION_PENDIENTES = ("Pendiente", "En revisión")
+
+BAJA_EN_CASCADA = {
+    Usuario: (
+        Cascada(Persona, Persona.id_usuario),
+        Cascada(UsuarioRol, UsuarioRol.id_usuario),
+        Cascada(DisponibilidadEntrevistador, DisponibilidadEntrevistador.id_usuario),
+        Cascada(Sesion, Sesion.id_usuario),
+    ),
+    Persona: (
+        Cascada(PerfilAdopcion, PerfilAdopcion.id_persona),
+    ),
+    PerfilAdopcion: (
+        Cascada(Adopcion, Adopcion.id_perfil, (Adopcion.estado_adopcion.in_(ESTADOS_ADOPCION_PENDIENTES),)),
+    ),
+}
@@ -1,18 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+import csv
+import io
+import json
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Literal, Optional
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_db, AsyncSessionLocal
 from ..auth.dependencies import require_roles, get_current_user
+from ..utils.helpers import utc_sin_zona
+from .entrevistas import es_entrevista_solapada, validar_disponibilidad, validar_entrevistador
 
 router = APIRouter()
 
 # 1. Solicitar adopción (usuario)
 @router.post("/", response_model=schemas.AdopcionResponse, summary="Solicitar adopción de una mascota")
-def solicitar_adopcion(datos: schemas.AdopcionCreate, db: Session = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
+async def solicitar_adopcion(datos: schemas.AdopcionCreate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
     # Verifica que la mascota y el perfil existan y estén activos
-    mascota = db.query(models.Mascota).filter(models.Mascota.id_mascota == datos.id_mascota, models.Mascota.estado == True).first()
-    perfil = db.query(models.PerfilAdopcion).filter(models.PerfilAdopcion.id_perfil == datos.id_perfil, models.PerfilAdopcion.estado == True).first()
+    mascota = await db.scalar(select(models.Mascota).where(models.Mascota.id_mascota == datos.id_mascota, models.Mascota.estado == True))
+    perfil = await db.scalar(select(models.PerfilAdopcion).options(selectinload(models.PerfilAdopcion.persona)).where(models.PerfilAdopcion.id_perfil == datos.id_perfil, models.PerfilAdopcion.estado == True))
     if not mascota or not perfil:
         raise HTTPException(status_code=404, detail="Mascota o perfil no encontrado")
     # Verifica que el usuario sea dueño del perfil
@@ -28,56 +38,169 @@ def solicitar_adopcion(datos: schemas.AdopcionCreate, db: Session = Depends(get_
         estado=True
     )
     db.add(nueva_adopcion)
-    db.commit()
-    db.refresh(nueva_adopcion)
+    await db.commit()
+    await db.refresh(nueva_adopcion)
     return nueva_adopcion
 
 # 2. Ver solicitudes propias (usuario)
 @router.get("/mis-solicitudes", response_model=List[schemas.AdopcionResponse], summary="Ver mis solicitudes de adopción")
-def mis_solicitudes(db: Session = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
-    solicitudes = db.query(models.Adopcion).filter(models.Adopcion.id_usuario == user["id_usuario"], models.Adopcion.estado == True).all()
+async def mis_solicitudes(db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
+    solicitudes = (await db.scalars(select(models.Adopcion).where(models.Adopcion.id_usuario == user["id_usuario"], models.Adopcion.estado == True))).all()
     return solicitudes
 
 # 3. Listar todas las solicitudes (voluntario/admin)
 @router.get("/", response_model=List[schemas.AdopcionResponse], summary="Listar todas las solicitudes de adopción")
-def listar_solicitudes(db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    solicitudes = db.query(models.Adopcion).filter(models.Adopcion.estado == True).all()
+async def listar_solicitudes(db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    solicitudes = (await db.scalars(select(models.Adopcion).where(models.Adopcion.estado == True))).all()
     return solicitudes
 
+# Exportación en streaming para reportes (voluntario/admin)
+COLUMNAS_EXPORTACION = [
+    "id_adopcion", "id_perfil", "id_mascota", "id_usuario", "estado_adopcion",
+    "fecha_solicitud", "fecha_entrevista", "id_entrevistador", "respuesta", "estado"
+]
+FILAS_POR_LOTE = 1000
+
+async def generar_exportacion(stmt, formato: str):
+    # Usa su propia sesión: el generador se consume después de que el endpoint retorna
+    async with AsyncSessionLocal() as db:
+        # stream + yield_per usan un cursor del lado del servidor: la memoria no crece con el historial
+        resultado = await db.stream(stmt.execution_options(yield_per=FILAS_POR_LOTE))
+        if formato == "csv":
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer)
+            escritor.writerow(COLUMNAS_EXPORTACION)
+            async for lote in resultado.partitions():
+                escritor.writerows(lote)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            async for lote in resultado.partitions():
+                yield "".join(
+                    json.dumps(dict(fila._mapping), default=lambda v: v.isoformat()) + "\n"
+                    for fila in lote
+                )
+
+@router.get("/exportar", summary="Exportar solicitudes de adopción (NDJSON o CSV)")
+async def exportar_solicitudes(
+    formato: Literal["ndjson", "csv"] = Query("ndjson"),
+    desde: Optional[date] = Query(None, description="Fecha de solicitud inicial (inclusive)"),
+    hasta: Optional[date] = Query(None, description="Fecha de solicitud final (inclusive)"),
+    estado_adopcion: Optional[str] = Query(None),
+    user=Depends(require_roles(["Voluntario", "Administrador"]))
+):
+    tabla = models.Adopcion.__table__
+    stmt = select(*[tabla.c[c] for c in COLUMNAS_EXPORTACION]).where(tabla.c.estado == True)
+    if desde:
+        stmt = stmt.where(tabla.c.fecha_solicitud >= desde)
+    if hasta:
+        stmt = stmt.where(tabla.c.fecha_solicitud < hasta + timedelta(days=1))
+    if estado_adopcion:
+        stmt = stmt.where(tabla.c.estado_adopcion == estado_adopcion)
+    stmt = stmt.order_by(tabla.c.fecha_solicitud, tabla.c.id_adopcion)
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        generar_exportacion(stmt, formato),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="adopciones.{formato}"'}
+    )
+
+# Estadísticas para el tablero (voluntario/admin). Se leen de resumen_adopciones, que mantiene un
+# trigger sobre adopciones: el costo depende de meses x especies x estados, no del historial.
+# Un solo GROUP BY GROUPING SETS devuelve los cuatro agrupamientos
+@router.get("/estadisticas", response_model=schemas.EstadisticasAdopcion, summary="Estadísticas de solicitudes de adopción")
+async def estadisticas_adopciones(
+    desde: Optional[date] = Query(None, description="Mes inicial (se toma el mes de la fecha)"),
+    hasta: Optional[date] = Query(None, description="Mes final inclusive (se toma el mes de la fecha)"),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_roles(["Voluntario", "Administrador"]))
+):
+    r = models.ResumenAdopcion
+    especie = models.Especie
+    stmt = (
+        select(
+            func.grouping(r.estado_adopcion, r.mes, r.id_especie).label("agrupamiento"),
+            r.estado_adopcion, r.mes, r.id_especie, especie.nombre,
+            func.sum(r.cantidad).label("cantidad"),
+            func.sum(r.con_entrevista).label("con_entrevista"),
+            func.sum(r.segundos_hasta_entrevista).label("segundos")
+        )
+        .outerjoin(especie, especie.id_especie == r.id_especie)
+        .group_by(func.grouping_sets(
+            tuple_(r.estado_adopcion), tuple_(r.mes), tuple_(r.id_especie, especie.nombre), tuple_()
+        ))
+    )
+    if desde:
+        stmt = stmt.where(r.mes >= desde.replace(day=1))
+    if hasta:
+        stmt = stmt.where(r.mes <= hasta.replace(day=1))
+
+    resultado = schemas.EstadisticasAdopcion()
+    for fila in (await db.execute(stmt)).all():
+        if not fila.cantidad:
+            continue
+        # grouping() marca con 1 las columnas que no forman parte del agrupamiento (estado, mes, especie)
+        if fila.agrupamiento == 0b011:
+            resultado.por_estado.append(schemas.ConteoEstado(estado_adopcion=fila.estado_adopcion, cantidad=fila.cantidad))
+        elif fila.agrupamiento == 0b101:
+            resultado.por_mes.append(schemas.ConteoMes(mes=fila.mes, cantidad=fila.cantidad))
+        elif fila.agrupamiento == 0b110:
+            resultado.por_especie.append(schemas.ConteoEspecie(id_especie=fila.id_especie, especie=fila.nombre, cantidad=fila.cantidad))
+        else:
+            resultado.total = fila.cantidad
+            resultado.con_entrevista = fila.con_entrevista
+            if fila.con_entrevista:
+                resultado.promedio_dias_hasta_entrevista = round(fila.segundos / fila.con_entrevista / 86400, 2)
+    resultado.por_mes.sort(key=lambda c: c.mes)
+    resultado.por_estado.sort(key=lambda c: -c.cantidad)
+    resultado.por_especie.sort(key=lambda c: -c.cantidad)
+    return resultado
+
 # 4. Asignar entrevista (voluntario/admin)
 @router.put("/{id_adopcion}/asignar-entrevista", response_model=schemas.AdopcionResponse, summary="Asignar entrevistador y fecha")
-def asignar_entrevista(id_adopcion: int, datos: schemas.AsignarEntrevista, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    adopcion = db.query(models.Adopcion).filter(models.Adopcion.id_adopcion == id_adopcion, models.Adopcion.estado == True).first()
+async def asignar_entrevista(id_adopcion: int, datos: schemas.AsignarEntrevista, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    adopcion = await db.scalar(select(models.Adopcion).where(models.Adopcion.id_adopcion == id_adopcion, models.Adopcion.estado == True))
     if not adopcion:
         raise HTTPException(status_code=404, detail="Solicitud no encontrada")
-    # Verifica que el entrevistador exista y sea voluntario/admin
-    entrevistador = db.query(models.Usuario).filter(models.Usuario.id_usuario == datos.id_entrevistador, models.Usuario.estado == True).first()
-    if not entrevistador:
-        raise HTTPException(status_code=404, detail="Entrevistador no encontrado")
-    adopcion.fecha_entrevista = datos.fecha_entrevista
+    # Verifica que el entrevistador exista, sea voluntario/admin y esté disponible en ese horario
+    await validar_entrevistador(db, datos.id_entrevistador)
+    fecha_entrevista = utc_sin_zona(datos.fecha_entrevista)
+    fin_entrevista = fecha_entrevista + timedelta(minutes=datos.duracion_minutos)
+    await validar_disponibilidad(db, datos.id_entrevistador, fecha_entrevista, fin_entrevista)
+    adopcion.fecha_entrevista = fecha_entrevista
     adopcion.id_entrevistador = datos.id_entrevistador
-    db.commit()
-    db.refresh(adopcion)
+    adopcion.duracion_entrevista = datos.duracion_minutos
+    # La restricción de exclusión rechaza la franja si se solapa con otra entrevista del mismo entrevistador
+    try:
+        await db.commit()
+    except IntegrityError as error:
+        await db.rollback()
+        if es_entrevista_solapada(error):
+            raise HTTPException(status_code=409, detail="El entrevistador ya tiene una entrevista en ese horario")
+        raise
+    await db.refresh(adopcion)
     return adopcion
 
 # 5. Cambiar estado de la solicitud (voluntario/admin)
 @router.put("/{id_adopcion}/cambiar-estado", response_model=schemas.AdopcionResponse, summary="Cambiar estado de la solicitud")
-def cambiar_estado(id_adopcion: int, datos: schemas.CambiarEstadoAdopcion, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    adopcion = db.query(models.Adopcion).filter(models.Adopcion.id_adopcion == id_adopcion, models.Adopcion.estado == True).first()
+async def cambiar_estado(id_adopcion: int, datos: schemas.CambiarEstadoAdopcion, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    adopcion = await db.scalar(select(models.Adopcion).where(models.Adopcion.id_adopcion == id_adopcion, models.Adopcion.estado == True))
     if not adopcion:
         raise HTTPException(status_code=404, detail="Solicitud no encontrada")
     adopcion.estado_adopcion = datos.estado_adopcion
     adopcion.respuesta = datos.respuesta
-    db.commit()
-    db.refresh(adopcion)
+    await db.commit()
+    await db.refresh(adopcion)
     return adopcion
 
 # 6. Eliminación lógica de una solicitud (voluntario/admin)
 @router.delete("/{id_adopcion}", summary="Eliminar solicitud de adopción lógicamente")
-def eliminar_adopcion(id_adopcion: int, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    adopcion = db.query(models.Adopcion).filter(models.Adopcion.id_adopcion == id_adopcion, models.Adopcion.estado == True).first()
+async def eliminar_adopcion(id_adopcion: int, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    adopcion = await db.scalar(select(models.Adopcion).where(models.Adopcion.id_adopcion == id_adopcion, models.Adopcion.estado == True))
     if not adopcion:
         raise HTTPException(status_code=404, detail="Solicitud no encontrada")
     adopcion.estado = False
-    db.commit()
+    await db.commit()
     return {"mensaje": "Solicitud eliminada lógicamente"}
\ No newline at end of file
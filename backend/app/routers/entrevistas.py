@@ -0,0 +1,180 @@
+import heapq
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from .. import models, schemas
+from ..database import get_db
+from ..auth.dependencies import require_roles
+from ..utils.helpers import utc_sin_zona
+
+router = APIRouter()
+
+ROLES_ENTREVISTADOR = ("Voluntario", "Administrador")
+# Las propuestas de horario comienzan en múltiplos de este paso
+PASO_MINUTOS = 30
+
+
+# Verifica que el usuario exista, esté activo y tenga un rol que pueda entrevistar
+async def validar_entrevistador(db: AsyncSession, id_usuario: int):
+    existe = await db.scalar(
+        select(models.Usuario.id_usuario)
+        .join(models.UsuarioRol, models.UsuarioRol.id_usuario == models.Usuario.id_usuario)
+        .join(models.Rol, models.Rol.id_rol == models.UsuarioRol.id_rol)
+        .where(
+            models.Usuario.id_usuario == id_usuario,
+            models.Usuario.estado == True,
+            models.UsuarioRol.estado == True,
+            models.Rol.descripcion.in_(ROLES_ENTREVISTADOR)
+        )
+        .limit(1)
+    )
+    if not existe:
+        raise HTTPException(status_code=404, detail="Entrevistador no encontrado")
+
+
+# Si el entrevistador cargó disponibilidad, la franja debe caer completa dentro de una ventana
+async def validar_disponibilidad(db: AsyncSession, id_entrevistador: int, inicio: datetime, fin: datetime):
+    ventanas = (await db.scalars(select(models.DisponibilidadEntrevistador).where(
+        models.DisponibilidadEntrevistador.id_usuario == id_entrevistador,
+        models.DisponibilidadEntrevistador.estado == True
+    ))).all()
+    if ventanas and not any(
+        v.dia_semana == inicio.weekday() and inicio.date() == fin.date()
+        and v.hora_inicio <= inicio.time() and fin.time() <= v.hora_fin
+        for v in ventanas
+    ):
+        raise HTTPException(status_code=409, detail="El horario está fuera de la disponibilidad del entrevistador")
+
+
+# Traduce la violación de ex_adopciones_entrevista_solapada a un 409
+def es_entrevista_solapada(error: IntegrityError) -> bool:
+    codigo = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+    return codigo == "23P01" or "ex_adopciones_entrevista_solapada" in str(error.orig)
+
+
+def _redondear_al_paso(momento: datetime) -> datetime:
+    momento = momento.replace(second=0, microsecond=0)
+    resto = momento.minute % PASO_MINUTOS
+    return momento + timedelta(minutes=PASO_MINUTOS - resto) if resto else momento
+
+
+# Genera las franjas libres de una ventana en un día, saltando las entrevistas ya asignadas
+# (ocupadas: lista ordenada de (inicio, fin) sin solapamientos, garantizado por la restricción)
+def _franjas_libres(dia, ventana, desde: datetime, duracion: timedelta, ocupadas: list, fines: list):
+    t = max(datetime.combine(dia, ventana.hora_inicio), desde)
+    t = _redondear_al_paso(t)
+    limite = datetime.combine(dia, ventana.hora_fin)
+    paso = timedelta(minutes=PASO_MINUTOS)
+    while t + duracion <= limite:
+        # Primera entrevista que termina después de t: es la única que puede solaparse con [t, t + duracion)
+        i = bisect_right(fines, t)
+        if i < len(ocupadas) and ocupadas[i][0] < t + duracion:
+            t = _redondear_al_paso(max(ocupadas[i][1], t + paso))
+            continue
+        yield t, t + duracion
+        t += paso
+
+
+# Disponibilidad de un entrevistador (voluntario/admin)
+@router.get("/disponibilidad", response_model=List[schemas.DisponibilidadResponse], summary="Listar disponibilidad de entrevistadores")
+async def listar_disponibilidad(id_usuario: Optional[int] = Query(None), db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    query = select(models.DisponibilidadEntrevistador).where(models.DisponibilidadEntrevistador.estado == True)
+    if id_usuario:
+        query = query.where(models.DisponibilidadEntrevistador.id_usuario == id_usuario)
+    query = query.order_by(models.DisponibilidadEntrevistador.id_usuario, models.DisponibilidadEntrevistador.dia_semana, models.DisponibilidadEntrevistador.hora_inicio)
+    return (await db.scalars(query)).all()
+
+# Cargar una ventana de disponibilidad (propia; un administrador puede cargarla para otro)
+@router.post("/disponibilidad", response_model=schemas.DisponibilidadResponse, summary="Agregar disponibilidad")
+async def crear_disponibilidad(datos: schemas.DisponibilidadCreate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    id_usuario = datos.id_usuario or user["id_usuario"]
+    if id_usuario != user["id_usuario"] and "Administrador" not in user.get("roles", []):
+        raise HTTPException(status_code=403, detail="Solo un administrador puede cargar disponibilidad de otro usuario")
+    if datos.hora_inicio >= datos.hora_fin:
+        raise HTTPException(status_code=400, detail="La hora de inicio debe ser anterior a la de fin")
+    await validar_entrevistador(db, id_usuario)
+    nueva = models.DisponibilidadEntrevistador(
+        id_usuario=id_usuario,
+        dia_semana=datos.dia_semana,
+        hora_inicio=datos.hora_inicio,
+        hora_fin=datos.hora_fin,
+        estado=True
+    )
+    db.add(nueva)
+    await db.commit()
+    return nueva
+
+# Eliminar una ventana de disponibilidad (lógica)
+@router.delete("/disponibilidad/{id_disponibilidad}", summary="Eliminar disponibilidad")
+async def eliminar_disponibilidad(id_disponibilidad: int, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    ventana = await db.scalar(select(models.DisponibilidadEntrevistador).where(
+        models.DisponibilidadEntrevistador.id_disponibilidad == id_disponibilidad,
+        models.DisponibilidadEntrevistador.estado == True
+    ))
+    if not ventana:
+        raise HTTPException(status_code=404, detail="Disponibilidad no encontrada")
+    if ventana.id_usuario != user["id_usuario"] and "Administrador" not in user.get("roles", []):
+        raise HTTPException(status_code=403, detail="No puedes modificar la disponibilidad de otro usuario")
+    ventana.estado = False
+    await db.commit()
+    return {"mensaje": "Disponibilidad eliminada lógicamente"}
+
+# Próximos horarios libres entre todos los entrevistadores (o uno), ordenados por fecha
+@router.get("/horarios-libres", response_model=List[schemas.HorarioLibre], summary="Proponer horarios libres para entrevistas")
+async def horarios_libres(
+    desde: Optional[datetime] = Query(None, description="Por defecto, ahora"),
+    dias: int = Query(7, ge=1, le=31),
+    duracion: int = Query(60, ge=15, le=240, description="Minutos"),
+    cantidad: int = Query(10, ge=1, le=100),
+    id_entrevistador: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_roles(["Voluntario", "Administrador"]))
+):
+    ahora = datetime.utcnow()
+    inicio = max(utc_sin_zona(desde) or ahora, ahora)
+    fin = inicio + timedelta(days=dias)
+
+    query = (
+        select(models.DisponibilidadEntrevistador)
+        .join(models.Usuario, models.Usuario.id_usuario == models.DisponibilidadEntrevistador.id_usuario)
+        .where(models.DisponibilidadEntrevistador.estado == True, models.Usuario.estado == True)
+    )
+    if id_entrevistador:
+        query = query.where(models.DisponibilidadEntrevistador.id_usuario == id_entrevistador)
+    ventanas = (await db.scalars(query)).all()
+    if not ventanas:
+        return []
+
+    # Entrevistas del período: búsqueda por solapamiento de rangos sobre el índice GiST
+    filas = (await db.execute(
+        select(models.Adopcion.id_entrevistador, models.Adopcion.fecha_entrevista, models.Adopcion.duracion_entrevista)
+        .where(
+            models.Adopcion.estado == True,
+            models.Adopcion.id_entrevistador.in_({v.id_usuario for v in ventanas}),
+            models.Adopcion.franja_entrevista.op("&&")(func.tsrange(inicio, fin))
+        )
+        .order_by(models.Adopcion.id_entrevistador, models.Adopcion.fecha_entrevista)
+    )).all()
+    ocupadas = {}
+    for id_usuario, fecha, minutos in filas:
+        ocupadas.setdefault(id_usuario, []).append((fecha, fecha + timedelta(minutes=minutos)))
+    fines = {id_usuario: [f for _, f in franjas] for id_usuario, franjas in ocupadas.items()}
+
+    largo = timedelta(minutes=duracion)
+    candidatas = (
+        (franja_inicio, ventana.id_usuario, franja_fin)
+        for dia in (inicio.date() + timedelta(days=d) for d in range(dias + 1))
+        for ventana in ventanas if ventana.dia_semana == dia.weekday()
+        for franja_inicio, franja_fin in _franjas_libres(
+            dia, ventana, inicio, largo, ocupadas.get(ventana.id_usuario, []), fines.get(ventana.id_usuario, [])
+        )
+        if franja_fin <= fin
+    )
+    return [
+        schemas.HorarioLibre(id_entrevistador=id_usuario, inicio=franja_inicio, fin=franja_fin)
+        for franja_inicio, id_usuario, franja_fin in heapq.nsmallest(cantidad, candidatas)
+    ]
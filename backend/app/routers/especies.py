@@ -1,40 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import TypeAdapter
 from typing import List
 from .. import models, schemas
 from ..database import get_db
 from ..auth.dependencies import require_roles
+from ..utils.cache import cache_catalogos, responder_cacheado
 
 router = APIRouter()
 
+LISTA_ESPECIES = TypeAdapter(List[schemas.EspecieResponse])
+
+# Listar especies: se sirve desde la caché del catálogo y responde 304 si el ETag coincide
 @router.get("/", response_model=List[schemas.EspecieResponse], summary="Listar especies")
-def listar_especies(db: Session = Depends(get_db)):
-    return db.query(models.Especie).filter(models.Especie.estado == True).all()
+async def listar_especies(request: Request, db: AsyncSession = Depends(get_db)):
+    async def cargar():
+        especies = (await db.scalars(select(models.Especie).where(models.Especie.estado == True))).all()
+        return LISTA_ESPECIES.dump_json(LISTA_ESPECIES.validate_python(especies, from_attributes=True))
+    return responder_cacheado(request, await cache_catalogos.obtener("especies", None, cargar))
 
 @router.post("/", response_model=schemas.EspecieResponse, summary="Crear especie")
-def crear_especie(especie: schemas.EspecieCreate, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+async def crear_especie(especie: schemas.EspecieCreate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
     nueva = models.Especie(nombre=especie.nombre, estado=True)
     db.add(nueva)
-    db.commit()
-    db.refresh(nueva)
+    await db.commit()
+    await cache_catalogos.invalidar("especies")
+    await db.refresh(nueva)
     return nueva
 
 @router.put("/{id_especie}", response_model=schemas.EspecieResponse, summary="Actualizar especie")
-def actualizar_especie(id_especie: int, datos: schemas.EspecieUpdate, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    especie = db.query(models.Especie).filter(models.Especie.id_especie == id_especie, models.Especie.estado == True).first()
+async def actualizar_especie(id_especie: int, datos: schemas.EspecieUpdate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    especie = await db.scalar(select(models.Especie).where(models.Especie.id_especie == id_especie, models.Especie.estado == True))
     if not especie:
         raise HTTPException(status_code=404, detail="Especie no encontrada")
     for campo, valor in datos.dict(exclude_unset=True).items():
         setattr(especie, campo, valor)
-    db.commit()
-    db.refresh(especie)
+    await db.commit()
+    await cache_catalogos.invalidar("especies")
+    await db.refresh(especie)
     return especie
 
 @router.delete("/{id_especie}", summary="Eliminar especie lógicamente")
-def eliminar_especie(id_especie: int, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    especie = db.query(models.Especie).filter(models.Especie.id_especie == id_especie, models.Especie.estado == True).first()
+async def eliminar_especie(id_especie: int, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    especie = await db.scalar(select(models.Especie).where(models.Especie.id_especie == id_especie, models.Especie.estado == True))
     if not especie:
         raise HTTPException(status_code=404, detail="Especie no encontrada")
     especie.estado = False
-    db.commit()
+    await db.commit()
+    await cache_catalogos.invalidar("especies")
     return {"mensaje": "Especie eliminada lógicamente"}
\ No newline at end of file
@@ -1,21 +1,162 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+import hashlib
+import logging
+from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile
+from sqlalchemy import tuple_, insert, select, update, func, literal, literal_column, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Optional
 from .. import models, schemas
-from ..database import get_db
+from ..database import get_db, AsyncSessionLocal
 from ..auth.dependencies import require_roles
+from ..utils.helpers import codificar_cursor, decodificar_cursor, codificar_cursor_rango, decodificar_cursor_rango
+from ..utils.condicional import cabeceras_validacion, es_condicional, no_modificado, sin_cambios
+from ..utils.almacen import guardar_subida, url_publica
+from ..utils.imagenes import procesador_imagenes
 
 router = APIRouter()
+logger = logging.getLogger("refugio.media")
 
-# Listar todas las mascotas (público)
-@router.get("/", response_model=List[schemas.MascotaResponse], summary="Listar todas las mascotas")
-def listar_mascotas(db: Session = Depends(get_db)):
-    mascotas = db.query(models.Mascota).filter(models.Mascota.estado == True).all()
-    return mascotas
+# Configuración de texto completo usada por el trigger que mantiene mascotas.busqueda
+CONFIG_BUSQUEDA = literal_column("'spanish'::regconfig")
+
+# Consulta base de mascotas activas con sus fotos activas precargadas en un solo SELECT adicional
+def consultar_mascotas():
+    return select(models.Mascota).options(selectinload(models.Mascota.fotos_activas)).where(models.Mascota.estado == True)
+
+async def obtener_mascota_activa(db: AsyncSession, id_mascota: int):
+    mascota = await db.scalar(consultar_mascotas().where(models.Mascota.id_mascota == id_mascota))
+    if not mascota:
+        raise HTTPException(status_code=404, detail="Mascota no encontrada")
+    return mascota
+
+# Incrementa la versión de la mascota (al editarla o cambiar sus fotos); devuelve (version, fecha_actualizacion).
+# Con solo_activa=False también toca mascotas dadas de baja (para limpiar sus fotos)
+async def tocar_mascota(db: AsyncSession, id_mascota: int, solo_activa: bool = True):
+    condiciones = [models.Mascota.id_mascota == id_mascota]
+    if solo_activa:
+        condiciones.append(models.Mascota.estado == True)
+    fila = (await db.execute(
+        update(models.Mascota)
+        .where(*condiciones)
+        .values(version=models.Mascota.version + 1, fecha_actualizacion=datetime.utcnow())
+        .returning(models.Mascota.version, models.Mascota.fecha_actualizacion)
+        .execution_options(synchronize_session=False)
+    )).first()
+    if not fila:
+        raise HTTPException(status_code=404, detail="Mascota no encontrada")
+    return fila
+
+def etag_mascota(id_mascota: int, version: int) -> str:
+    return f'"m{id_mascota}-v{version}"'
+
+# ETag de una página del listado: depende de los parámetros y de (id, versión) de cada fila.
+# Sin Last-Modified: una baja saca filas de la página sin cambiar la fecha máxima de las restantes
+def etag_pagina(request: Request, filas, hay_siguiente: bool) -> str:
+    firma = hashlib.sha256(request.url.query.encode())
+    for id_mascota, version in filas:
+        firma.update(f"|{id_mascota}:{version}".encode())
+    firma.update(b"|+" if hay_siguiente else b"|.")
+    return '"' + firma.hexdigest()[:32] + '"'
+
+# Listar mascotas activas paginadas por cursor (público)
+@router.get("/", response_model=schemas.MascotaPagina, summary="Listar mascotas")
+async def listar_mascotas(
+    request: Request,
+    response: Response,
+    id_especie: Optional[int] = Query(None),
+    id_raza: Optional[int] = Query(None),
+    sexo: Optional[str] = Query(None),
+    edad_min: Optional[int] = Query(None, ge=0),
+    edad_max: Optional[int] = Query(None, ge=0),
+    estado_mascota: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en siguiente_cursor"),
+    limite: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    condiciones = []
+    if id_especie:
+        condiciones.append(models.Mascota.id_especie == id_especie)
+    if id_raza:
+        condiciones.append(models.Mascota.id_raza == id_raza)
+    if sexo:
+        condiciones.append(models.Mascota.sexo == sexo)
+    if edad_min is not None:
+        condiciones.append(models.Mascota.edad >= edad_min)
+    if edad_max is not None:
+        condiciones.append(models.Mascota.edad <= edad_max)
+    if estado_mascota:
+        condiciones.append(models.Mascota.estado_mascota == estado_mascota)
+    if cursor:
+        fecha, id_mascota = decodificar_cursor(cursor)
+        condiciones.append(tuple_(models.Mascota.fecha_registro, models.Mascota.id_mascota) < (fecha, id_mascota))
+    orden = (models.Mascota.fecha_registro.desc(), models.Mascota.id_mascota.desc())
+
+    # Petición condicional: primero solo (id, versión) de la página; si el cliente ya la tiene, 304
+    # sin cargar fotos ni serializar
+    if es_condicional(request):
+        versiones = (await db.execute(
+            select(models.Mascota.id_mascota, models.Mascota.version)
+            .where(models.Mascota.estado == True, *condiciones)
+            .order_by(*orden).limit(limite + 1)
+        )).all()
+        etag = etag_pagina(request, versiones[:limite], len(versiones) > limite)
+        if sin_cambios(request, etag):
+            return no_modificado(etag)
+
+    # Se pide una fila extra para saber si existe una página siguiente
+    mascotas = (await db.scalars(consultar_mascotas().where(*condiciones).order_by(*orden).limit(limite + 1))).all()
+    hay_siguiente = len(mascotas) > limite
+    mascotas = mascotas[:limite]
+    siguiente_cursor = None
+    if hay_siguiente:
+        ultima = mascotas[-1]
+        siguiente_cursor = codificar_cursor(ultima.fecha_registro, ultima.id_mascota)
+    response.headers.update(cabeceras_validacion(
+        etag_pagina(request, [(m.id_mascota, m.version) for m in mascotas], hay_siguiente)
+    ))
+    return {"items": mascotas, "siguiente_cursor": siguiente_cursor}
+
+# Buscar mascotas por texto libre (público): texto completo sobre nombre, especie, raza y
+# descripción, más similitud por trigramas en el nombre para tolerar errores de tipeo
+@router.get("/buscar", response_model=schemas.MascotaPagina, summary="Buscar mascotas")
+async def buscar_mascotas(
+    q: str = Query(..., min_length=2, max_length=100, description="Texto a buscar, p. ej. 'gato negro juguetón'"),
+    id_especie: Optional[int] = Query(None),
+    id_raza: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en siguiente_cursor"),
+    limite: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    consulta_ts = func.websearch_to_tsquery(CONFIG_BUSQUEDA, q)
+    rango = (
+        func.ts_rank_cd(models.Mascota.busqueda, consulta_ts)
+        + func.word_similarity(q, models.Mascota.nombre_mascota)
+    ).label("rango")
+    query = consultar_mascotas().add_columns(rango).filter(or_(
+        models.Mascota.busqueda.op("@@")(consulta_ts),
+        # q <% nombre: similitud de q con alguna parte del nombre (usa el índice de trigramas)
+        literal(q).op("<%")(models.Mascota.nombre_mascota)
+    ))
+    if id_especie:
+        query = query.filter(models.Mascota.id_especie == id_especie)
+    if id_raza:
+        query = query.filter(models.Mascota.id_raza == id_raza)
+    if cursor:
+        rango_cursor, id_mascota = decodificar_cursor_rango(cursor)
+        query = query.filter(tuple_(rango, models.Mascota.id_mascota) < (rango_cursor, id_mascota))
+    filas = (await db.execute(query.order_by(rango.desc(), models.Mascota.id_mascota.desc()).limit(limite + 1))).all()
+    siguiente_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima, rango_ultima = filas[-1]
+        siguiente_cursor = codificar_cursor_rango(rango_ultima, ultima.id_mascota)
+    return {"items": [mascota for mascota, _ in filas], "siguiente_cursor": siguiente_cursor}
 
 # Registrar una mascota (solo voluntario o admin)
 @router.post("/", response_model=schemas.MascotaResponse, summary="Registrar una nueva mascota")
-def registrar_mascota(mascota: schemas.MascotaCreate, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+async def registrar_mascota(mascota: schemas.MascotaCreate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
     nueva_mascota = models.Mascota(
         nombre_mascota=mascota.nombre_mascota,
         sexo=mascota.sexo,
@@ -28,21 +169,101 @@ def registrar_mascota(mascota: schemas.MascotaCreate, db: Session = Depends(get_
         registrado_por=user["id_usuario"]
     )
     db.add(nueva_mascota)
-    db.commit()
-    db.refresh(nueva_mascota)
-    return nueva_mascota
+    await db.commit()
+    return await obtener_mascota_activa(db, nueva_mascota.id_mascota)
+
+# Primer valor de texto más largo que su columna, como (campo, largo máximo); en el lote un valor
+# así haría fallar el INSERT multi-fila entero, por eso se rechaza antes, por ítem
+def campo_demasiado_largo(modelo, valores: dict):
+    for campo, valor in valores.items():
+        largo = getattr(modelo.__table__.c[campo].type, "length", None)
+        if isinstance(valor, str) and largo and len(valor) > largo:
+            return campo, largo
+    return None
+
+def error_largo_lote(mascota: schemas.MascotaLoteItem) -> Optional[str]:
+    excedido = campo_demasiado_largo(models.Mascota, mascota.model_dump(include={"nombre_mascota", "sexo", "estado_mascota", "descripcion"}))
+    if excedido:
+        return f"{excedido[0]} supera los {excedido[1]} caracteres"
+    for i, foto in enumerate(mascota.fotos):
+        excedido = campo_demasiado_largo(models.FotoMascota, foto.model_dump(include={"url", "descripcion"}))
+        if excedido:
+            return f"fotos[{i}].{excedido[0]} supera los {excedido[1]} caracteres"
+    return None
+
+# Registrar mascotas por lote, p. ej. tras un rescate (solo voluntario o admin)
+@router.post("/lote", response_model=schemas.MascotaLoteResponse, summary="Registrar mascotas por lote")
+async def registrar_mascotas_lote(datos: schemas.MascotaLoteCreate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    # Valida todas las referencias especie/raza con una sola consulta
+    ids_raza = {m.raza_id for m in datos.mascotas}
+    razas = dict((await db.execute(
+        select(models.Raza.id_raza, models.Raza.id_especie)
+        .join(models.Especie, models.Especie.id_especie == models.Raza.id_especie)
+        .where(models.Raza.id_raza.in_(ids_raza), models.Raza.estado == True, models.Especie.estado == True)
+    )).all())
+
+    resultado = schemas.MascotaLoteResponse()
+    validas = []
+    for indice, mascota in enumerate(datos.mascotas):
+        if error := error_largo_lote(mascota):
+            resultado.errores.append(schemas.MascotaLoteError(indice=indice, detalle=error))
+        elif mascota.raza_id not in razas:
+            resultado.errores.append(schemas.MascotaLoteError(indice=indice, detalle="Raza no encontrada"))
+        elif razas[mascota.raza_id] != mascota.especie_id:
+            resultado.errores.append(schemas.MascotaLoteError(indice=indice, detalle="La raza no pertenece a la especie indicada"))
+        else:
+            validas.append((indice, mascota))
+    if not validas:
+        return resultado
+
+    # Inserta mascotas y fotos con dos sentencias multi-fila dentro de una sola transacción
+    ids_mascota = (await db.scalars(
+        insert(models.Mascota).returning(models.Mascota.id_mascota, sort_by_parameter_order=True),
+        [{
+            "nombre_mascota": m.nombre_mascota,
+            "sexo": m.sexo,
+            "id_especie": m.especie_id,
+            "id_raza": m.raza_id,
+            "edad": m.edad,
+            "estado_mascota": m.estado_mascota,
+            "descripcion": m.descripcion,
+            "estado": True,
+            "registrado_por": user["id_usuario"]
+        } for _, m in validas]
+    )).all()
+    fotos = [
+        {"id_mascota": id_mascota, "url": f.url, "descripcion": f.descripcion, "estado": True}
+        for (_, m), id_mascota in zip(validas, ids_mascota)
+        for f in m.fotos
+    ]
+    if fotos:
+        await db.execute(insert(models.FotoMascota), fotos)
+    await db.commit()
+    resultado.creadas = [
+        schemas.MascotaLoteCreada(indice=indice, id_mascota=id_mascota)
+        for (indice, _), id_mascota in zip(validas, ids_mascota)
+    ]
+    return resultado
 
 # Ver detalles de una mascota (público)
 @router.get("/{id_mascota}", response_model=schemas.MascotaResponse, summary="Obtener detalles de una mascota")
-def obtener_mascota(id_mascota: int, db: Session = Depends(get_db)):
-    mascota = db.query(models.Mascota).filter(models.Mascota.id_mascota == id_mascota, models.Mascota.estado == True).first()
-    if not mascota:
-        raise HTTPException(status_code=404, detail="Mascota no encontrada")
+async def obtener_mascota(id_mascota: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    # Petición condicional: se compara contra la versión de la fila sin cargar fotos ni serializar
+    if es_condicional(request):
+        fila = (await db.execute(
+            select(models.Mascota.version, models.Mascota.fecha_actualizacion)
+            .where(models.Mascota.id_mascota == id_mascota, models.Mascota.estado == True)
+        )).first()
+        if fila and sin_cambios(request, etag_mascota(id_mascota, fila.version), fila.fecha_actualizacion):
+            return no_modificado(etag_mascota(id_mascota, fila.version), fila.fecha_actualizacion)
+    mascota = await obtener_mascota_activa(db, id_mascota)
+    response.headers.update(cabeceras_validacion(etag_mascota(mascota.id_mascota, mascota.version), mascota.fecha_actualizacion))
     return mascota
 
 # Agregar foto a una mascota
 @router.post("/{id_mascota}/fotos", response_model=schemas.FotoMascotaResponse, summary="Agregar foto a una mascota")
-def agregar_foto_mascota(id_mascota: int, foto: schemas.FotoMascotaCreate, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+async def agregar_foto_mascota(id_mascota: int, foto: schemas.FotoMascotaCreate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    await tocar_mascota(db, id_mascota)
     nueva_foto = models.FotoMascota(
         id_mascota=id_mascota,
         url=foto.url,
@@ -50,38 +271,107 @@ def agregar_foto_mascota(id_mascota: int, foto: schemas.FotoMascotaCreate, db: S
         estado=True
     )
     db.add(nueva_foto)
-    db.commit()
-    db.refresh(nueva_foto)
+    await db.commit()
+    return nueva_foto
+
+# Genera las variantes WebP de una imagen (en el pool de procesos) y las registra en todas las
+# fotos que comparten ese contenido; las mascotas afectadas cambian de versión
+async def procesar_variantes(hash_contenido: str, ruta_original: str):
+    try:
+        variantes = await procesador_imagenes.generar_variantes(hash_contenido, ruta_original)
+    except Exception:
+        logger.exception("No se pudieron generar las variantes de %s", ruta_original)
+        return
+    async with AsyncSessionLocal() as db:
+        ids_mascota = (await db.scalars(
+            update(models.FotoMascota)
+            .where(models.FotoMascota.hash_contenido == hash_contenido, models.FotoMascota.variantes.is_(None))
+            .values(variantes=variantes)
+            .returning(models.FotoMascota.id_mascota)
+            .execution_options(synchronize_session=False)
+        )).all()
+        if ids_mascota:
+            await db.execute(
+                update(models.Mascota)
+                .where(models.Mascota.id_mascota.in_(set(ids_mascota)))
+                .values(version=models.Mascota.version + 1, fecha_actualizacion=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+
+# Subir una foto (multipart) al almacén local; las variantes se generan en segundo plano
+@router.post("/{id_mascota}/fotos/subir", response_model=schemas.FotoMascotaResponse, summary="Subir foto de una mascota")
+async def subir_foto_mascota(
+    id_mascota: int,
+    background_tasks: BackgroundTasks,
+    archivo: UploadFile = File(...),
+    descripcion: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_roles(["Voluntario", "Administrador"]))
+):
+    existe = await db.scalar(select(models.Mascota.id_mascota).where(models.Mascota.id_mascota == id_mascota, models.Mascota.estado == True))
+    if not existe:
+        raise HTTPException(status_code=404, detail="Mascota no encontrada")
+    hash_contenido, ruta_original = await guardar_subida(archivo)
+
+    # La misma imagen ya subida para esta mascota: se devuelve la foto existente
+    repetida = await db.scalar(select(models.FotoMascota).where(
+        models.FotoMascota.id_mascota == id_mascota,
+        models.FotoMascota.hash_contenido == hash_contenido,
+        models.FotoMascota.estado == True
+    ))
+    if repetida:
+        return repetida
+    # La misma imagen en otra foto: se reutilizan sus variantes ya generadas
+    variantes = await db.scalar(select(models.FotoMascota.variantes).where(
+        models.FotoMascota.hash_contenido == hash_contenido,
+        models.FotoMascota.variantes.is_not(None)
+    ).limit(1))
+
+    await tocar_mascota(db, id_mascota)
+    nueva_foto = models.FotoMascota(
+        id_mascota=id_mascota,
+        url=url_publica(ruta_original),
+        descripcion=descripcion,
+        estado=True,
+        hash_contenido=hash_contenido,
+        variantes=variantes
+    )
+    db.add(nueva_foto)
+    await db.commit()
+    if variantes is None:
+        background_tasks.add_task(procesar_variantes, hash_contenido, ruta_original)
     return nueva_foto
 
 # Actualizar una mascota (solo voluntario o admin)
 @router.put("/{id_mascota}", response_model=schemas.MascotaResponse, summary="Actualizar datos de una mascota")
-def actualizar_mascota(id_mascota: int, datos: schemas.MascotaUpdate, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    mascota = db.query(models.Mascota).filter(models.Mascota.id_mascota == id_mascota, models.Mascota.estado == True).first()
-    if not mascota:
-        raise HTTPException(status_code=404, detail="Mascota no encontrada")
+async def actualizar_mascota(id_mascota: int, datos: schemas.MascotaUpdate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    mascota = await obtener_mascota_activa(db, id_mascota)
     for campo, valor in datos.dict(exclude_unset=True).items():
         setattr(mascota, campo, valor)
-    db.commit()
-    db.refresh(mascota)
+    version, fecha_actualizacion = await tocar_mascota(db, id_mascota)
+    set_committed_value(mascota, "version", version)
+    set_committed_value(mascota, "fecha_actualizacion", fecha_actualizacion)
+    await db.commit()
     return mascota
 
-# Eliminar foto de mascota (lógica)
+# Eliminar foto de mascota (lógica); vale también para fotos de mascotas dadas de baja
 @router.delete("/fotos/{id_foto}", summary="Eliminar foto de mascota")
-def eliminar_foto(id_foto: int, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    foto = db.query(models.FotoMascota).filter(models.FotoMascota.id_foto == id_foto, models.FotoMascota.estado == True).first()
+async def eliminar_foto(id_foto: int, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    foto = await db.scalar(select(models.FotoMascota).where(models.FotoMascota.id_foto == id_foto, models.FotoMascota.estado == True))
     if not foto:
         raise HTTPException(status_code=404, detail="Foto no encontrada")
     foto.estado = False
-    db.commit()
+    await tocar_mascota(db, foto.id_mascota, solo_activa=False)
+    await db.commit()
     return {"mensaje": "Foto eliminada lógicamente"}
 
 # Eliminación lógica de una mascota (solo voluntario o admin)
 @router.delete("/{id_mascota}", summary="Eliminar mascota lógicamente")
-def eliminar_mascota(id_mascota: int, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    mascota = db.query(models.Mascota).filter(models.Mascota.id_mascota == id_mascota, models.Mascota.estado == True).first()
+async def eliminar_mascota(id_mascota: int, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    mascota = await db.scalar(select(models.Mascota).where(models.Mascota.id_mascota == id_mascota, models.Mascota.estado == True))
     if not mascota:
         raise HTTPException(status_code=404, detail="Mascota no encontrada")
     mascota.estado = False
-    db.commit()
+    await db.commit()
     return {"mensaje": "Mascota eliminada lógicamente"}
\ No newline at end of file
@@ -0,0 +1,81 @@
+import asyncio
+import mimetypes
+import os
+import stat
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from ..utils.almacen import MEDIA_DIR
+from ..utils.condicional import coincide_etag
+
+router = APIRouter()
+
+# Delegar el envío al proxy: "nginx" responde con X-Accel-Redirect y "apache" con X-Sendfile,
+# así el archivo sale por sendfile del proxy sin pasar por Python. Vacío: lo envía la API
+MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "").lower()
+# Location interna de nginx que apunta a MEDIA_DIR, p. ej.:
+#   location /_media/ { internal; alias /srv/refugio/media/; }
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/_media/")
+
+# Los nombres llevan el hash del contenido: el archivo detrás de una URL nunca cambia
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+# Variantes precomprimidas (archivo.br / archivo.gz junto al original), en orden de preferencia
+PRECOMPRIMIDOS = (("br", ".br"), ("gzip", ".gz"))
+CARPETAS_PUBLICAS = ("originales", "variantes")
+RAIZ = os.path.realpath(MEDIA_DIR)
+
+
+def _resolver(ruta: str) -> str:
+    absoluta = os.path.realpath(os.path.join(RAIZ, ruta))
+    # Evita salir del almacén (../) y exponer la carpeta de temporales
+    if os.path.commonpath([absoluta, RAIZ]) != RAIZ:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    if os.path.relpath(absoluta, RAIZ).split(os.sep)[0] not in CARPETAS_PUBLICAS:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    return absoluta
+
+
+# stat de un archivo regular, o None: con el stat dado FileResponse no revisa que no sea un directorio
+def _stat_archivo(ruta: str):
+    try:
+        resultado = os.stat(ruta)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return resultado if stat.S_ISREG(resultado.st_mode) else None
+
+
+def _elegir_archivo(absoluta: str, accept_encoding: str):
+    aceptadas = {parte.split(";")[0].strip() for parte in accept_encoding.split(",")}
+    for codificacion, sufijo in PRECOMPRIMIDOS:
+        if codificacion in aceptadas:
+            resultado = _stat_archivo(absoluta + sufijo)
+            if resultado:
+                return absoluta + sufijo, codificacion, resultado
+    resultado = _stat_archivo(absoluta)
+    if not resultado:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+    return absoluta, None, resultado
+
+
+# Servir fotos del almacén local (público). Soporta Range, If-None-Match y variantes precomprimidas
+@router.get("/{ruta:path}", summary="Obtener archivo del almacén de fotos")
+async def servir_media(ruta: str, request: Request):
+    absoluta = _resolver(ruta)
+    archivo, codificacion, stat_archivo = await asyncio.to_thread(
+        _elegir_archivo, absoluta, request.headers.get("accept-encoding", "")
+    )
+    # El ETag sale del nombre (hash del contenido) y de la codificación enviada
+    etag = f'"{os.path.basename(ruta)}{"-" + codificacion if codificacion else ""}"'
+    headers = {"Cache-Control": CACHE_INMUTABLE, "ETag": etag, "Vary": "Accept-Encoding"}
+    if coincide_etag(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(absoluta)[0] or "application/octet-stream"
+    if codificacion:
+        headers["Content-Encoding"] = codificacion
+    if MEDIA_SENDFILE == "nginx":
+        interna = MEDIA_ACCEL_PREFIX + os.path.relpath(archivo, RAIZ).replace(os.sep, "/")
+        return Response(headers={**headers, "X-Accel-Redirect": interna}, media_type=media_type)
+    if MEDIA_SENDFILE == "apache":
+        return Response(headers={**headers, "X-Sendfile": archivo}, media_type=media_type)
+    # FileResponse resuelve Range/If-Range y lee el archivo por bloques fuera del event loop
+    return FileResponse(archivo, headers=headers, media_type=media_type, stat_result=stat_archivo)
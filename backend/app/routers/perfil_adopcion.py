@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from .. import models, schemas
 from ..database import get_db
@@ -9,14 +10,14 @@ router = APIRouter()
 
 # Crear perfil de adopción (solo si no existe)
 @router.post("/", response_model=schemas.PerfilAdopcionResponse, summary="Crear perfil de adopción")
-def crear_perfil(perfil: schemas.PerfilAdopcionCreate, db: Session = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
-    persona = db.query(models.Persona).filter(models.Persona.id_usuario == user["id_usuario"]).first()
+async def crear_perfil(perfil: schemas.PerfilAdopcionCreate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
+    persona = await db.scalar(select(models.Persona).where(models.Persona.id_usuario == user["id_usuario"]))
     if not persona:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
-    existente = db.query(models.PerfilAdopcion).filter(
+    existente = await db.scalar(select(models.PerfilAdopcion).where(
         models.PerfilAdopcion.id_persona == persona.id_persona,
         models.PerfilAdopcion.estado == True
-    ).first()
+    ))
     if existente:
         raise HTTPException(status_code=400, detail="Ya tienes un perfil de adopción")
     nuevo_perfil = models.PerfilAdopcion(
@@ -28,71 +29,71 @@ def crear_perfil(perfil: schemas.PerfilAdopcionCreate, db: Session = Depends(get
         estado=True
     )
     db.add(nuevo_perfil)
-    db.commit()
-    db.refresh(nuevo_perfil)
+    await db.commit()
+    await db.refresh(nuevo_perfil)
     return nuevo_perfil
 
 # Ver mi perfil de adopción (usuario)
 @router.get("/mi-perfil", response_model=schemas.PerfilAdopcionResponse, summary="Ver mi perfil de adopción")
-def ver_mi_perfil(db: Session = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
-    persona = db.query(models.Persona).filter(models.Persona.id_usuario == user["id_usuario"]).first()
+async def ver_mi_perfil(db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
+    persona = await db.scalar(select(models.Persona).where(models.Persona.id_usuario == user["id_usuario"]))
     if not persona:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
-    perfil = db.query(models.PerfilAdopcion).filter(
+    perfil = await db.scalar(select(models.PerfilAdopcion).where(
         models.PerfilAdopcion.id_persona == persona.id_persona,
         models.PerfilAdopcion.estado == True
-    ).first()
+    ))
     if not perfil:
         raise HTTPException(status_code=404, detail="Perfil no encontrado")
     return perfil
 
 # Actualizar mi perfil de adopción (usuario)
 @router.put("/mi-perfil", response_model=schemas.PerfilAdopcionResponse, summary="Actualizar mi perfil de adopción")
-def actualizar_mi_perfil(datos: schemas.PerfilAdopcionUpdate, db: Session = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
-    persona = db.query(models.Persona).filter(models.Persona.id_usuario == user["id_usuario"]).first()
+async def actualizar_mi_perfil(datos: schemas.PerfilAdopcionUpdate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
+    persona = await db.scalar(select(models.Persona).where(models.Persona.id_usuario == user["id_usuario"]))
     if not persona:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
-    perfil = db.query(models.PerfilAdopcion).filter(
+    perfil = await db.scalar(select(models.PerfilAdopcion).where(
         models.PerfilAdopcion.id_persona == persona.id_persona,
         models.PerfilAdopcion.estado == True
-    ).first()
+    ))
     if not perfil:
         raise HTTPException(status_code=404, detail="Perfil no encontrado")
     for campo, valor in datos.dict(exclude_unset=True).items():
         setattr(perfil, campo, valor)
-    db.commit()
-    db.refresh(perfil)
+    await db.commit()
+    await db.refresh(perfil)
     return perfil
 
 # Eliminar mi perfil de adopción (lógica, usuario)
 @router.delete("/mi-perfil", summary="Eliminar mi perfil de adopción lógicamente")
-def eliminar_mi_perfil(db: Session = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
-    persona = db.query(models.Persona).filter(models.Persona.id_usuario == user["id_usuario"]).first()
+async def eliminar_mi_perfil(db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Usuario"]))):
+    persona = await db.scalar(select(models.Persona).where(models.Persona.id_usuario == user["id_usuario"]))
     if not persona:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
-    perfil = db.query(models.PerfilAdopcion).filter(
+    perfil = await db.scalar(select(models.PerfilAdopcion).where(
         models.PerfilAdopcion.id_persona == persona.id_persona,
         models.PerfilAdopcion.estado == True
-    ).first()
+    ))
     if not perfil:
         raise HTTPException(status_code=404, detail="Perfil no encontrado")
     perfil.estado = False
-    db.commit()
+    await db.commit()
     return {"mensaje": "Perfil eliminado lógicamente"}
 
 # Ver perfil de adopción por ID (voluntario/admin)
 @router.get("/{id_perfil}", response_model=schemas.PerfilAdopcionResponse, summary="Ver perfil de adopción por ID")
-def ver_perfil_id(id_perfil: int, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    perfil = db.query(models.PerfilAdopcion).filter(
+async def ver_perfil_id(id_perfil: int, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    perfil = await db.scalar(select(models.PerfilAdopcion).where(
         models.PerfilAdopcion.id_perfil == id_perfil,
         models.PerfilAdopcion.estado == True
-    ).first()
+    ))
     if not perfil:
         raise HTTPException(status_code=404, detail="Perfil no encontrado")
     return perfil
 
 # Listar todos los perfiles de adopción (voluntario/admin)
 @router.get("/", response_model=List[schemas.PerfilAdopcionResponse], summary="Listar todos los perfiles de adopción")
-def listar_perfiles(db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    perfiles = db.query(models.PerfilAdopcion).filter(models.PerfilAdopcion.estado == True).all()
+async def listar_perfiles(db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    perfiles = (await db.scalars(select(models.PerfilAdopcion).where(models.PerfilAdopcion.estado == True))).all()
     return perfiles
\ No newline at end of file
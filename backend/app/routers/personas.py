@@ -1,24 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from .. import models, schemas
 from ..database import get_db
 from ..auth.jwt_handler import crear_token
 from ..auth.dependencies import get_current_user, require_roles
+from ..utils.bajas import dar_de_baja
 
 router = APIRouter()
+
+# Columnas que devuelve el UPDATE ... RETURNING de la persona (las de schemas.PersonaResponse)
+COLUMNAS_PERSONA = [getattr(models.Persona, campo) for campo in schemas.PersonaResponse.model_fields]
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 @router.get("/persona/{id_usuario}", summary="Obtener datos de persona por usuario")
-def obtener_persona(id_usuario: int, db: Session = Depends(get_db), user=Depends(require_roles(["Administrador"]))):
-    persona = db.query(models.Persona).filter(models.Persona.id_usuario == id_usuario, models.Persona.estado == True).first()
+async def obtener_persona(id_usuario: int, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Administrador"]))):
+    persona = await db.scalar(select(models.Persona).where(models.Persona.id_usuario == id_usuario, models.Persona.estado == True))
     if not persona:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
     return persona
 
-@router.get("/personas", summary="Listar personas")
-def listar_personas(db: Session = Depends(get_db), user=Depends(require_roles(["Administrador"]))):
-    personas = db.query(models.Persona).filter(models.Persona.estado == True).all()
+# Listar personas activas (todas, sin paginar: para pantallas nuevas usar /usuarios/directorio)
+@router.get("/personas", summary="Listar personas", deprecated=True)
+async def listar_personas(db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Administrador"]))):
+    personas = (await db.scalars(select(models.Persona).where(models.Persona.estado == True))).all()
     resultado = []
     for p in personas:
         resultado.append({
@@ -33,67 +42,80 @@ def listar_personas(db: Session = Depends(get_db), user=Depends(require_roles(["
         })
     return resultado
 
+# Actualiza los campos dados de la persona activa del usuario: una consulta para el DNI
+# (índice único, sin contar la fila propia) y un UPDATE ... RETURNING
+async def actualizar_persona(db: AsyncSession, id_usuario: int, cambios: dict):
+    if not cambios:
+        raise HTTPException(status_code=400, detail="No hay campos para actualizar")
+    if cambios.get("dni") is not None and await db.scalar(
+        select(models.Persona.id_persona).where(models.Persona.dni == cambios["dni"], models.Persona.id_usuario != id_usuario).limit(1)
+    ):
+        raise HTTPException(status_code=400, detail="El DNI ya existe")
+    try:
+        persona = (await db.execute(
+            update(models.Persona)
+            .where(models.Persona.id_usuario == id_usuario, models.Persona.estado == True)
+            .values(**cambios)
+            .returning(*COLUMNAS_PERSONA)
+            .execution_options(synchronize_session=False)
+        )).mappings().first()
+        if not persona:
+            raise HTTPException(status_code=404, detail="Usuario o persona no encontrado")
+        await db.commit()
+    except IntegrityError:
+        # Otro usuario tomó el mismo DNI entre la verificación y el UPDATE
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="El DNI ya existe")
+    return persona
+
+# Los cambiar-* validan el valor con PersonaUpdate, igual que /mi-persona; un valor inválido
+# responde 422 señalando el campo del body del wrapper
+async def actualizar_campo_persona(db: AsyncSession, id_usuario: int, campo: str, campo_body: str, valor):
+    try:
+        datos = schemas.PersonaUpdate(**{campo: valor})
+    except ValidationError as e:
+        raise RequestValidationError([{**error, "loc": ("body", campo_body)} for error in e.errors(include_url=False)])
+    return await actualizar_persona(db, id_usuario, datos.model_dump(exclude_unset=True))
+
+# Editar los datos personales propios en una sola llamada (solo los campos enviados)
+@router.patch("/mi-persona", response_model=schemas.PersonaResponse, summary="Actualizar datos de la persona")
+async def editar_mi_persona(datos: schemas.PersonaUpdate, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    return await actualizar_persona(db, user["id_usuario"], datos.model_dump(exclude_unset=True))
+
 # Cambiar nombre
 @router.put("/cambiar-nombre", summary="Cambiar nombre de la persona")
-def cambiar_nombre(datos: schemas.CambiarNombre, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == user["id_usuario"]).first()
-    if not usuario or not usuario.persona:
-        raise HTTPException(status_code=404, detail="Usuario o persona no encontrado")
-    usuario.persona.nombre = datos.nuevo_nombre
-    db.commit()
+async def cambiar_nombre(datos: schemas.CambiarNombre, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    await actualizar_campo_persona(db, user["id_usuario"], "nombre", "nuevo_nombre", datos.nuevo_nombre)
     return {"mensaje": "Nombre actualizado correctamente"}
 
 # Cambiar apellido
 @router.put("/cambiar-apellido", summary="Cambiar apellido de la persona")
-def cambiar_apellido(datos: schemas.CambiarApellido, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == user["id_usuario"]).first()
-    if not usuario or not usuario.persona:
-        raise HTTPException(status_code=404, detail="Usuario o persona no encontrado")
-    usuario.persona.apellido = datos.nuevo_apellido
-    db.commit()
+async def cambiar_apellido(datos: schemas.CambiarApellido, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    await actualizar_campo_persona(db, user["id_usuario"], "apellido", "nuevo_apellido", datos.nuevo_apellido)
     return {"mensaje": "Apellido actualizado correctamente"}
 
 @router.put("/cambiar-dni", summary="Cambiar DNI de la persona")
-def cambiar_dni(datos: schemas.CambiarDNI, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == user["id_usuario"]).first()
-    if not usuario or not usuario.persona:
-        raise HTTPException(status_code=404, detail="Usuario o persona no encontrado")
-    # Verifica si el DNI ya existe
-    if db.query(models.Persona).filter(models.Persona.dni == datos.nuevo_dni).first():
-        raise HTTPException(status_code=400, detail="El DNI ya existe")
-    usuario.persona.dni = datos.nuevo_dni
-    db.commit()
+async def cambiar_dni(datos: schemas.CambiarDNI, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    await actualizar_campo_persona(db, user["id_usuario"], "dni", "nuevo_dni", datos.nuevo_dni)
     return {"mensaje": "DNI actualizado correctamente"}
 
 # Cambiar teléfono
 @router.put("/cambiar-telefono", summary="Cambiar teléfono de la persona")
-def cambiar_telefono(datos: schemas.CambiarTelefono, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == user["id_usuario"]).first()
-    if not usuario or not usuario.persona:
-        raise HTTPException(status_code=404, detail="Usuario o persona no encontrado")
-    usuario.persona.telefono = datos.nuevo_telefono
-    db.commit()
+async def cambiar_telefono(datos: schemas.CambiarTelefono, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    await actualizar_campo_persona(db, user["id_usuario"], "telefono", "nuevo_telefono", datos.nuevo_telefono)
     return {"mensaje": "Teléfono actualizado correctamente"}
 
 # Cambiar dirección
 @router.put("/cambiar-direccion", summary="Cambiar dirección de la persona")
-def cambiar_direccion(datos: schemas.CambiarDireccion, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == user["id_usuario"]).first()
-    if not usuario or not usuario.persona:
-        raise HTTPException(status_code=404, detail="Usuario o persona no encontrado")
-    usuario.persona.direccion = datos.nueva_direccion
-    db.commit()
+async def cambiar_direccion(datos: schemas.CambiarDireccion, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+    await actualizar_campo_persona(db, user["id_usuario"], "direccion", "nueva_direccion", datos.nueva_direccion)
     return {"mensaje": "Dirección actualizada correctamente"}
 
-
 @router.delete("/persona/{id_persona}", summary="Eliminar persona lógicamente")
-def eliminar_persona(id_persona: int, db: Session = Depends(get_db), user=Depends(require_roles(["Administrador"]))):
-    persona = db.query(models.Persona).filter(models.Persona.id_persona == id_persona, models.Persona.estado == True).first()
-    if not persona:
+async def eliminar_persona(id_persona: int, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Administrador"]))):
+    # Persona, perfiles de adopción y sus solicitudes pendientes (models.BAJA_EN_CASCADA)
+    conteo = await dar_de_baja(db, models.Persona, models.Persona.id_persona == id_persona)
+    if not conteo["personas"]:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
-    persona.estado = False
-    # Elimina lógicamente los perfiles de adopción asociados
-    for perfil in persona.perfiles_adopcion:
-        perfil.estado = False
-    db.commit()
+    await db.commit()
     return {"mensaje": "Persona y perfiles de adopción eliminados lógicamente"}
\ No newline at end of file
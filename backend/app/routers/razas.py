@@ -1,43 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import TypeAdapter
 from typing import List, Optional
 from .. import models, schemas
 from ..database import get_db
 from ..auth.dependencies import require_roles
+from ..utils.cache import cache_catalogos, responder_cacheado
 
 router = APIRouter()
 
+LISTA_RAZAS = TypeAdapter(List[schemas.RazaResponse])
+
+# Listar razas (opcionalmente de una especie): caché por especie y 304 si el ETag coincide
 @router.get("/", response_model=List[schemas.RazaResponse], summary="Listar razas")
-def listar_razas(id_especie: Optional[int] = Query(None), db: Session = Depends(get_db)):
-    query = db.query(models.Raza).filter(models.Raza.estado == True)
-    if id_especie:
-        query = query.filter(models.Raza.id_especie == id_especie)
-    return query.all()
+async def listar_razas(request: Request, id_especie: Optional[int] = Query(None), db: AsyncSession = Depends(get_db)):
+    async def cargar():
+        query = select(models.Raza).where(models.Raza.estado == True)
+        if id_especie:
+            query = query.where(models.Raza.id_especie == id_especie)
+        razas = (await db.scalars(query)).all()
+        return LISTA_RAZAS.dump_json(LISTA_RAZAS.validate_python(razas, from_attributes=True))
+    return responder_cacheado(request, await cache_catalogos.obtener("razas", id_especie, cargar))
 
 @router.post("/", response_model=schemas.RazaResponse, summary="Crear raza")
-def crear_raza(raza: schemas.RazaCreate, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+async def crear_raza(raza: schemas.RazaCreate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
     nueva = models.Raza(nombre=raza.nombre, id_especie=raza.id_especie, estado=True)
     db.add(nueva)
-    db.commit()
-    db.refresh(nueva)
+    await db.commit()
+    await cache_catalogos.invalidar("razas")
+    await db.refresh(nueva)
     return nueva
 
 @router.put("/{id_raza}", response_model=schemas.RazaResponse, summary="Actualizar raza")
-def actualizar_raza(id_raza: int, datos: schemas.RazaUpdate, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    raza = db.query(models.Raza).filter(models.Raza.id_raza == id_raza, models.Raza.estado == True).first()
+async def actualizar_raza(id_raza: int, datos: schemas.RazaUpdate, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    raza = await db.scalar(select(models.Raza).where(models.Raza.id_raza == id_raza, models.Raza.estado == True))
     if not raza:
         raise HTTPException(status_code=404, detail="Raza no encontrada")
     for campo, valor in datos.dict(exclude_unset=True).items():
         setattr(raza, campo, valor)
-    db.commit()
-    db.refresh(raza)
+    await db.commit()
+    await cache_catalogos.invalidar("razas")
+    await db.refresh(raza)
     return raza
 
 @router.delete("/{id_raza}", summary="Eliminar raza lógicamente")
-def eliminar_raza(id_raza: int, db: Session = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
-    raza = db.query(models.Raza).filter(models.Raza.id_raza == id_raza, models.Raza.estado == True).first()
+async def eliminar_raza(id_raza: int, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Voluntario", "Administrador"]))):
+    raza = await db.scalar(select(models.Raza).where(models.Raza.id_raza == id_raza, models.Raza.estado == True))
     if not raza:
         raise HTTPException(status_code=404, detail="Raza no encontrada")
     raza.estado = False
-    db.commit()
+    await db.commit()
+    await cache_catalogos.invalidar("razas")
     return {"mensaje": "Raza eliminada lógicamente"}
\ No newline at end of file
@@ -1,68 +1,165 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import and_, func, select, tuple_, union
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from .. import models, schemas
 from ..database import get_db
 from ..auth.jwt_handler import crear_token
-from ..auth.dependencies import get_current_user, require_roles
+from ..auth.dependencies import get_current_user, require_roles, revocar_tokens_usuario
+from ..auth.roles import cargar_usuario_con_roles, cargar_usuarios_con_roles, roles_de_usuarios
+from ..utils.bajas import dar_de_baja
+from ..utils.helpers import codificar_cursor_orden, decodificar_cursor_orden, estimar_filas, patron_prefijo
 
 router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
-# Obtiene los datos del usuario actual
+# Obtiene los datos del usuario actual, con sus roles y módulos vigentes
 @router.get("/me", summary="Obtener datos del usuario actual")
-def obtener_usuario_actual(user=Depends(get_current_user), db: Session = Depends(get_db)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == user.get("id_usuario")).first()
-    if not usuario:
+async def obtener_usuario_actual(user=Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    encontrado = await cargar_usuario_con_roles(db, models.Usuario.id_usuario == user.get("id_usuario"))
+    if not encontrado:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    usuario, roles, modulos = encontrado
     return {
         "id_usuario": usuario.id_usuario,
         "alias": usuario.alias,
         "correo": usuario.correo,
-        "roles": user.get("roles"),
-        "modulos": user.get("modulos")
+        "roles": roles,
+        "modulos": modulos
     }
 
-# Listar usuarios activos
-@router.get("/", summary="Listar usuarios")
-def listar_usuarios(db: Session = Depends(get_db), user=Depends(require_roles(["Administrador"]))):
-    usuarios = db.query(models.Usuario).filter(models.Usuario.estado == True).all()
-    resultado = []
-    for u in usuarios:
-        roles = [ur.rol.descripcion for ur in u.roles if ur.rol.estado]
-        resultado.append({
+# Listar usuarios activos (todos, sin paginar: para pantallas nuevas usar /usuarios/directorio)
+@router.get("/", summary="Listar usuarios", deprecated=True)
+async def listar_usuarios(db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Administrador"]))):
+    # Una sola consulta sin importar la cantidad de usuarios
+    return [
+        {
             "id_usuario": u.id_usuario,
             "alias": u.alias,
             "correo": u.correo,
             "estado": u.estado,
             "roles": roles
-        })
-    return resultado
+        }
+        for u, roles, _ in await cargar_usuarios_con_roles(db, models.Usuario.estado == True)
+    ]
+
+
+# Subconsultas de ids por campo de búsqueda; cada una usa su propio índice (ver models.Usuario/Persona)
+BUSQUEDAS_DIRECTORIO = {
+    "alias": lambda patron: select(models.Usuario.id_usuario).where(
+        models.Usuario.estado == True, func.lower(models.Usuario.alias).like(patron.lower(), escape="\\")),
+    "correo": lambda patron: select(models.Usuario.id_usuario).where(
+        models.Usuario.estado == True, func.lower(models.Usuario.correo).like(patron.lower(), escape="\\")),
+    "dni": lambda patron: select(models.Persona.id_usuario).where(
+        models.Persona.estado == True, models.Persona.dni.like(patron, escape="\\")),
+    "apellido": lambda patron: select(models.Persona.id_usuario).where(
+        models.Persona.estado == True, models.Persona.apellido.ilike(patron, escape="\\")),
+}
+# Columnas de cada orden; la última desempata (alias y correo ya son únicos)
+ORDENES_DIRECTORIO = {
+    "alias": (models.Usuario.alias,),
+    "correo": (models.Usuario.correo,),
+    "apellido": (models.Persona.apellido, models.Persona.id_usuario),
+    "registro": (models.Usuario.id_usuario,),
+}
+
+
+# Directorio de usuarios con su persona y roles: búsqueda por prefijo, orden elegible y paginación por cursor
+@router.get("/directorio", response_model=schemas.DirectorioPagina, summary="Directorio de usuarios")
+async def directorio_usuarios(
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Prefijo a buscar"),
+    campo: Optional[Literal["alias", "correo", "dni", "apellido"]] = Query(None, description="Por defecto, en todos"),
+    orden: Literal["alias", "correo", "apellido", "registro"] = Query("alias"),
+    descendente: bool = Query(False),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en siguiente_cursor"),
+    limite: int = Query(25, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_roles(["Administrador"]))
+):
+    consulta = (
+        select(
+            models.Usuario.id_usuario, models.Usuario.alias, models.Usuario.correo, models.Usuario.estado,
+            models.Usuario.fecha_registro, models.Persona.id_persona, models.Persona.nombre,
+            models.Persona.apellido, models.Persona.dni, models.Persona.telefono
+        )
+        .select_from(models.Usuario)
+        .outerjoin(models.Persona, and_(
+            models.Persona.id_usuario == models.Usuario.id_usuario,
+            models.Persona.estado == True
+        ))
+        .where(models.Usuario.estado == True)
+    )
+    if q and q.strip():
+        patron = patron_prefijo(q.strip())
+        ids = [BUSQUEDAS_DIRECTORIO[c](patron) for c in ([campo] if campo else BUSQUEDAS_DIRECTORIO)]
+        consulta = consulta.where(models.Usuario.id_usuario.in_(ids[0] if len(ids) == 1 else union(*ids)))
+    if orden == "apellido":
+        # Sin persona no hay apellido por el que ordenar
+        consulta = consulta.where(models.Persona.apellido.is_not(None))
+
+    columnas = ORDENES_DIRECTORIO[orden]
+    total_estimado = None
+    if cursor:
+        valores = decodificar_cursor_orden(cursor, f"{orden}:{'desc' if descendente else 'asc'}")
+        if len(valores) != len(columnas):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        clave = tuple_(*columnas) if len(columnas) > 1 else columnas[0]
+        posicion = tuple_(*valores) if len(columnas) > 1 else valores[0]
+        consulta = consulta.where(clave < posicion if descendente else clave > posicion)
+    else:
+        total_estimado = await estimar_filas(db, consulta)
+
+    filas = (await db.execute(
+        consulta.order_by(*[c.desc() if descendente else c.asc() for c in columnas]).limit(limite + 1)
+    )).mappings().all()
+    hay_siguiente = len(filas) > limite
+    filas = filas[:limite]
+    roles = await roles_de_usuarios(db, [f["id_usuario"] for f in filas])
+    siguiente_cursor = None
+    if hay_siguiente:
+        ultima = filas[-1]
+        siguiente_cursor = codificar_cursor_orden(
+            f"{orden}:{'desc' if descendente else 'asc'}", [ultima[c.key] for c in columnas]
+        )
+    return schemas.DirectorioPagina(
+        items=[schemas.EntradaDirectorio(**f, roles=roles.get(f["id_usuario"], ([], {}))[0]) for f in filas],
+        siguiente_cursor=siguiente_cursor,
+        total_estimado=total_estimado
+    )
 
 
 # Puedes dejarlo vacío por ahora o agregar endpoints después# Asigna un rol a un usuario (solo para administradores)
 @router.post("/asignar-rol", summary="Asignar rol a un usuario")
-def asignar_rol(id_usuario: int, id_rol: int, db: Session = Depends(get_db), user=Depends(require_roles(["Administrador"]))):
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == id_usuario).first()
-    rol = db.query(models.Rol).filter(models.Rol.id_rol == id_rol).first()
+async def asignar_rol(id_usuario: int, id_rol: int, db: AsyncSession = Depends(get_db), user=Depends(require_roles(["Administrador"]))):
+    usuario = await db.scalar(select(models.Usuario).where(models.Usuario.id_usuario == id_usuario))
+    rol = await db.scalar(select(models.Rol).where(models.Rol.id_rol == id_rol))
     if not usuario or not rol:
         raise HTTPException(status_code=404, detail="Usuario o rol no encontrado")
     # Verifica si ya tiene ese rol
-    existe = db.query(models.UsuarioRol).filter_by(id_usuario=id_usuario, id_rol=id_rol).first()
+    existe = await db.scalar(select(models.UsuarioRol).filter_by(id_usuario=id_usuario, id_rol=id_rol))
     if existe:
         raise HTTPException(status_code=400, detail="El usuario ya tiene este rol")
     usuario_rol = models.UsuarioRol(id_usuario=id_usuario, id_rol=id_rol)
     db.add(usuario_rol)
-    db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Otra asignación simultánea ganó la restricción uq_usuario_rol_usuario_rol
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="El usuario ya tiene este rol")
+    # Los tokens vigentes llevan los roles anteriores
+    revocar_tokens_usuario(id_usuario)
     return {"mensaje": "Rol asignado correctamente"}
 
 
 # Elimina un usuario lógicamente (cambia su estado a False)
 @router.delete("/{id_usuario}", summary="Eliminar usuario lógicamente")
-def eliminar_usuario(
+async def eliminar_usuario(
     id_usuario: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user)
 ):
     # Solo el propietario o un administrador pueden eliminar
@@ -71,18 +168,10 @@ def eliminar_usuario(
     if not (es_admin or es_propietario):
         raise HTTPException(status_code=403, detail="No tienes permisos para eliminar este usuario")
 
-    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == id_usuario).first()
-    if not usuario:
+    # Usuario, persona, perfiles, roles y solicitudes pendientes en UPDATEs por tabla (models.BAJA_EN_CASCADA)
+    conteo = await dar_de_baja(db, models.Usuario, models.Usuario.id_usuario == id_usuario)
+    if not conteo["usuarios"]:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    usuario.estado = False
-    # Elimina lógicamente la persona asociada
-    if usuario.persona:
-        usuario.persona.estado = False
-        # Elimina lógicamente los perfiles de adopción asociados
-        for perfil in usuario.persona.perfiles_adopcion:
-            perfil.estado = False
-    # Elimina lógicamente los roles asociados
-    for usuario_rol in usuario.roles:
-        usuario_rol.estado = False
-    db.commit()
+    await db.commit()
+    revocar_tokens_usuario(id_usuario)
     return {"mensaje": "Usuario, persona, roles y datos relacionados eliminados lógicamente"}
\ No newline at end of file
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, Field, AliasChoices
+from typing import Optional, List, Dict
+from datetime import date, datetime, time
 
 class PersonaCreate(BaseModel):
     nombre: str
@@ -24,10 +24,33 @@ class UsuarioResponse(BaseModel):
     estado: bool
     persona: PersonaCreate
 
+# Directorio de usuarios (administración)
+class EntradaDirectorio(BaseModel):
+    id_usuario: int
+    alias: str
+    correo: str
+    estado: bool
+    fecha_registro: Optional[datetime] = None
+    id_persona: Optional[int] = None
+    nombre: Optional[str] = None
+    apellido: Optional[str] = None
+    dni: Optional[str] = None
+    telefono: Optional[str] = None
+    roles: List[str] = []
+
+class DirectorioPagina(BaseModel):
+    items: List[EntradaDirectorio]
+    siguiente_cursor: Optional[str] = None
+    # Estimación del planificador para la búsqueda completa; solo en la primera página
+    total_estimado: Optional[int] = None
+
 class UsuarioLogin(BaseModel):
     alias: str
     clave: str
 
+class RefreshToken(BaseModel):
+    refresh_token: str
+
 class UsuarioUpdate(BaseModel):
     pregunta_seguridad: str | None = None
     respuesta_seguridad: str | None = None
@@ -65,6 +88,28 @@ class CambiarTelefono(BaseModel):
 
 class CambiarDireccion(BaseModel):
     nueva_direccion: str
+
+# Edición parcial de la persona: solo se actualizan los campos enviados.
+# Nombre y apellido no admiten null (columnas NOT NULL); el resto sí
+class PersonaUpdate(BaseModel):
+    nombre: str = Field(None, min_length=1, max_length=50)
+    apellido: str = Field(None, min_length=1, max_length=50)
+    dni: Optional[str] = Field(None, min_length=1, max_length=20)
+    telefono: Optional[str] = Field(None, max_length=20)
+    direccion: Optional[str] = None
+
+class PersonaResponse(BaseModel):
+    id_persona: int
+    id_usuario: int
+    nombre: str
+    apellido: str
+    dni: Optional[str]
+    telefono: Optional[str]
+    direccion: Optional[str]
+    fecha_actualizacion: Optional[datetime]
+
+    class Config:
+        from_attributes = True
     
 class MascotaCreate(BaseModel):
     nombre_mascota: str
@@ -92,6 +137,8 @@ class FotoMascotaResponse(BaseModel):
     id_foto: int
     url: str
     descripcion: Optional[str] = None
+    miniatura: Optional[str] = None
+    variantes: Optional[Dict[str, str]] = None
 
     class Config:
         from_attributes = True
@@ -105,10 +152,34 @@ class MascotaResponse(BaseModel):
     edad: Optional[int]
     estado_mascota: Optional[str]
     descripcion: Optional[str]
-    fotos: List[FotoMascotaResponse] = []
+    # Se llena desde Mascota.fotos_activas (solo fotos no eliminadas)
+    fotos: List[FotoMascotaResponse] = Field(default=[], validation_alias=AliasChoices("fotos_activas", "fotos"))
 
     class Config:
-        from_attributes = True  
+        from_attributes = True
+
+class MascotaPagina(BaseModel):
+    items: List[MascotaResponse]
+    siguiente_cursor: Optional[str] = None
+
+# Ingreso de mascotas por lote
+class MascotaLoteItem(MascotaCreate):
+    fotos: List[FotoMascotaCreate] = []
+
+class MascotaLoteCreate(BaseModel):
+    mascotas: List[MascotaLoteItem] = Field(..., min_length=1, max_length=1000)
+
+class MascotaLoteCreada(BaseModel):
+    indice: int
+    id_mascota: int
+
+class MascotaLoteError(BaseModel):
+    indice: int
+    detalle: str
+
+class MascotaLoteResponse(BaseModel):
+    creadas: List[MascotaLoteCreada] = []
+    errores: List[MascotaLoteError] = []
 
 
 class AdopcionCreate(BaseModel):
@@ -118,11 +189,56 @@ class AdopcionCreate(BaseModel):
 class AsignarEntrevista(BaseModel):
     fecha_entrevista: datetime
     id_entrevistador: int
+    duracion_minutos: int = Field(60, ge=15, le=240)
+
+# Agenda de entrevistas
+class DisponibilidadCreate(BaseModel):
+    id_usuario: Optional[int] = None  # solo un administrador puede cargarla para otro usuario
+    dia_semana: int = Field(..., ge=0, le=6, description="0 = lunes ... 6 = domingo")
+    hora_inicio: time
+    hora_fin: time
+
+class DisponibilidadResponse(BaseModel):
+    id_disponibilidad: int
+    id_usuario: int
+    dia_semana: int
+    hora_inicio: time
+    hora_fin: time
+
+    class Config:
+        from_attributes = True
+
+class HorarioLibre(BaseModel):
+    id_entrevistador: int
+    inicio: datetime
+    fin: datetime
 
 class CambiarEstadoAdopcion(BaseModel):
     estado_adopcion: str
     respuesta: Optional[str] = None
 
+# Estadísticas de adopciones (tablero del personal)
+class ConteoEstado(BaseModel):
+    estado_adopcion: str
+    cantidad: int
+
+class ConteoMes(BaseModel):
+    mes: date
+    cantidad: int
+
+class ConteoEspecie(BaseModel):
+    id_especie: int
+    especie: Optional[str] = None
+    cantidad: int
+
+class EstadisticasAdopcion(BaseModel):
+    total: int = 0
+    con_entrevista: int = 0
+    promedio_dias_hasta_entrevista: Optional[float] = None
+    por_estado: List[ConteoEstado] = []
+    por_mes: List[ConteoMes] = []
+    por_especie: List[ConteoEspecie] = []
+
 class AdopcionResponse(BaseModel):
     id_adopcion: int
     id_perfil: int
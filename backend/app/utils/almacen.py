@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from fastapi import HTTPException, UploadFile
+from PIL import Image, UnidentifiedImageError
+
+# Directorio raíz del almacén local de archivos y prefijo público con el que se sirven
+MEDIA_DIR = os.path.abspath(os.getenv("MEDIA_DIR", "media"))
+MEDIA_URL = os.getenv("MEDIA_URL", "/media").rstrip("/")
+# Tamaño máximo aceptado por foto subida
+FOTO_MAX_BYTES = int(os.getenv("FOTO_MAX_BYTES", str(15 * 1024 * 1024)))
+TAMANO_BLOQUE = 1024 * 1024
+
+# Formatos aceptados según Pillow: (tipo MIME, extensión con la que se guarda el original).
+# El formato sale del contenido, el content_type del cliente solo se contrasta
+FORMATOS_IMAGEN = {
+    "JPEG": ("image/jpeg", "jpg"),
+    "PNG": ("image/png", "png"),
+    "WEBP": ("image/webp", "webp"),
+}
+
+
+# Rutas relativas dentro del almacén: los archivos se direccionan por el sha256 de su contenido,
+# así una misma imagen subida dos veces ocupa un solo archivo
+def ruta_original(hash_contenido: str, extension: str) -> str:
+    return f"originales/{hash_contenido[:2]}/{hash_contenido}.{extension}"
+
+
+def ruta_variante(hash_contenido: str, ancho: int) -> str:
+    return f"variantes/{hash_contenido[:2]}/{hash_contenido}/{ancho}.webp"
+
+
+def url_publica(ruta_relativa: str) -> str:
+    return f"{MEDIA_URL}/{ruta_relativa}"
+
+
+def ruta_absoluta(ruta_relativa: str) -> str:
+    return os.path.join(MEDIA_DIR, ruta_relativa)
+
+
+def _abrir_temporal():
+    directorio = ruta_absoluta("tmp")
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, uuid.uuid4().hex)
+    return ruta, open(ruta, "wb")
+
+
+# Lee solo la cabecera y devuelve el formato detectado por Pillow, o None si no es una imagen válida
+def _detectar_formato(ruta: str):
+    try:
+        with Image.open(ruta) as imagen:
+            formato = imagen.format
+            imagen.verify()
+        return formato
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        return None
+
+
+def _mover(origen: str, ruta_relativa: str) -> bool:
+    destino = ruta_absoluta(ruta_relativa)
+    if os.path.exists(destino):
+        os.remove(origen)
+        return False
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    os.replace(origen, destino)
+    return True
+
+
+# Copia la subida por bloques a un archivo temporal calculando el hash sobre la marcha (nunca se
+# tiene la imagen completa en memoria), comprueba el formato real y la mueve a su ruta definitiva.
+# Devuelve (hash, ruta relativa)
+async def guardar_subida(archivo: UploadFile) -> tuple[str, str]:
+    ruta_tmp, destino = await asyncio.to_thread(_abrir_temporal)
+    digest = hashlib.sha256()
+    total = 0
+    try:
+        while bloque := await archivo.read(TAMANO_BLOQUE):
+            total += len(bloque)
+            if total > FOTO_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="La imagen supera el tamaño máximo permitido")
+            digest.update(bloque)
+            await asyncio.to_thread(destino.write, bloque)
+    except BaseException:
+        destino.close()
+        await asyncio.to_thread(os.remove, ruta_tmp)
+        raise
+    destino.close()
+    if total == 0:
+        await asyncio.to_thread(os.remove, ruta_tmp)
+        raise HTTPException(status_code=400, detail="El archivo está vacío")
+    formato = await asyncio.to_thread(_detectar_formato, ruta_tmp)
+    if formato not in FORMATOS_IMAGEN:
+        await asyncio.to_thread(os.remove, ruta_tmp)
+        raise HTTPException(status_code=400, detail="Formato de imagen no soportado (usa JPEG, PNG o WebP)")
+    tipo, extension = FORMATOS_IMAGEN[formato]
+    if archivo.content_type != tipo:
+        await asyncio.to_thread(os.remove, ruta_tmp)
+        raise HTTPException(status_code=400, detail=f"El contenido es {tipo} pero se declaró {archivo.content_type}")
+    hash_contenido = digest.hexdigest()
+    ruta_relativa = ruta_original(hash_contenido, extension)
+    await asyncio.to_thread(_mover, ruta_tmp, ruta_relativa)
+    return hash_contenido, ruta_relativa
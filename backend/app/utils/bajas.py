@@ -0,0 +1,27 @@
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
+
+
+# Baja lógica de las filas activas de `modelo` que cumplen las condiciones y, siguiendo
+# models.BAJA_EN_CASCADA, de sus dependientes. Un UPDATE ... RETURNING por tabla y nivel, con los
+# ids dados de baja en el nivel anterior: el número de sentencias no depende de cuántas filas haya.
+# No hace commit; devuelve las filas dadas de baja por tabla
+async def dar_de_baja(db: AsyncSession, modelo, *condiciones) -> dict:
+    conteo = {}
+    pendientes = [(modelo, condiciones)]
+    while pendientes:
+        modelo, condiciones = pendientes.pop(0)
+        clave = modelo.__mapper__.primary_key[0]
+        ids = (await db.scalars(
+            update(modelo)
+            .where(*condiciones, modelo.estado == True)
+            .values(estado=False)
+            .returning(clave)
+            .execution_options(synchronize_session=False)
+        )).all()
+        conteo[modelo.__tablename__] = conteo.get(modelo.__tablename__, 0) + len(ids)
+        if ids:
+            for cascada in models.BAJA_EN_CASCADA.get(modelo, ()):
+                pendientes.append((cascada.modelo, (cascada.columna.in_(ids), *cascada.condiciones)))
+    return conteo
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from fastapi import Request, Response
+from .condicional import cabeceras_validacion, no_modificado, sin_cambios
+
+# Segundos que una entrada vive en memoria aunque nadie la invalide
+CATALOGO_CACHE_TTL = float(os.getenv("CATALOGO_CACHE_TTL", "300"))
+# Máximo de entradas en memoria; al superarlo se descarta la usada hace más tiempo (LRU).
+# Acota la memoria aunque un cliente recorra claves arbitrarias (p. ej. id_especie inexistentes)
+CATALOGO_CACHE_MAX = int(os.getenv("CATALOGO_CACHE_MAX", "1000"))
+# Backend compartido opcional (requiere el paquete redis). Con varios workers de uvicorn
+# guarda la versión de cada catálogo para que una escritura invalide la caché de todos
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+
+class EntradaCache:
+    __slots__ = ("cuerpo", "etag", "version", "vence")
+
+    def __init__(self, cuerpo: bytes, version: int, vence: float):
+        self.cuerpo = cuerpo
+        self.etag = '"' + hashlib.sha256(cuerpo).hexdigest()[:32] + '"'
+        self.version = version
+        self.vence = vence
+
+
+# Versiones por catálogo guardadas en el propio proceso (un solo worker)
+class VersionesLocales:
+    def __init__(self):
+        self._versiones = {}
+
+    async def obtener(self, espacio: str) -> int:
+        return self._versiones.get(espacio, 0)
+
+    async def incrementar(self, espacio: str):
+        self._versiones[espacio] = self._versiones.get(espacio, 0) + 1
+
+
+# Versiones por catálogo en Redis, compartidas entre workers y réplicas
+class VersionesRedis:
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("CACHE_REDIS_URL requiere el paquete redis (pip install redis)")
+        self._redis = redis_asyncio.from_url(url)
+
+    async def obtener(self, espacio: str) -> int:
+        return int(await self._redis.get(f"refugio:cache:{espacio}") or 0)
+
+    async def incrementar(self, espacio: str):
+        await self._redis.incr(f"refugio:cache:{espacio}")
+
+
+# Caché read-through de respuestas JSON ya serializadas, agrupadas por espacio ("especies", "razas").
+# Una entrada se descarta al vencer el TTL, cuando cambia la versión de su espacio o, si la caché
+# está llena, cuando es la usada hace más tiempo
+class CacheCatalogos:
+    def __init__(self, ttl: float, versiones, max_entradas: int):
+        self.ttl = ttl
+        self.versiones = versiones
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()  # (espacio, clave) -> EntradaCache, de la menos a la más usada
+
+    async def obtener(self, espacio: str, clave, cargar: Callable[[], Awaitable[bytes]]) -> EntradaCache:
+        version = await self.versiones.obtener(espacio)
+        llave = (espacio, clave)
+        entrada = self._entradas.get(llave)
+        if entrada is not None:
+            if entrada.version == version and entrada.vence > time.monotonic():
+                self._entradas.move_to_end(llave)
+                return entrada
+            del self._entradas[llave]
+        # La versión se leyó antes de cargar: si otra escritura ocurre mientras tanto,
+        # la próxima lectura verá una versión distinta y volverá a cargar
+        entrada = EntradaCache(await cargar(), version, time.monotonic() + self.ttl)
+        self._guardar(llave, entrada)
+        return entrada
+
+    def _guardar(self, llave, entrada: EntradaCache):
+        self._entradas[llave] = entrada
+        self._entradas.move_to_end(llave)
+        if len(self._entradas) <= self.max_entradas:
+            return
+        # Primero las vencidas; si no alcanza, las menos usadas
+        ahora = time.monotonic()
+        for vieja in [vieja for vieja, e in self._entradas.items() if e.vence <= ahora]:
+            del self._entradas[vieja]
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    async def invalidar(self, espacio: str):
+        for llave in [llave for llave in self._entradas if llave[0] == espacio]:
+            del self._entradas[llave]
+        await self.versiones.incrementar(espacio)
+
+
+cache_catalogos = CacheCatalogos(
+    CATALOGO_CACHE_TTL,
+    VersionesRedis(CACHE_REDIS_URL) if CACHE_REDIS_URL else VersionesLocales(),
+    CATALOGO_CACHE_MAX
+)
+
+
+# Responde con el cuerpo cacheado, o con 304 si el navegador ya tiene esa versión
+def responder_cacheado(request: Request, entrada: EntradaCache) -> Response:
+    if sin_cambios(request, entrada.etag):
+        return no_modificado(entrada.etag)
+    return Response(content=entrada.cuerpo, media_type="application/json", headers=cabeceras_validacion(entrada.etag))
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+# Las respuestas se guardan en el navegador pero se revalidan siempre (If-None-Match / If-Modified-Since)
+CACHE_CONTROL_REVALIDAR = "public, no-cache"
+
+
+def coincide_etag(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(valor.strip().removeprefix("W/") == etag for valor in if_none_match.split(","))
+
+
+# Fechas guardadas en UTC sin zona (datetime.utcnow) a formato HTTP
+def fecha_http(fecha: datetime) -> str:
+    return format_datetime(fecha.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def es_condicional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+# Verdadero si el cliente ya tiene esta versión. If-None-Match tiene prioridad sobre If-Modified-Since
+def sin_cambios(request: Request, etag: str, ultima_modificacion: Optional[datetime] = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return coincide_etag(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and ultima_modificacion is not None:
+        try:
+            desde = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # Una zona "-0000" llega sin tzinfo; las fechas HTTP siempre son UTC
+        if desde.tzinfo is None:
+            desde = desde.replace(tzinfo=timezone.utc)
+        return ultima_modificacion.replace(tzinfo=timezone.utc, microsecond=0) <= desde
+    return False
+
+
+def cabeceras_validacion(etag: str, ultima_modificacion: Optional[datetime] = None) -> dict:
+    cabeceras = {"ETag": etag, "Cache-Control": CACHE_CONTROL_REVALIDAR}
+    if ultima_modificacion is not None:
+        cabeceras["Last-Modified"] = fecha_http(ultima_modificacion)
+    return cabeceras
+
+
+def no_modificado(etag: str, ultima_modificacion: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=cabeceras_validacion(etag, ultima_modificacion))
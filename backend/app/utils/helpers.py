@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+# Las fechas se guardan en UTC sin zona (TIMESTAMP WITHOUT TIME ZONE, datetime.utcnow). Una fecha
+# recibida con zona ("...Z", "-03:00") se pasa a UTC y se le quita la zona para poder compararla
+def utc_sin_zona(momento: Optional[datetime]) -> Optional[datetime]:
+    if momento is None or momento.tzinfo is None:
+        return momento
+    return momento.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# Codifica la posición (fecha, id) de la última fila de una página como cursor opaco
+def codificar_cursor(fecha: datetime, id_registro: int) -> str:
+    crudo = json.dumps([fecha.isoformat(), id_registro]).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+# Decodifica un cursor generado por codificar_cursor
+def decodificar_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        fecha, id_registro = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return datetime.fromisoformat(fecha), int(id_registro)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+# Cursor para resultados ordenados por relevancia: (rango, id) de la última fila
+def codificar_cursor_rango(rango: float, id_registro: int) -> str:
+    crudo = json.dumps([rango, id_registro]).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor_rango(cursor: str) -> tuple[float, int]:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        rango, id_registro = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return float(rango), int(id_registro)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+# Cursor para listados con orden elegible: guarda el nombre del orden y los valores de la última fila
+def codificar_cursor_orden(orden: str, valores: list) -> str:
+    crudo = json.dumps([orden, *valores]).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+# Rechaza cursores de otro orden: sus valores no corresponden a las columnas actuales
+def decodificar_cursor_orden(cursor: str, orden: str) -> list:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        origen, *valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if origen != orden:
+        raise HTTPException(status_code=400, detail="El cursor corresponde a otro orden")
+    return valores
+
+
+# Escapa %, _ y \ para usar un texto del usuario como prefijo en LIKE ... ESCAPE '\'
+def patron_prefijo(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+# Total aproximado de filas de una consulta según el planificador (reltuples/relpages de pg_class y
+# pg_statistic), sin recorrer la tabla como COUNT(*). None fuera de Postgres
+async def estimar_filas(db: AsyncSession, consulta) -> Optional[int]:
+    conexion = await db.connection()
+    if conexion.dialect.name != "postgresql":
+        return None
+    sql = consulta.compile(dialect=conexion.dialect, compile_kwargs={"literal_binds": True})
+    # exec_driver_sql: el texto ya tiene los valores y no debe volver a interpretarse como parámetros
+    plan = (await conexion.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
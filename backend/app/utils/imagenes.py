@@ -0,0 +1,74 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from PIL import Image, ImageOps
+from .almacen import MEDIA_DIR, ruta_absoluta, ruta_variante, url_publica
+
+# Procesos dedicados a generar variantes; con 0 se generan en un hilo (útil en desarrollo)
+IMAGEN_WORKERS = int(os.getenv("IMAGEN_WORKERS", "2"))
+# Anchos (px) de las variantes WebP; la más chica es la miniatura del catálogo
+FOTO_ANCHOS = tuple(sorted(int(a) for a in os.getenv("FOTO_ANCHOS", "320,640,1280").split(",")))
+FOTO_CALIDAD_WEBP = int(os.getenv("FOTO_CALIDAD_WEBP", "80"))
+
+
+# Se ejecuta dentro de los procesos del pool. Genera las variantes que falten (las de una
+# imagen ya procesada se reutilizan) y devuelve {ancho: ruta relativa}
+def _generar_variantes(media_dir: str, ruta_original: str, hash_contenido: str, anchos: tuple, calidad: int) -> dict:
+    variantes = {}
+    with Image.open(os.path.join(media_dir, ruta_original)) as imagen:
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode not in ("RGB", "RGBA"):
+            imagen = imagen.convert("RGBA" if "A" in imagen.getbands() else "RGB")
+        for ancho in anchos:
+            # No se agranda: solo la variante más chica se genera aunque el original sea menor
+            if ancho > imagen.width and variantes:
+                break
+            relativa = ruta_variante(hash_contenido, ancho)
+            destino = os.path.join(media_dir, relativa)
+            if not os.path.exists(destino):
+                copia = imagen.copy()
+                copia.thumbnail((ancho, ancho * 10), Image.Resampling.LANCZOS)
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                temporal = f"{destino}.{uuid.uuid4().hex}.tmp"
+                copia.save(temporal, "WEBP", quality=calidad, method=4)
+                os.replace(temporal, destino)
+            variantes[ancho] = relativa
+    return variantes
+
+
+class ProcesadorImagenes:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _obtener_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    # Devuelve {"320": url, "640": url, ...}
+    async def generar_variantes(self, hash_contenido: str, ruta_original: str) -> dict:
+        args = (MEDIA_DIR, ruta_original, hash_contenido, FOTO_ANCHOS, FOTO_CALIDAD_WEBP)
+        if self.workers <= 0:
+            variantes = await asyncio.to_thread(_generar_variantes, *args)
+        else:
+            variantes = await asyncio.wrap_future(self._obtener_pool().submit(_generar_variantes, *args))
+        return {str(ancho): url_publica(relativa) for ancho, relativa in variantes.items()}
+
+    def cerrar(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+procesador_imagenes = ProcesadorImagenes(IMAGEN_WORKERS)
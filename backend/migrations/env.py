@@ -1,3 +1,4 @@
+import os
 import sys
 from logging.config import fileConfig
 from os.path import abspath, dirname
@@ -8,9 +9,17 @@ from alembic import context
 sys.path.insert(0, dirname(dirname(abspath(__file__))))
 # Añade el directorio backend al path
 from app.models import Base  # Cambiado de 'backend.app.models'
+from app.database import SQLALCHEMY_SYNC_DATABASE_URL
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
+# Permite apuntar las migraciones a la misma base que la API, con el driver síncrono
+# aunque DATABASE_URL indique +asyncpg ('%' se duplica por el formato del .ini)
+if os.getenv("DATABASE_URL"):
+    config.set_main_option(
+        "sqlalchemy.url",
+        SQLALCHEMY_SYNC_DATABASE_URL.render_as_string(hide_password=False).replace("%", "%%")
+    )
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
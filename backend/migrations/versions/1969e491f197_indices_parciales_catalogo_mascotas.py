@@ -0,0 +1,40 @@
+"""Indices parciales para el catalogo de mascotas
+
+Revision ID: 1969e491f197
+Revises: e5d8c48367d1
+Create Date: 2026-10-18 08:26:34.512093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1969e491f197'
+down_revision: Union[str, None] = 'e5d8c48367d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # La paginación por cursor ordena por fecha_registro, que no puede ser nula
+    op.execute("UPDATE mascotas SET fecha_registro = now() WHERE fecha_registro IS NULL")
+    op.alter_column('mascotas', 'fecha_registro', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_mascotas_activas_registro', 'mascotas', [sa.text('fecha_registro DESC'), sa.text('id_mascota DESC')], unique=False, postgresql_where=sa.text('estado = true'))
+    op.create_index('ix_mascotas_activas_especie', 'mascotas', ['id_especie', sa.text('fecha_registro DESC'), sa.text('id_mascota DESC')], unique=False, postgresql_where=sa.text('estado = true'))
+    op.create_index('ix_mascotas_activas_raza', 'mascotas', ['id_raza', sa.text('fecha_registro DESC'), sa.text('id_mascota DESC')], unique=False, postgresql_where=sa.text('estado = true'))
+    op.create_index('ix_mascotas_activas_estado_mascota', 'mascotas', ['estado_mascota', sa.text('fecha_registro DESC'), sa.text('id_mascota DESC')], unique=False, postgresql_where=sa.text('estado = true'))
+    op.create_index('ix_mascotas_activas_especie_edad', 'mascotas', ['id_especie', 'edad'], unique=False, postgresql_where=sa.text('estado = true'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_mascotas_activas_especie_edad', table_name='mascotas')
+    op.drop_index('ix_mascotas_activas_estado_mascota', table_name='mascotas')
+    op.drop_index('ix_mascotas_activas_raza', table_name='mascotas')
+    op.drop_index('ix_mascotas_activas_especie', table_name='mascotas')
+    op.drop_index('ix_mascotas_activas_registro', table_name='mascotas')
+    op.alter_column('mascotas', 'fecha_registro', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,95 @@
+"""Busqueda de texto completo y por similitud en mascotas
+
+Revision ID: 7c2f4e9a1b3d
+Revises: 1969e491f197
+Create Date: 2026-10-18 10:12:40.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2f4e9a1b3d'
+down_revision: Union[str, None] = '1969e491f197'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('mascotas', sa.Column('busqueda', postgresql.TSVECTOR(), nullable=True))
+
+    # Vector ponderado: nombre (A), especie y raza (B), descripción (C)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION mascotas_vector_busqueda(
+            p_nombre text, p_descripcion text, p_id_especie integer, p_id_raza integer
+        ) RETURNS tsvector AS $$
+            SELECT setweight(to_tsvector('spanish', coalesce(p_nombre, '')), 'A')
+                || setweight(to_tsvector('spanish', coalesce((SELECT nombre FROM especies WHERE id_especie = p_id_especie), '')), 'B')
+                || setweight(to_tsvector('spanish', coalesce((SELECT nombre FROM razas WHERE id_raza = p_id_raza), '')), 'B')
+                || setweight(to_tsvector('spanish', coalesce(p_descripcion, '')), 'C')
+        $$ LANGUAGE sql STABLE
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION mascotas_actualizar_busqueda() RETURNS trigger AS $$
+        BEGIN
+            NEW.busqueda := mascotas_vector_busqueda(NEW.nombre_mascota, NEW.descripcion, NEW.id_especie, NEW.id_raza);
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER tr_mascotas_busqueda
+        BEFORE INSERT OR UPDATE OF nombre_mascota, descripcion, id_especie, id_raza ON mascotas
+        FOR EACH ROW EXECUTE FUNCTION mascotas_actualizar_busqueda()
+    """)
+    # Si cambia el nombre de una especie o raza se recalculan las mascotas que la usan
+    op.execute("""
+        CREATE OR REPLACE FUNCTION mascotas_propagar_nombre() RETURNS trigger AS $$
+        BEGIN
+            IF TG_TABLE_NAME = 'especies' THEN
+                UPDATE mascotas SET busqueda = mascotas_vector_busqueda(nombre_mascota, descripcion, id_especie, id_raza)
+                WHERE id_especie = NEW.id_especie;
+            ELSE
+                UPDATE mascotas SET busqueda = mascotas_vector_busqueda(nombre_mascota, descripcion, id_especie, id_raza)
+                WHERE id_raza = NEW.id_raza;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER tr_especies_busqueda_mascotas
+        AFTER UPDATE OF nombre ON especies
+        FOR EACH ROW WHEN (OLD.nombre IS DISTINCT FROM NEW.nombre)
+        EXECUTE FUNCTION mascotas_propagar_nombre()
+    """)
+    op.execute("""
+        CREATE TRIGGER tr_razas_busqueda_mascotas
+        AFTER UPDATE OF nombre ON razas
+        FOR EACH ROW WHEN (OLD.nombre IS DISTINCT FROM NEW.nombre)
+        EXECUTE FUNCTION mascotas_propagar_nombre()
+    """)
+
+    # Rellena las filas existentes antes de crear los índices
+    op.execute("UPDATE mascotas SET busqueda = mascotas_vector_busqueda(nombre_mascota, descripcion, id_especie, id_raza)")
+    op.create_index('ix_mascotas_activas_busqueda', 'mascotas', ['busqueda'], unique=False, postgresql_using='gin', postgresql_where=sa.text('estado = true'))
+    op.create_index('ix_mascotas_activas_nombre_trgm', 'mascotas', ['nombre_mascota'], unique=False, postgresql_using='gin', postgresql_ops={'nombre_mascota': 'gin_trgm_ops'}, postgresql_where=sa.text('estado = true'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_mascotas_activas_nombre_trgm', table_name='mascotas')
+    op.drop_index('ix_mascotas_activas_busqueda', table_name='mascotas')
+    op.execute("DROP TRIGGER IF EXISTS tr_razas_busqueda_mascotas ON razas")
+    op.execute("DROP TRIGGER IF EXISTS tr_especies_busqueda_mascotas ON especies")
+    op.execute("DROP TRIGGER IF EXISTS tr_mascotas_busqueda ON mascotas")
+    op.execute("DROP FUNCTION IF EXISTS mascotas_propagar_nombre()")
+    op.execute("DROP FUNCTION IF EXISTS mascotas_actualizar_busqueda()")
+    op.execute("DROP FUNCTION IF EXISTS mascotas_vector_busqueda(text, text, integer, integer)")
+    op.drop_column('mascotas', 'busqueda')
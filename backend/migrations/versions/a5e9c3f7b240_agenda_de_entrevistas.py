@@ -0,0 +1,81 @@
+"""Agenda de entrevistas: disponibilidad y franjas sin solapamiento
+
+Revision ID: a5e9c3f7b240
+Revises: f2b6c8d4a913
+Create Date: 2026-10-18 13:20:44.517309
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5e9c3f7b240'
+down_revision: Union[str, None] = 'f2b6c8d4a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # btree_gist permite combinar "=" sobre enteros con "&&" sobre rangos en un mismo índice GiST
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.create_table(
+        'disponibilidad_entrevistador',
+        sa.Column('id_disponibilidad', sa.Integer(), nullable=False),
+        sa.Column('id_usuario', sa.Integer(), nullable=False),
+        sa.Column('dia_semana', sa.Integer(), nullable=False),
+        sa.Column('hora_inicio', sa.Time(), nullable=False),
+        sa.Column('hora_fin', sa.Time(), nullable=False),
+        sa.Column('estado', sa.Boolean(), nullable=True),
+        sa.CheckConstraint('dia_semana BETWEEN 0 AND 6', name='ck_disponibilidad_dia_semana'),
+        sa.CheckConstraint('hora_inicio < hora_fin', name='ck_disponibilidad_horas'),
+        sa.ForeignKeyConstraint(['id_usuario'], ['usuarios.id_usuario']),
+        sa.PrimaryKeyConstraint('id_disponibilidad')
+    )
+    op.create_index(op.f('ix_disponibilidad_entrevistador_id_disponibilidad'), 'disponibilidad_entrevistador', ['id_disponibilidad'], unique=False)
+    op.create_index(op.f('ix_disponibilidad_entrevistador_id_usuario'), 'disponibilidad_entrevistador', ['id_usuario'], unique=False)
+
+    op.add_column('adopciones', sa.Column('duracion_entrevista', sa.Integer(), server_default=sa.text('60'), nullable=False))
+    op.add_column('adopciones', sa.Column(
+        'franja_entrevista', postgresql.TSRANGE(),
+        # NULL sin fecha: tsrange(NULL, NULL) es el rango infinito y chocaría con todas las entrevistas
+        sa.Computed(
+            "CASE WHEN fecha_entrevista IS NULL THEN NULL "
+            "ELSE tsrange(fecha_entrevista, fecha_entrevista + duracion_entrevista * interval '1 minute') END",
+            persisted=True
+        ),
+        nullable=True
+    ))
+
+    # Las dobles reservas existentes deben resolverse a mano antes de crear la restricción
+    conflictos = op.get_bind().execute(sa.text("""
+        SELECT a.id_adopcion, b.id_adopcion
+        FROM adopciones a
+        JOIN adopciones b ON a.id_entrevistador = b.id_entrevistador
+            AND a.id_adopcion < b.id_adopcion
+            AND a.franja_entrevista && b.franja_entrevista
+        WHERE a.estado = true AND b.estado = true
+        LIMIT 20
+    """)).all()
+    if conflictos:
+        pares = ", ".join(f"{a}/{b}" for a, b in conflictos)
+        raise RuntimeError(f"Entrevistas solapadas (id_adopcion): {pares}. Reasígnalas antes de migrar.")
+
+    op.execute("""
+        ALTER TABLE adopciones ADD CONSTRAINT ex_adopciones_entrevista_solapada
+        EXCLUDE USING gist (id_entrevistador WITH =, franja_entrevista WITH &&) WHERE (estado = true)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE adopciones DROP CONSTRAINT IF EXISTS ex_adopciones_entrevista_solapada")
+    op.drop_column('adopciones', 'franja_entrevista')
+    op.drop_column('adopciones', 'duracion_entrevista')
+    op.drop_index(op.f('ix_disponibilidad_entrevistador_id_usuario'), table_name='disponibilidad_entrevistador')
+    op.drop_index(op.f('ix_disponibilidad_entrevistador_id_disponibilidad'), table_name='disponibilidad_entrevistador')
+    op.drop_table('disponibilidad_entrevistador')
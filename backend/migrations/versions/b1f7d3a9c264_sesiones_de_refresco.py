@@ -0,0 +1,47 @@
+"""Sesiones de refresco con hash del refresh token
+
+Revision ID: b1f7d3a9c264
+Revises: e9b4a6d2c715
+Create Date: 2026-10-18 18:12:05.331874
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1f7d3a9c264'
+down_revision: Union[str, None] = 'e9b4a6d2c715'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sesiones',
+        sa.Column('id_sesion', sa.Integer(), nullable=False),
+        sa.Column('id_usuario', sa.Integer(), nullable=False),
+        sa.Column('hash_token', sa.String(length=64), nullable=False),
+        sa.Column('hash_anterior', sa.String(length=64), nullable=True),
+        sa.Column('expira', sa.DateTime(), nullable=False),
+        sa.Column('estado', sa.Boolean(), nullable=True),
+        sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+        sa.Column('ultimo_uso', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['id_usuario'], ['usuarios.id_usuario']),
+        sa.PrimaryKeyConstraint('id_sesion'),
+        sa.UniqueConstraint('hash_token')
+    )
+    op.create_index(op.f('ix_sesiones_id_sesion'), 'sesiones', ['id_sesion'], unique=False)
+    op.create_index(op.f('ix_sesiones_id_usuario'), 'sesiones', ['id_usuario'], unique=False)
+    op.create_index(op.f('ix_sesiones_hash_anterior'), 'sesiones', ['hash_anterior'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_sesiones_hash_anterior'), table_name='sesiones')
+    op.drop_index(op.f('ix_sesiones_id_usuario'), table_name='sesiones')
+    op.drop_index(op.f('ix_sesiones_id_sesion'), table_name='sesiones')
+    op.drop_table('sesiones')
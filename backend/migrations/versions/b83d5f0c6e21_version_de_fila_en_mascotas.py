@@ -0,0 +1,32 @@
+"""Version de fila en mascotas
+
+Revision ID: b83d5f0c6e21
+Revises: 7c2f4e9a1b3d
+Create Date: 2026-10-18 11:03:52.640217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b83d5f0c6e21'
+down_revision: Union[str, None] = '7c2f4e9a1b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('mascotas', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    op.add_column('mascotas', sa.Column('fecha_actualizacion', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    # Las filas existentes toman como última modificación su fecha de registro
+    op.execute("UPDATE mascotas SET fecha_actualizacion = fecha_registro")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('mascotas', 'fecha_actualizacion')
+    op.drop_column('mascotas', 'version')
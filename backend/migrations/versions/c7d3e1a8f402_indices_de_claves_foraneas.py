@@ -0,0 +1,66 @@
+"""Índices en claves foráneas, índices parciales de filas activas y rol único por usuario
+
+Revision ID: c7d3e1a8f402
+Revises: a5e9c3f7b240
+Create Date: 2026-10-18 15:02:11.284730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d3e1a8f402'
+down_revision: Union[str, None] = 'a5e9c3f7b240'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (tabla, columna) de cada clave foránea que todavía no tenía índice.
+# personas.id_usuario ya es única y disponibilidad_entrevistador.id_usuario ya tenía índice
+CLAVES_FORANEAS = [
+    ('usuario_rol', 'id_rol'),
+    ('razas', 'id_especie'),
+    ('perfil_adopcion', 'id_persona'),
+    ('mascotas', 'registrado_por'),
+    ('fotos_mascota', 'id_mascota'),
+    ('adopciones', 'id_perfil'),
+    ('adopciones', 'id_mascota'),
+    ('adopciones', 'id_usuario'),
+    ('adopciones', 'id_entrevistador'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for tabla, columna in CLAVES_FORANEAS:
+        op.create_index(op.f(f'ix_{tabla}_{columna}'), tabla, [columna], unique=False)
+    op.create_index('ix_fotos_mascota_activas', 'fotos_mascota', ['id_mascota', 'id_foto'], unique=False, postgresql_where=sa.text('estado = true'))
+    op.create_index('ix_adopciones_activas_solicitud', 'adopciones', ['fecha_solicitud', 'id_adopcion'], unique=False, postgresql_where=sa.text('estado = true'))
+    op.create_index('ix_adopciones_activas_usuario', 'adopciones', ['id_usuario', 'fecha_solicitud'], unique=False, postgresql_where=sa.text('estado = true'))
+
+    # Antes de la restricción única se descartan las asignaciones repetidas: por cada (usuario, rol)
+    # queda la activa, y entre iguales la más antigua
+    op.execute("""
+        DELETE FROM usuario_rol a
+        USING usuario_rol b
+        WHERE a.id_usuario = b.id_usuario
+          AND a.id_rol = b.id_rol
+          AND (coalesce(b.estado, false), -b.id_ur) > (coalesce(a.estado, false), -a.id_ur)
+    """)
+    op.create_unique_constraint('uq_usuario_rol_usuario_rol', 'usuario_rol', ['id_usuario', 'id_rol'])
+    # Estadísticas al día para que el planificador considere los índices nuevos de inmediato
+    for tabla in sorted({tabla for tabla, _ in CLAVES_FORANEAS}):
+        op.execute(f"ANALYZE {tabla}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_usuario_rol_usuario_rol', 'usuario_rol', type_='unique')
+    op.drop_index('ix_adopciones_activas_usuario', table_name='adopciones')
+    op.drop_index('ix_adopciones_activas_solicitud', table_name='adopciones')
+    op.drop_index('ix_fotos_mascota_activas', table_name='fotos_mascota')
+    for tabla, columna in reversed(CLAVES_FORANEAS):
+        op.drop_index(op.f(f'ix_{tabla}_{columna}'), table_name=tabla)
@@ -0,0 +1,32 @@
+"""Variantes de fotos de mascota
+
+Revision ID: d41a7b2c9e58
+Revises: b83d5f0c6e21
+Create Date: 2026-10-18 11:47:09.381520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41a7b2c9e58'
+down_revision: Union[str, None] = 'b83d5f0c6e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('fotos_mascota', sa.Column('hash_contenido', sa.String(length=64), nullable=True))
+    op.add_column('fotos_mascota', sa.Column('variantes', sa.JSON(), nullable=True))
+    op.create_index(op.f('ix_fotos_mascota_hash_contenido'), 'fotos_mascota', ['hash_contenido'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_fotos_mascota_hash_contenido'), table_name='fotos_mascota')
+    op.drop_column('fotos_mascota', 'variantes')
+    op.drop_column('fotos_mascota', 'hash_contenido')
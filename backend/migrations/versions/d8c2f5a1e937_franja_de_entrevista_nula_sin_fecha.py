@@ -0,0 +1,48 @@
+"""Franja de entrevista NULL cuando la solicitud no tiene fecha
+
+Revision ID: d8c2f5a1e937
+Revises: b1f7d3a9c264
+Create Date: 2026-10-18 19:05:12.604418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8c2f5a1e937'
+down_revision: Union[str, None] = 'b1f7d3a9c264'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FRANJA = "tsrange(fecha_entrevista, fecha_entrevista + duracion_entrevista * interval '1 minute')"
+FRANJA_NULA_SIN_FECHA = f"CASE WHEN fecha_entrevista IS NULL THEN NULL ELSE {FRANJA} END"
+
+
+# Una columna generada no puede cambiar de expresión en PostgreSQL 16: se vuelve a crear junto con
+# la restricción de exclusión que la usa
+def _recrear_franja(expresion: str):
+    op.drop_constraint('ex_adopciones_entrevista_solapada', 'adopciones', type_='exclude')
+    op.drop_column('adopciones', 'franja_entrevista')
+    op.add_column('adopciones', sa.Column(
+        'franja_entrevista', postgresql.TSRANGE(), sa.Computed(expresion, persisted=True), nullable=True
+    ))
+    op.execute("""
+        ALTER TABLE adopciones ADD CONSTRAINT ex_adopciones_entrevista_solapada
+        EXCLUDE USING gist (id_entrevistador WITH =, franja_entrevista WITH &&) WHERE (estado = true)
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Con la expresión anterior, una solicitud activa con entrevistador y sin fecha tenía la franja (,)
+    # y bloqueaba toda la agenda de ese entrevistador
+    _recrear_franja(FRANJA_NULA_SIN_FECHA)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _recrear_franja(FRANJA)
@@ -0,0 +1,42 @@
+"""Índices del directorio de usuarios: prefijos de alias, correo y DNI, apellido
+
+Revision ID: e9b4a6d2c715
+Revises: c7d3e1a8f402
+Create Date: 2026-10-18 16:41:37.902158
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9b4a6d2c715'
+down_revision: Union[str, None] = 'c7d3e1a8f402'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm ya la instala 7c2f4e9a1b3d; se repite por si esa revisión se aplicó sin extensiones
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # text_pattern_ops permite usar el índice con LIKE 'prefijo%' en bases con collation distinta de C
+    op.create_index('ix_usuarios_activos_alias_prefijo', 'usuarios', [sa.text('lower(alias) text_pattern_ops')], unique=False, postgresql_where=sa.text('estado = true'))
+    op.create_index('ix_usuarios_activos_correo_prefijo', 'usuarios', [sa.text('lower(correo) text_pattern_ops')], unique=False, postgresql_where=sa.text('estado = true'))
+    op.create_index('ix_personas_activas_dni_prefijo', 'personas', ['dni'], unique=False, postgresql_ops={'dni': 'text_pattern_ops'}, postgresql_where=sa.text('estado = true'))
+    op.create_index('ix_personas_activas_apellido_trgm', 'personas', ['apellido'], unique=False, postgresql_using='gin', postgresql_ops={'apellido': 'gin_trgm_ops'}, postgresql_where=sa.text('estado = true'))
+    op.create_index('ix_personas_activas_apellido', 'personas', ['apellido', 'id_usuario'], unique=False, postgresql_where=sa.text('estado = true'))
+    # Las estimaciones de total del directorio salen de estas estadísticas
+    op.execute("ANALYZE usuarios")
+    op.execute("ANALYZE personas")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_personas_activas_apellido', table_name='personas')
+    op.drop_index('ix_personas_activas_apellido_trgm', table_name='personas')
+    op.drop_index('ix_personas_activas_dni_prefijo', table_name='personas')
+    op.drop_index('ix_usuarios_activos_correo_prefijo', table_name='usuarios')
+    op.drop_index('ix_usuarios_activos_alias_prefijo', table_name='usuarios')
@@ -0,0 +1,101 @@
+"""Resumen de adopciones para estadisticas
+
+Revision ID: f2b6c8d4a913
+Revises: d41a7b2c9e58
+Create Date: 2026-10-18 12:31:15.902746
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6c8d4a913'
+down_revision: Union[str, None] = 'd41a7b2c9e58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'resumen_adopciones',
+        sa.Column('mes', sa.Date(), nullable=False),
+        sa.Column('id_especie', sa.Integer(), nullable=False),
+        sa.Column('estado_adopcion', sa.String(length=20), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.Column('con_entrevista', sa.Integer(), nullable=False),
+        sa.Column('segundos_hasta_entrevista', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('mes', 'id_especie', 'estado_adopcion')
+    )
+
+    # Suma (signo = 1) o resta (signo = -1) la contribución de una solicitud a su grupo
+    op.execute("""
+        CREATE OR REPLACE FUNCTION resumen_adopciones_aplicar(
+            p_id_mascota integer, p_estado text, p_fecha_solicitud timestamp, p_fecha_entrevista timestamp, p_signo integer
+        ) RETURNS void AS $$
+            INSERT INTO resumen_adopciones AS r (mes, id_especie, estado_adopcion, cantidad, con_entrevista, segundos_hasta_entrevista)
+            VALUES (
+                date_trunc('month', p_fecha_solicitud)::date,
+                coalesce((SELECT id_especie FROM mascotas WHERE id_mascota = p_id_mascota), 0),
+                coalesce(p_estado, 'Sin estado'),
+                p_signo,
+                CASE WHEN p_fecha_entrevista IS NULL THEN 0 ELSE p_signo END,
+                CASE WHEN p_fecha_entrevista IS NULL THEN 0
+                     ELSE p_signo * extract(epoch FROM p_fecha_entrevista - p_fecha_solicitud) END
+            )
+            ON CONFLICT (mes, id_especie, estado_adopcion) DO UPDATE SET
+                cantidad = r.cantidad + EXCLUDED.cantidad,
+                con_entrevista = r.con_entrevista + EXCLUDED.con_entrevista,
+                segundos_hasta_entrevista = r.segundos_hasta_entrevista + EXCLUDED.segundos_hasta_entrevista
+        $$ LANGUAGE sql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION resumen_adopciones_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.estado IS TRUE AND OLD.fecha_solicitud IS NOT NULL THEN
+                PERFORM resumen_adopciones_aplicar(OLD.id_mascota, OLD.estado_adopcion, OLD.fecha_solicitud, OLD.fecha_entrevista, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.estado IS TRUE AND NEW.fecha_solicitud IS NOT NULL THEN
+                PERFORM resumen_adopciones_aplicar(NEW.id_mascota, NEW.estado_adopcion, NEW.fecha_solicitud, NEW.fecha_entrevista, 1);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    # Solo se dispara cuando cambia algo que afecta al resumen (cambiar_estado, asignar_entrevista, bajas)
+    op.execute("""
+        CREATE TRIGGER tr_adopciones_resumen
+        AFTER INSERT OR DELETE OR UPDATE OF id_mascota, estado_adopcion, fecha_solicitud, fecha_entrevista, estado
+        ON adopciones
+        FOR EACH ROW EXECUTE FUNCTION resumen_adopciones_trigger()
+    """)
+    # Reconstrucción completa (carga inicial, o para corregir desvíos, p. ej. si una mascota cambió de especie)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION recalcular_resumen_adopciones() RETURNS void AS $$
+            DELETE FROM resumen_adopciones;
+            INSERT INTO resumen_adopciones (mes, id_especie, estado_adopcion, cantidad, con_entrevista, segundos_hasta_entrevista)
+            SELECT date_trunc('month', a.fecha_solicitud)::date,
+                   coalesce(m.id_especie, 0),
+                   coalesce(a.estado_adopcion, 'Sin estado'),
+                   count(*),
+                   count(a.fecha_entrevista),
+                   coalesce(sum(extract(epoch FROM a.fecha_entrevista - a.fecha_solicitud)), 0)
+            FROM adopciones a
+            LEFT JOIN mascotas m ON m.id_mascota = a.id_mascota
+            WHERE a.estado IS TRUE AND a.fecha_solicitud IS NOT NULL
+            GROUP BY 1, 2, 3;
+        $$ LANGUAGE sql
+    """)
+    op.execute("SELECT recalcular_resumen_adopciones()")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS tr_adopciones_resumen ON adopciones")
+    op.execute("DROP FUNCTION IF EXISTS recalcular_resumen_adopciones()")
+    op.execute("DROP FUNCTION IF EXISTS resumen_adopciones_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS resumen_adopciones_aplicar(integer, text, timestamp, timestamp, integer)")
+    op.drop_table('resumen_adopciones')
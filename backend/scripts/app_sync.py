@@ -0,0 +1,45 @@
+# Réplica síncrona (Session + def, psycopg2) de los endpoints de lectura más usados,
+# para comparar contra la API async con scripts/bench_carga.py.
+# Uso (desde backend/): uvicorn scripts.app_sync:app --port 5001
+from typing import List
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+from app import models, schemas
+from app.database import SessionLocal
+
+app = FastAPI(title="Refugio (stack síncrono de referencia)")
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def consultar_mascotas():
+    return select(models.Mascota).options(selectinload(models.Mascota.fotos_activas)).where(models.Mascota.estado == True)
+
+
+@app.get("/mascotas/", response_model=schemas.MascotaPagina)
+def listar_mascotas(limite: int = 20, db: Session = Depends(get_db)):
+    mascotas = db.scalars(
+        consultar_mascotas().order_by(models.Mascota.fecha_registro.desc(), models.Mascota.id_mascota.desc()).limit(limite)
+    ).all()
+    return {"items": mascotas, "siguiente_cursor": None}
+
+
+@app.get("/mascotas/{id_mascota}", response_model=schemas.MascotaResponse)
+def obtener_mascota(id_mascota: int, db: Session = Depends(get_db)):
+    mascota = db.scalar(consultar_mascotas().where(models.Mascota.id_mascota == id_mascota))
+    if not mascota:
+        raise HTTPException(status_code=404, detail="Mascota no encontrada")
+    return mascota
+
+
+# Sin caché, a diferencia de la API async: no sirve para comparar drivers (no está en las rutas por defecto)
+@app.get("/especies/", response_model=List[schemas.EspecieResponse])
+def listar_especies(db: Session = Depends(get_db)):
+    return db.scalars(select(models.Especie).where(models.Especie.estado == True)).all()
@@ -0,0 +1,80 @@
+# Benchmark de carga: requests por segundo y latencias (p50/p95/p99) de una o más rutas.
+# Para comparar los stacks síncrono y asíncrono contra el mismo Postgres local:
+#   uvicorn app.main:app --port 5000 --workers 1
+#   uvicorn scripts.app_sync:app --port 5001 --workers 1
+#   python -m scripts.bench_carga --url http://localhost:5000 --url http://localhost:5001
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+# Solo rutas que ambos stacks resuelven contra la base. /especies/ y /razas/ quedan fuera: en la API
+# async salen de la caché de catálogos (utils/cache.py) y la comparación mediría la caché, no el driver
+RUTAS_POR_DEFECTO = ["/mascotas/?limite=20", "/mascotas/1"]
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)
+    return ordenados[indice]
+
+
+async def usuario_virtual(cliente: httpx.AsyncClient, rutas: list, fin: float, latencias: list, errores: list):
+    i = 0
+    while time.perf_counter() < fin:
+        ruta = rutas[i % len(rutas)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            respuesta = await cliente.get(ruta)
+            if respuesta.status_code >= 500:
+                errores.append(respuesta.status_code)
+        except httpx.HTTPError as error:
+            errores.append(type(error).__name__)
+        latencias.append(time.perf_counter() - inicio)
+
+
+async def medir(url: str, rutas: list, concurrencia: int, duracion: float) -> dict:
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30) as cliente:
+        # Calentamiento: abre conexiones y llena cachés antes de medir
+        await asyncio.gather(*[cliente.get(r) for r in rutas])
+        latencias, errores = [], []
+        inicio = time.perf_counter()
+        fin = inicio + duracion
+        await asyncio.gather(*[
+            usuario_virtual(cliente, rutas, fin, latencias, errores) for _ in range(concurrencia)
+        ])
+        transcurrido = time.perf_counter() - inicio
+    return {
+        "url": url,
+        "requests": len(latencias),
+        "errores": len(errores),
+        "rps": len(latencias) / transcurrido,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+        "media_ms": statistics.fmean(latencias) * 1000 if latencias else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga de la API")
+    parser.add_argument("--url", action="append", required=True, help="URL base a medir (repetible)")
+    parser.add_argument("--ruta", action="append", help="Ruta a consultar (repetible)")
+    parser.add_argument("--concurrencia", type=int, default=64)
+    parser.add_argument("--duracion", type=float, default=20.0, help="Segundos de medición por URL")
+    args = parser.parse_args()
+    rutas = args.ruta or RUTAS_POR_DEFECTO
+
+    print(f"{'url':<28} {'requests':>9} {'errores':>8} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for url in args.url:
+        r = asyncio.run(medir(url, rutas, args.concurrencia, args.duracion))
+        print(f"{r['url']:<28} {r['requests']:>9} {r['errores']:>8} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
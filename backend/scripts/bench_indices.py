@@ -0,0 +1,242 @@
+# Benchmark de índices: siembra un volumen grande de datos sintéticos y guarda los planes
+# (EXPLAIN ANALYZE, BUFFERS) de las consultas más frecuentes, para comparar antes y después
+# de la migración de índices. Uso (desde backend/, contra un Postgres de pruebas):
+#   python -m scripts.bench_indices sembrar --escala 200000
+#   alembic downgrade a5e9c3f7b240 && python -m scripts.bench_indices planes --etiqueta antes
+#   alembic upgrade head          && python -m scripts.bench_indices planes --etiqueta despues
+#   python -m scripts.bench_indices comparar antes despues
+#   python -m scripts.bench_indices limpiar
+import argparse
+import json
+import os
+import re
+import time
+from sqlalchemy import text
+from app.database import engine
+
+# Prefijo de todo lo sembrado, para poder borrarlo sin tocar datos reales
+PREFIJO = "bench_"
+DIRECTORIO_PLANES = "planes_explain"
+
+# Todas las filas salen de generate_series en el servidor: una sentencia por tabla, sin ida y vuelta
+# por fila. Uno de cada diez registros queda dado de baja (estado = false), como en el uso real
+SIEMBRA = [
+    ("especies", """
+        INSERT INTO especies (nombre, estado, fecha_registro)
+        SELECT :prefijo || 'especie_' || g, g % 10 <> 0, now()
+        FROM generate_series(1, 20) g
+    """),
+    ("razas", """
+        INSERT INTO razas (id_especie, nombre, estado, fecha_registro)
+        SELECT e.id_especie, :prefijo || 'raza_' || e.id_especie || '_' || g, g % 10 <> 0, now()
+        FROM especies e CROSS JOIN generate_series(1, 15) g
+        WHERE e.nombre LIKE :prefijo || '%'
+    """),
+    ("usuarios", """
+        INSERT INTO usuarios (correo, alias, clave, estado, fecha_registro)
+        SELECT :prefijo || g || '@ejemplo.org', :prefijo || 'u' || g, 'x', g % 10 <> 0,
+               now() - (g % 1000) * interval '1 day'
+        FROM generate_series(1, :escala) g
+    """),
+    ("personas", """
+        INSERT INTO personas (id_usuario, nombre, apellido, dni, telefono, estado)
+        SELECT u.id_usuario, 'Nombre', 'Apellido' || (u.id_usuario % 5000), :prefijo || u.id_usuario, '000', u.estado
+        FROM usuarios u
+        WHERE u.alias LIKE :prefijo || '%'
+    """),
+    ("usuario_rol", """
+        INSERT INTO usuario_rol (id_usuario, id_rol, estado, fecha_asignacion)
+        SELECT u.id_usuario, r.roles[1 + u.id_usuario % array_length(r.roles, 1)], true, now()
+        FROM usuarios u, (SELECT array_agg(id_rol ORDER BY id_rol) AS roles FROM roles) r
+        WHERE u.alias LIKE :prefijo || '%' AND r.roles IS NOT NULL
+    """),
+    ("perfil_adopcion", """
+        INSERT INTO perfil_adopcion (id_persona, direccion, tipo_vivienda, mascota, estado, fecha_creacion)
+        SELECT p.id_persona, 'Calle ' || p.id_persona, 'Casa', p.id_persona % 2 = 0, p.id_persona % 10 <> 0, now()
+        FROM personas p
+        WHERE p.dni LIKE :prefijo || '%'
+    """),
+    ("mascotas", """
+        WITH razas_bench AS (
+            SELECT array_agg(id_raza ORDER BY id_raza) AS ids FROM razas WHERE nombre LIKE :prefijo || '%'
+        ), usuarios_bench AS (
+            SELECT min(id_usuario) AS primero FROM usuarios WHERE alias LIKE :prefijo || '%'
+        )
+        INSERT INTO mascotas (nombre_mascota, sexo, id_especie, id_raza, edad, estado_mascota,
+                              fecha_registro, registrado_por, estado)
+        SELECT :prefijo || 'm' || g, CASE WHEN g % 2 = 0 THEN 'Macho' ELSE 'Hembra' END,
+               r.id_especie, r.id_raza, g % 15, (ARRAY['Disponible', 'Adoptado', 'En tratamiento'])[1 + g % 3],
+               now() - (g % 2000) * interval '1 hour', ub.primero + g % :escala, g % 10 <> 0
+        FROM generate_series(1, :escala) g
+        CROSS JOIN razas_bench rb
+        CROSS JOIN usuarios_bench ub
+        JOIN razas r ON r.id_raza = rb.ids[1 + g % array_length(rb.ids, 1)]
+    """),
+    ("fotos_mascota", """
+        INSERT INTO fotos_mascota (id_mascota, url, estado, fecha_registro)
+        SELECT m.id_mascota, '/media/' || m.id_mascota || '_' || g || '.jpg', g <> 3, now()
+        FROM mascotas m CROSS JOIN generate_series(1, 3) g
+        WHERE m.nombre_mascota LIKE :prefijo || '%'
+    """),
+    # Los ids de cada tabla sembrada son consecutivos (una sola sentencia por tabla).
+    # Entrevistas cada dos horas para un único entrevistador: no chocan con la restricción de exclusión
+    ("adopciones", """
+        WITH base AS (
+            SELECT
+                (SELECT min(pa.id_perfil) FROM perfil_adopcion pa JOIN personas p ON p.id_persona = pa.id_persona
+                 WHERE p.dni LIKE :prefijo || '%') AS perfil,
+                (SELECT min(id_mascota) FROM mascotas WHERE nombre_mascota LIKE :prefijo || '%') AS mascota,
+                (SELECT min(id_usuario) FROM usuarios WHERE alias LIKE :prefijo || '%') AS entrevistador
+        )
+        INSERT INTO adopciones (id_perfil, id_mascota, id_usuario, estado_adopcion, fecha_solicitud,
+                                fecha_entrevista, id_entrevistador, estado)
+        SELECT pa.id_perfil, b.mascota + g % :escala, p.id_usuario,
+               (ARRAY['Pendiente', 'En revisión', 'Aprobada', 'Rechazada'])[1 + g % 4],
+               now() - (g % 5000) * interval '1 hour',
+               CASE WHEN g % 4 = 1 THEN timestamp '2020-01-01' + g * interval '2 hours' END,
+               CASE WHEN g % 4 = 1 THEN b.entrevistador END,
+               g % 10 <> 0
+        FROM generate_series(1, 2 * :escala) g
+        CROSS JOIN base b
+        JOIN perfil_adopcion pa ON pa.id_perfil = b.perfil + g % :escala
+        JOIN personas p ON p.id_persona = pa.id_persona
+    """),
+]
+
+LIMPIEZA = [
+    ("adopciones", "DELETE FROM adopciones WHERE id_usuario IN (SELECT id_usuario FROM usuarios WHERE alias LIKE :prefijo || '%')"),
+    ("fotos_mascota", "DELETE FROM fotos_mascota WHERE id_mascota IN (SELECT id_mascota FROM mascotas WHERE nombre_mascota LIKE :prefijo || '%')"),
+    ("mascotas", "DELETE FROM mascotas WHERE nombre_mascota LIKE :prefijo || '%'"),
+    ("perfil_adopcion", "DELETE FROM perfil_adopcion WHERE id_persona IN (SELECT id_persona FROM personas WHERE dni LIKE :prefijo || '%')"),
+    ("usuario_rol", "DELETE FROM usuario_rol WHERE id_usuario IN (SELECT id_usuario FROM usuarios WHERE alias LIKE :prefijo || '%')"),
+    ("personas", "DELETE FROM personas WHERE dni LIKE :prefijo || '%'"),
+    ("usuarios", "DELETE FROM usuarios WHERE alias LIKE :prefijo || '%'"),
+    ("razas", "DELETE FROM razas WHERE nombre LIKE :prefijo || '%'"),
+    ("especies", "DELETE FROM especies WHERE nombre LIKE :prefijo || '%'"),
+]
+
+# Valores de ejemplo para las consultas, tomados de los datos sembrados (a mitad de rango)
+PARAMETROS = """
+    SELECT
+        (SELECT id_usuario FROM adopciones WHERE id_usuario IS NOT NULL ORDER BY id_adopcion DESC OFFSET 1000 LIMIT 1) AS id_usuario,
+        (SELECT id_mascota FROM adopciones ORDER BY id_adopcion DESC OFFSET 1000 LIMIT 1) AS id_mascota,
+        (SELECT id_persona FROM perfil_adopcion ORDER BY id_perfil DESC OFFSET 1000 LIMIT 1) AS id_persona,
+        (SELECT id_especie FROM razas ORDER BY id_raza DESC LIMIT 1) AS id_especie,
+        (SELECT max(id_rol) FROM usuario_rol) AS id_rol,
+        (SELECT max(id_mascota) FROM mascotas) AS ultima_mascota,
+        (SELECT max(fecha_solicitud) - interval '3 days' FROM adopciones) AS desde
+"""
+
+# Consultas equivalentes a las de los routers (mis-solicitudes, exportación, perfiles, catálogo, roles...)
+CONSULTAS = {
+    "adopciones_de_usuario": "SELECT * FROM adopciones WHERE id_usuario = :id_usuario AND estado = true",
+    "adopciones_de_mascota": "SELECT id_adopcion, estado_adopcion FROM adopciones WHERE id_mascota = :id_mascota",
+    "exportacion_por_fecha": """
+        SELECT id_adopcion, id_perfil, id_mascota, estado_adopcion, fecha_solicitud FROM adopciones
+        WHERE estado = true AND fecha_solicitud >= :desde ORDER BY fecha_solicitud, id_adopcion LIMIT 1000
+    """,
+    "perfiles_de_persona": "SELECT * FROM perfil_adopcion WHERE id_persona = :id_persona AND estado = true",
+    "persona_de_usuario": "SELECT * FROM personas WHERE id_usuario = :id_usuario AND estado = true",
+    "razas_de_especie": "SELECT * FROM razas WHERE id_especie = :id_especie AND estado = true",
+    "fotos_activas_de_pagina": """
+        SELECT * FROM fotos_mascota
+        WHERE id_mascota IN (SELECT generate_series(:ultima_mascota - 19, :ultima_mascota)) AND estado = true
+        ORDER BY id_mascota, id_foto
+    """,
+    "roles_de_usuario": """
+        SELECT r.descripcion FROM usuario_rol ur JOIN roles r ON r.id_rol = ur.id_rol
+        WHERE ur.id_usuario = :id_usuario AND ur.estado = true AND r.estado = true
+    """,
+    "usuarios_con_rol": "SELECT id_usuario FROM usuario_rol WHERE id_rol = :id_rol AND estado = true LIMIT 50",
+}
+
+
+def sembrar(escala: int):
+    with engine.begin() as conn:
+        for tabla, sentencia in SIEMBRA:
+            inicio = time.perf_counter()
+            filas = conn.execute(text(sentencia), {"prefijo": PREFIJO, "escala": escala}).rowcount
+            print(f"{tabla:<18} {filas:>10} filas {time.perf_counter() - inicio:>8.1f} s")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE"))
+
+
+def limpiar():
+    with engine.begin() as conn:
+        for tabla, sentencia in LIMPIEZA:
+            filas = conn.execute(text(sentencia), {"prefijo": PREFIJO}).rowcount
+            print(f"{tabla:<18} {filas:>10} filas borradas")
+
+
+def _resumir(plan: str) -> dict:
+    tiempo = re.search(r"Execution Time: ([\d.]+) ms", plan)
+    return {
+        "ms": float(tiempo.group(1)) if tiempo else None,
+        "seq_scan": sorted(set(re.findall(r"Seq Scan on (\w+)", plan))),
+        "indices": sorted(set(re.findall(r"(?:Index|Index Only|Bitmap Index) Scan (?:Backward )?(?:using|on) (\w+)", plan))),
+    }
+
+
+def planes(etiqueta: str, repeticiones: int):
+    os.makedirs(DIRECTORIO_PLANES, exist_ok=True)
+    resumen = {}
+    with engine.connect() as conn:
+        parametros = dict(conn.execute(text(PARAMETROS)).mappings().one())
+        with open(os.path.join(DIRECTORIO_PLANES, f"{etiqueta}.txt"), "w", encoding="utf-8") as salida:
+            for nombre, sql in CONSULTAS.items():
+                # La primera ejecución calienta la caché; se guarda la de menor tiempo
+                mejores = None
+                for _ in range(repeticiones + 1):
+                    filas = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + sql), parametros).scalars().all()
+                    plan = "\n".join(filas)
+                    datos = _resumir(plan)
+                    if mejores is None or (datos["ms"] or 0) < (mejores[1]["ms"] or 0):
+                        mejores = (plan, datos)
+                plan, resumen[nombre] = mejores
+                salida.write(f"-- {nombre}\n{' '.join(sql.split())}\n\n{plan}\n\n")
+                print(f"{nombre:<26} {resumen[nombre]['ms']:>10.3f} ms  seq: {','.join(resumen[nombre]['seq_scan']) or '-'}")
+    with open(os.path.join(DIRECTORIO_PLANES, f"{etiqueta}.json"), "w", encoding="utf-8") as salida:
+        json.dump({"parametros": {k: str(v) for k, v in parametros.items()}, "consultas": resumen}, salida, indent=2)
+    print(f"planes guardados en {DIRECTORIO_PLANES}/{etiqueta}.txt")
+
+
+def comparar(antes: str, despues: str):
+    def cargar(etiqueta):
+        with open(os.path.join(DIRECTORIO_PLANES, f"{etiqueta}.json"), encoding="utf-8") as entrada:
+            return json.load(entrada)["consultas"]
+    a, d = cargar(antes), cargar(despues)
+    print(f"{'consulta':<26} {antes + ' ms':>12} {despues + ' ms':>12} {'mejora':>8}  índices ({despues})")
+    for nombre in CONSULTAS:
+        if nombre not in a or nombre not in d:
+            continue
+        ms_a, ms_d = a[nombre]["ms"], d[nombre]["ms"]
+        mejora = f"{ms_a / ms_d:.1f}x" if ms_a and ms_d else "-"
+        print(f"{nombre:<26} {ms_a:>12.3f} {ms_d:>12.3f} {mejora:>8}  {','.join(d[nombre]['indices']) or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de índices con planes EXPLAIN")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("sembrar", help="Inserta datos sintéticos")
+    p.add_argument("--escala", type=int, default=100000, help="Usuarios y mascotas (adopciones: el doble)")
+    p = sub.add_parser("planes", help="Guarda los planes de las consultas frecuentes")
+    p.add_argument("--etiqueta", required=True, help="Nombre de la corrida, p. ej. antes o despues")
+    p.add_argument("--repeticiones", type=int, default=3)
+    p = sub.add_parser("comparar", help="Compara dos corridas guardadas")
+    p.add_argument("antes")
+    p.add_argument("despues")
+    sub.add_parser("limpiar", help="Borra los datos sembrados")
+    args = parser.parse_args()
+
+    if args.comando == "sembrar":
+        sembrar(args.escala)
+    elif args.comando == "planes":
+        planes(args.etiqueta, args.repeticiones)
+    elif args.comando == "comparar":
+        comparar(args.antes, args.despues)
+    else:
+        limpiar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# Micro-benchmark: costo de autenticación por request con y sin la caché de tokens.
+# Uso (desde backend/): python -m scripts.bench_jwt_cache [iteraciones]
+import sys
+import timeit
+from jose import jwt
+from app.auth.jwt_handler import crear_token, SECRET_KEY, ALGORITHM
+from app.auth.dependencies import verificar_token, cache_tokens
+
+
+def main():
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    token = crear_token({
+        "sub": "bench",
+        "id_usuario": 1,
+        "roles": ["Usuario"],
+        "modulos": {"modulo_principal": True}
+    })
+    cache_tokens.limpiar()
+
+    sin_cache = timeit.timeit(lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]), number=iteraciones)
+    verificar_token(token)  # calienta la caché
+    con_cache = timeit.timeit(lambda: verificar_token(token), number=iteraciones)
+
+    print(f"iteraciones: {iteraciones}")
+    print(f"sin caché (jwt.decode): {sin_cache / iteraciones * 1e6:8.2f} µs/request")
+    print(f"con caché             : {con_cache / iteraciones * 1e6:8.2f} µs/request")
+    print(f"aceleración           : {sin_cache / con_cache:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# Prueba de carga por escenarios: usuarios virtuales que recorren flujos completos (login,
+# catálogo, solicitud de adopción y tareas del personal) y reporte de throughput y latencias
+# (p50/p95/p99) por escenario y por paso. Usa las credenciales del manifiesto de scripts/generar_datos.py:
+#   python -m scripts.generar_datos --usuarios 20000 --mascotas 10000
+#   CACHE_REDIS_URL=redis://localhost:6379/0 uvicorn app.main:app --port 5000 --workers 4
+# (con varios workers, CACHE_REDIS_URL comparte entre ellos la caché de catálogos y las revocaciones de tokens)
+#   python -m scripts.escenarios_carga --url http://localhost:5000 --duracion 60 --max-p95 500
+# Con --max-p95 / --max-errores termina con código 1 si algún escenario se pasa (para CI)
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+import httpx
+from scripts.bench_carga import percentil
+
+MEZCLA_POR_DEFECTO = "login=1,catalogo=6,adopcion=2,personal=1"
+BUSQUEDAS = ["luna", "perro", "gato tranquilo", "cachorro", "milo", "sociable"]
+
+
+class ErrorPaso(Exception):
+    pass
+
+
+class Resultados:
+    def __init__(self):
+        self.latencias = defaultdict(list)  # (escenario, paso) -> [segundos]
+        self.errores = defaultdict(int)
+        self.flujos = defaultdict(int)
+        self.flujos_fallidos = defaultdict(int)
+
+
+# Un usuario virtual con identidad propia (adoptante o voluntario) y su token
+class UsuarioVirtual:
+    def __init__(self, cliente: httpx.AsyncClient, datos: dict, resultados: Resultados, rng: random.Random):
+        self.cliente = cliente
+        self.datos = datos
+        self.resultados = resultados
+        self.rng = rng
+        self.tokens = {}
+        self.indices = {}
+
+    async def pedir(self, escenario: str, paso: str, metodo: str, ruta: str, esperado=(200,), **kwargs) -> httpx.Response:
+        inicio = time.perf_counter()
+        try:
+            respuesta = await self.cliente.request(metodo, ruta, **kwargs)
+        except httpx.HTTPError as error:
+            self.resultados.errores[(escenario, paso)] += 1
+            raise ErrorPaso(f"{paso}: {type(error).__name__}")
+        finally:
+            self.resultados.latencias[(escenario, paso)].append(time.perf_counter() - inicio)
+        if respuesta.status_code not in esperado:
+            self.resultados.errores[(escenario, paso)] += 1
+            raise ErrorPaso(f"{paso}: HTTP {respuesta.status_code}")
+        return respuesta
+
+    def indice_al_azar(self, tipo: str) -> int:
+        return self.rng.randrange(self.datos["usuarios"] if tipo == "u" else self.datos["voluntarios"])
+
+    def alias(self, tipo: str, indice: int) -> str:
+        return f"{self.datos['prefijo']}{tipo}{indice}"
+
+    async def login(self, escenario: str, alias: str) -> str:
+        respuesta = await self.pedir(escenario, "login", "POST", "/security/login",
+                                     json={"alias": alias, "clave": self.datos["clave"]})
+        return respuesta.json()["access_token"]
+
+    # El token se obtiene una vez por usuario virtual y tipo de cuenta, como en una sesión real
+    async def cabeceras(self, escenario: str, tipo: str) -> dict:
+        if tipo not in self.tokens:
+            self.indices[tipo] = self.indice_al_azar(tipo)
+            self.tokens[tipo] = await self.login(escenario, self.alias(tipo, self.indices[tipo]))
+        return {"Authorization": f"Bearer {self.tokens[tipo]}"}
+
+
+async def escenario_login(vu: UsuarioVirtual):
+    await vu.login("login", vu.alias("u", vu.indice_al_azar("u")))
+
+
+async def escenario_catalogo(vu: UsuarioVirtual):
+    cursor = None
+    ids = []
+    for pagina in range(3):
+        params = {"limite": 20, **({"cursor": cursor} if cursor else {})}
+        cuerpo = (await vu.pedir("catalogo", f"listar_p{pagina + 1}", "GET", "/mascotas/", params=params)).json()
+        ids.extend(m["id_mascota"] for m in cuerpo["items"])
+        cursor = cuerpo.get("siguiente_cursor")
+        if not cursor:
+            break
+    if ids:
+        await vu.pedir("catalogo", "detalle", "GET", f"/mascotas/{vu.rng.choice(ids)}")
+    await vu.pedir("catalogo", "especies", "GET", "/especies/")
+    await vu.pedir("catalogo", "buscar", "GET", "/mascotas/buscar", params={"q": vu.rng.choice(BUSQUEDAS)})
+
+
+async def escenario_adopcion(vu: UsuarioVirtual):
+    cabeceras = await vu.cabeceras("adopcion", "u")
+    # Los perfiles generados son consecutivos, en el mismo orden que los adoptantes
+    id_perfil = vu.datos["primer_perfil"] + vu.indices["u"]
+    pagina = (await vu.pedir("adopcion", "disponibles", "GET", "/mascotas/",
+                             params={"limite": 20, "estado_mascota": "Disponible"})).json()
+    if pagina["items"]:
+        mascota = vu.rng.choice(pagina["items"])["id_mascota"]
+        await vu.pedir("adopcion", "solicitar", "POST", "/adopciones/", headers=cabeceras,
+                       json={"id_perfil": id_perfil, "id_mascota": mascota})
+    await vu.pedir("adopcion", "mis_solicitudes", "GET", "/adopciones/mis-solicitudes", headers=cabeceras)
+
+
+async def escenario_personal(vu: UsuarioVirtual):
+    cabeceras = await vu.cabeceras("personal", "v")
+    await vu.pedir("personal", "estadisticas", "GET", "/adopciones/estadisticas", headers=cabeceras)
+    exportacion = await vu.pedir("personal", "exportar_pendientes", "GET", "/adopciones/exportar", headers=cabeceras, params={
+        "desde": (date.today() - timedelta(days=1)).isoformat(), "estado_adopcion": "Pendiente"
+    })
+    pendientes = [json.loads(linea)["id_adopcion"] for linea in exportacion.text.splitlines()[:200] if linea]
+    if pendientes:
+        await vu.pedir("personal", "cambiar_estado", "PUT", f"/adopciones/{vu.rng.choice(pendientes)}/cambiar-estado",
+                       headers=cabeceras, json={"estado_adopcion": "En revisión", "respuesta": "Revisión de carga"})
+    await vu.pedir("personal", "horarios_libres", "GET", "/entrevistas/horarios-libres", headers=cabeceras,
+                   params={"cantidad": 10})
+
+
+ESCENARIOS = {
+    "login": escenario_login,
+    "catalogo": escenario_catalogo,
+    "adopcion": escenario_adopcion,
+    "personal": escenario_personal,
+}
+
+
+def leer_mezcla(texto: str) -> dict:
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        if nombre.strip() not in ESCENARIOS:
+            raise SystemExit(f"Escenario desconocido: {nombre} (disponibles: {', '.join(ESCENARIOS)})")
+        mezcla[nombre.strip()] = float(peso or 1)
+    return {nombre: peso for nombre, peso in mezcla.items() if peso > 0}
+
+
+async def bucle(vu: UsuarioVirtual, mezcla: dict, fin: float):
+    nombres, pesos = list(mezcla), list(mezcla.values())
+    while time.perf_counter() < fin:
+        nombre = vu.rng.choices(nombres, pesos)[0]
+        try:
+            await ESCENARIOS[nombre](vu)
+            vu.resultados.flujos[nombre] += 1
+        except (ErrorPaso, KeyError, ValueError):
+            vu.resultados.flujos_fallidos[nombre] += 1
+
+
+async def ejecutar(url: str, datos: dict, mezcla: dict, concurrencia: int, duracion: float, semilla: int):
+    resultados = Resultados()
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=30) as cliente:
+        fin = time.perf_counter() + duracion
+        inicio = time.perf_counter()
+        await asyncio.gather(*[
+            bucle(UsuarioVirtual(cliente, datos, resultados, random.Random(semilla + i)), mezcla, fin)
+            for i in range(concurrencia)
+        ])
+        transcurrido = time.perf_counter() - inicio
+    return resultados, transcurrido
+
+
+def resumir(latencias: list, errores: int, transcurrido: float) -> dict:
+    return {
+        "requests": len(latencias),
+        "errores": errores,
+        "rps": len(latencias) / transcurrido,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+        "media_ms": statistics.fmean(latencias) * 1000 if latencias else 0.0,
+    }
+
+
+def reporte(resultados: Resultados, transcurrido: float) -> dict:
+    informe = {}
+    for escenario in ESCENARIOS:
+        pasos = {paso: lat for (e, paso), lat in resultados.latencias.items() if e == escenario}
+        if not pasos:
+            continue
+        todas = [l for lat in pasos.values() for l in lat]
+        errores = sum(n for (e, _), n in resultados.errores.items() if e == escenario)
+        informe[escenario] = {
+            **resumir(todas, errores, transcurrido),
+            "flujos": resultados.flujos[escenario],
+            "flujos_fallidos": resultados.flujos_fallidos[escenario],
+            "flujos_por_segundo": resultados.flujos[escenario] / transcurrido,
+            "pasos": {paso: resumir(lat, resultados.errores[(escenario, paso)], transcurrido) for paso, lat in pasos.items()},
+        }
+    return informe
+
+
+def imprimir(informe: dict):
+    print(f"{'escenario / paso':<28} {'requests':>9} {'errores':>8} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for escenario, r in informe.items():
+        print(f"{escenario:<28} {r['requests']:>9} {r['errores']:>8} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+              f"   flujos: {r['flujos']} ({r['flujos_por_segundo']:.1f}/s, {r['flujos_fallidos']} fallidos)")
+        for paso, p in r["pasos"].items():
+            print(f"  {paso:<26} {p['requests']:>9} {p['errores']:>8} {p['rps']:>8.1f} {p['p50_ms']:>8.1f} {p['p95_ms']:>8.1f} {p['p99_ms']:>8.1f}")
+
+
+# Devuelve los escenarios que superan los umbrales
+def revisar_umbrales(informe: dict, max_p95: float = None, max_errores: float = None) -> list:
+    fallas = []
+    for escenario, r in informe.items():
+        if max_p95 is not None and r["p95_ms"] > max_p95:
+            fallas.append(f"{escenario}: p95 {r['p95_ms']:.1f} ms > {max_p95} ms")
+        tasa = r["errores"] / r["requests"] * 100 if r["requests"] else 0.0
+        if max_errores is not None and tasa > max_errores:
+            fallas.append(f"{escenario}: {tasa:.2f}% de errores > {max_errores}%")
+    return fallas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga por escenarios")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--datos", default="datos_carga.json", help="Manifiesto de scripts.generar_datos")
+    parser.add_argument("--mezcla", default=MEZCLA_POR_DEFECTO, help="Pesos por escenario, p. ej. catalogo=5,login=1")
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos de medición")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--max-p95", type=float, help="Falla si el p95 de algún escenario supera estos ms")
+    parser.add_argument("--max-errores", type=float, help="Falla si el porcentaje de errores de algún escenario lo supera")
+    parser.add_argument("--json", help="Guarda el informe completo en este archivo")
+    args = parser.parse_args()
+
+    with open(args.datos, encoding="utf-8") as entrada:
+        datos = json.load(entrada)
+    resultados, transcurrido = asyncio.run(ejecutar(
+        args.url, datos, leer_mezcla(args.mezcla), args.concurrencia, args.duracion, args.semilla
+    ))
+    informe = reporte(resultados, transcurrido)
+    imprimir(informe)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as salida:
+            json.dump({"url": args.url, "duracion": transcurrido, "escenarios": informe}, salida, indent=2)
+    fallas = revisar_umbrales(informe, args.max_p95, args.max_errores)
+    for falla in fallas:
+        print(f"UMBRAL SUPERADO  {falla}")
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == "__main__":
+    main()
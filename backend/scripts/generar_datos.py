@@ -0,0 +1,227 @@
+# Generador de datos sintéticos a escala de producción, cargados con COPY (psycopg2).
+# Las columnas salen de las tablas de app/models.py, así el generador falla si el modelo cambia.
+# Uso (desde backend/, contra un Postgres de pruebas con los roles ya creados):
+#   python -m scripts.generar_datos --usuarios 50000 --mascotas 20000 --adopciones 100000
+# Deja un manifiesto (datos_carga.json) con las credenciales que usa scripts/escenarios_carga.py
+import argparse
+import asyncio
+import csv
+import io
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from app import models
+from app.auth.hashing import servicio_hash
+from app.database import engine
+
+FILAS_POR_COPY = 50000
+CLAVE_POR_DEFECTO = "Carga-2026!"
+NOMBRES = ["Luna", "Rocky", "Milo", "Nala", "Toby", "Kira", "Simba", "Coco", "Lola", "Max", "Tom", "Mora"]
+APELLIDOS = ["García", "López", "Martínez", "Rodríguez", "Pérez", "Gómez", "Díaz", "Romero", "Sosa", "Torres"]
+ESTADOS_MASCOTA = ["Disponible", "Disponible", "Disponible", "En tratamiento", "Adoptado"]
+ESTADOS_ADOPCION = ["Pendiente", "Pendiente", "En revisión", "Aprobada", "Rechazada"]
+VIVIENDAS = ["Casa", "Departamento", "Casa con patio"]
+
+
+# Escribe las filas en bloques de FILAS_POR_COPY: un COPY por bloque, sin tener toda la tabla en memoria
+def copiar(cursor, modelo, columnas: list, filas) -> int:
+    tabla = modelo.__table__
+    desconocidas = [c for c in columnas if c not in tabla.c]
+    if desconocidas:
+        raise ValueError(f"{tabla.name} no tiene las columnas {desconocidas}")
+    sentencia = f"COPY {tabla.name} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)"
+    total = 0
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for i, fila in enumerate(filas, 1):
+        escritor.writerow(fila)
+        if i % FILAS_POR_COPY == 0:
+            buffer.seek(0)
+            cursor.copy_expert(sentencia, buffer)
+            buffer.seek(0)
+            buffer.truncate()
+        total = i
+    if buffer.tell():
+        buffer.seek(0)
+        cursor.copy_expert(sentencia, buffer)
+    return total
+
+
+# Reserva un bloque de ids consecutivos de la secuencia de la tabla, para poder enlazar
+# claves foráneas sin volver a leer lo insertado. Pensado para una base de pruebas sin otras escrituras
+def reservar_ids(cursor, modelo, cantidad: int) -> range:
+    if cantidad <= 0:
+        return range(0)
+    tabla = modelo.__table__
+    pk = list(tabla.primary_key.columns)[0].name
+    cursor.execute(
+        "SELECT setval(pg_get_serial_sequence(%s, %s), nextval(pg_get_serial_sequence(%s, %s)) + %s - 1)",
+        (tabla.name, pk, tabla.name, pk, cantidad)
+    )
+    ultimo = cursor.fetchone()[0]
+    return range(ultimo - cantidad + 1, ultimo + 1)
+
+
+def ids_roles(cursor) -> dict:
+    cursor.execute("SELECT descripcion, id_rol FROM roles WHERE estado = true")
+    roles = dict(cursor.fetchall())
+    faltantes = {"Usuario", "Voluntario"} - roles.keys()
+    if faltantes:
+        raise SystemExit(f"Faltan los roles {sorted(faltantes)} en la tabla roles")
+    return roles
+
+
+# Especies y razas activas; si el catálogo está vacío se crean unas pocas
+def catalogo(cursor, prefijo: str) -> list:
+    cursor.execute("SELECT id_raza, id_especie FROM razas WHERE estado = true")
+    razas = cursor.fetchall()
+    if razas:
+        return razas
+    especies = reservar_ids(cursor, models.Especie, 4)
+    copiar(cursor, models.Especie, ["id_especie", "nombre", "estado", "fecha_registro"],
+           ((e, f"{prefijo}especie{e}", True, datetime.utcnow()) for e in especies))
+    ids = reservar_ids(cursor, models.Raza, 40)
+    razas = [(r, especies[i % len(especies)]) for i, r in enumerate(ids)]
+    copiar(cursor, models.Raza, ["id_raza", "id_especie", "nombre", "estado", "fecha_registro"],
+           ((r, e, f"{prefijo}raza{r}", True, datetime.utcnow()) for r, e in razas))
+    return razas
+
+
+def generar(args) -> dict:
+    rng = random.Random(args.semilla)
+    ahora = datetime.utcnow()
+    # bcrypt es caro: todos los usuarios sintéticos comparten el mismo hash
+    clave_hash = asyncio.run(servicio_hash.hashear_async(args.clave))
+    servicio_hash.cerrar()
+    manifiesto = {"prefijo": args.prefijo, "clave": args.clave}
+    conexion = engine.raw_connection()
+    try:
+        cursor = conexion.cursor()
+        roles = ids_roles(cursor)
+        razas = catalogo(cursor, args.prefijo)
+
+        def medir(nombre, cantidad, inicio):
+            print(f"{nombre:<18} {cantidad:>10} filas {time.perf_counter() - inicio:>8.1f} s")
+
+        # Usuarios (adoptantes) y voluntarios, cada uno con su persona y su rol
+        total_usuarios = args.usuarios + args.voluntarios
+        usuarios = reservar_ids(cursor, models.Usuario, total_usuarios)
+        alias = [f"{args.prefijo}u{i}" for i in range(args.usuarios)] + [f"{args.prefijo}v{i}" for i in range(args.voluntarios)]
+        inicio = time.perf_counter()
+        copiar(cursor, models.Usuario, ["id_usuario", "correo", "alias", "clave", "estado", "fecha_registro"], (
+            (id_usuario, f"{a}@ejemplo.org", a, clave_hash, True, ahora - timedelta(days=rng.randint(0, 900)))
+            for id_usuario, a in zip(usuarios, alias)
+        ))
+        medir("usuarios", total_usuarios, inicio)
+
+        personas = reservar_ids(cursor, models.Persona, total_usuarios)
+        inicio = time.perf_counter()
+        copiar(cursor, models.Persona, ["id_persona", "id_usuario", "nombre", "apellido", "dni", "telefono", "direccion", "estado"], (
+            (id_persona, id_usuario, rng.choice(NOMBRES), rng.choice(APELLIDOS), f"{args.prefijo}{id_usuario}",
+             f"11{rng.randint(10000000, 99999999)}", f"Calle {rng.randint(1, 9999)}", True)
+            for id_persona, id_usuario in zip(personas, usuarios)
+        ))
+        medir("personas", total_usuarios, inicio)
+
+        inicio = time.perf_counter()
+        copiar(cursor, models.UsuarioRol, ["id_usuario", "id_rol", "estado", "fecha_asignacion"], (
+            (id_usuario, roles["Usuario"] if i < args.usuarios else roles["Voluntario"], True, ahora)
+            for i, id_usuario in enumerate(usuarios)
+        ))
+        medir("usuario_rol", total_usuarios, inicio)
+
+        # Un perfil de adopción activo por adoptante (mi-perfil devuelve uno solo)
+        perfiles = reservar_ids(cursor, models.PerfilAdopcion, args.usuarios)
+        inicio = time.perf_counter()
+        copiar(cursor, models.PerfilAdopcion, ["id_perfil", "id_persona", "direccion", "tipo_vivienda", "familia", "mascota", "dedicacion", "tiempo_libre", "estado", "fecha_creacion"], (
+            (id_perfil, id_persona, f"Calle {rng.randint(1, 9999)}", rng.choice(VIVIENDAS), "Dos adultos",
+             rng.random() < 0.4, "Paseos diarios", "Fines de semana", True, ahora)
+            for id_perfil, id_persona in zip(perfiles, personas[:args.usuarios])
+        ))
+        medir("perfil_adopcion", args.usuarios, inicio)
+
+        voluntarios = usuarios[args.usuarios:]
+        mascotas = reservar_ids(cursor, models.Mascota, args.mascotas)
+        inicio = time.perf_counter()
+        copiar(cursor, models.Mascota, ["id_mascota", "nombre_mascota", "sexo", "id_especie", "id_raza", "edad", "estado_mascota", "descripcion", "fecha_registro", "registrado_por", "estado"], (
+            (id_mascota, f"{rng.choice(NOMBRES)} {id_mascota}", rng.choice(["Macho", "Hembra"]), raza[1], raza[0],
+             rng.randint(0, 15), rng.choice(ESTADOS_MASCOTA), "Mascota sociable y tranquila",
+             ahora - timedelta(minutes=rng.randint(0, 525600)), rng.choice(voluntarios) if voluntarios else None,
+             rng.random() > args.bajas)
+            for id_mascota in mascotas
+            for raza in (rng.choice(razas),)
+        ))
+        medir("mascotas", args.mascotas, inicio)
+
+        inicio = time.perf_counter()
+        total_fotos = copiar(cursor, models.FotoMascota, ["id_mascota", "url", "descripcion", "estado", "fecha_registro"], (
+            (id_mascota, f"https://picsum.photos/seed/{id_mascota}-{n}/640/480", None, True, ahora)
+            for id_mascota in mascotas
+            for n in range(rng.randint(0, args.fotos_por_mascota))
+        ))
+        medir("fotos_mascota", total_fotos, inicio)
+
+        # Las entrevistas asignadas van en franjas consecutivas por entrevistador para no violar
+        # ex_adopciones_entrevista_solapada
+        proxima_franja = {v: ahora + timedelta(days=1) for v in voluntarios}
+        def adopciones():
+            for _ in range(args.adopciones):
+                i = rng.randrange(args.usuarios)
+                solicitud = ahora - timedelta(minutes=rng.randint(0, 525600))
+                estado_adopcion = rng.choice(ESTADOS_ADOPCION)
+                entrevistador = fecha_entrevista = None
+                if estado_adopcion == "En revisión" and voluntarios:
+                    entrevistador = rng.choice(voluntarios)
+                    fecha_entrevista = proxima_franja[entrevistador]
+                    proxima_franja[entrevistador] += timedelta(minutes=90)
+                yield (perfiles[i], rng.choice(mascotas), usuarios[i], estado_adopcion, solicitud,
+                       fecha_entrevista, entrevistador, rng.random() > args.bajas)
+        inicio = time.perf_counter()
+        copiar(cursor, models.Adopcion, ["id_perfil", "id_mascota", "id_usuario", "estado_adopcion", "fecha_solicitud", "fecha_entrevista", "id_entrevistador", "estado"], adopciones())
+        medir("adopciones", args.adopciones, inicio)
+
+        conexion.commit()
+        cursor.close()
+    except BaseException:
+        conexion.rollback()
+        raise
+    finally:
+        conexion.close()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("ANALYZE")
+    manifiesto.update(
+        usuarios=args.usuarios,
+        voluntarios=args.voluntarios,
+        primer_perfil=perfiles[0],
+    )
+    return manifiesto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos con COPY")
+    parser.add_argument("--usuarios", type=int, default=20000, help="Adoptantes (con persona y perfil)")
+    parser.add_argument("--voluntarios", type=int, default=50)
+    parser.add_argument("--mascotas", type=int, default=10000)
+    parser.add_argument("--fotos-por-mascota", type=int, default=4, help="Máximo; cada mascota recibe de 0 a N")
+    parser.add_argument("--adopciones", type=int, default=50000)
+    parser.add_argument("--bajas", type=float, default=0.1, help="Fracción de mascotas y solicitudes dadas de baja")
+    parser.add_argument("--prefijo", default="carga_", help="Prefijo de alias, correos y DNI generados")
+    parser.add_argument("--clave", default=CLAVE_POR_DEFECTO, help="Contraseña de todos los usuarios generados")
+    parser.add_argument("--semilla", type=int, default=2026)
+    parser.add_argument("--manifiesto", default="datos_carga.json")
+    args = parser.parse_args()
+    if args.usuarios < 1:
+        parser.error("--usuarios debe ser al menos 1")
+    if args.adopciones and not args.mascotas:
+        parser.error("las adopciones necesitan al menos una mascota")
+
+    manifiesto = generar(args)
+    with open(args.manifiesto, "w", encoding="utf-8") as salida:
+        json.dump(manifiesto, salida, indent=2)
+    print(f"manifiesto guardado en {args.manifiesto}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Las pruebas corren contra un PostgreSQL propio, ya migrado (alembic upgrade head), indicado en
+# TEST_DATABASE_URL. Cada prueba vacía las tablas que usa: no apuntar a una base con datos reales
+import os
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # Antes de importar la app: app.database crea los motores al importarse
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.setdefault("DB_PERFIL", "test")
+    # bcrypt barato y en el mismo proceso
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    os.environ.setdefault("HASH_WORKERS", "0")
+
+import httpx
+from sqlalchemy import select, text
+from app import models
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.auth.dependencies import cache_tokens
+from app.auth.roles import catalogo_roles
+
+
+# Sin base de pruebas solo corren las que no usan la base ni la app
+def pytest_collection_modifyitems(config, items):
+    if not TEST_DATABASE_URL:
+        omitir = pytest.mark.skip(reason="Definir TEST_DATABASE_URL (PostgreSQL de pruebas migrado)")
+        for item in items:
+            if {"db", "cliente"} & set(item.fixturenames):
+                item.add_marker(omitir)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db():
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {', '.join(Base.metadata.tables)} RESTART IDENTITY CASCADE"))
+    # Estado en memoria que sobreviviría entre pruebas
+    cache_tokens.limpiar()
+    catalogo_roles.invalidar()
+    sesion = SessionLocal()
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+
+
+# Cliente en el mismo contexto que la prueba: presupuesto_consultas ve las sentencias del request
+@pytest.fixture
+async def cliente():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://prueba") as cliente:
+        yield cliente
+
+
+# Datos y sesiones compartidos por los módulos de prueba (se importan desde tests.conftest)
+CLAVE = "Secreta123!"
+
+
+def sembrar_roles(db):
+    db.add_all([models.Rol(descripcion=rol, estado=True) for rol in ("Administrador", "Voluntario", "Usuario")])
+    db.commit()
+
+
+async def registrar(cliente, alias: str, dni: str):
+    respuesta = await cliente.post("/security/registro", json={
+        "alias": alias, "clave": CLAVE, "correo": f"{alias}@refugio.test",
+        "pregunta_seguridad": "p", "respuesta_seguridad": "r",
+        "persona": {"nombre": "Ana", "apellido": "Pérez", "dni": dni, "telefono": "1", "direccion": "d"}
+    })
+    assert respuesta.status_code == 200
+
+
+async def iniciar_sesion(cliente, alias: str, clave: str = CLAVE):
+    return await cliente.post("/security/login", json={"alias": alias, "clave": clave})
+
+
+def bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def asignar_rol(db, id_usuario: int, descripcion: str):
+    id_rol = db.scalar(select(models.Rol.id_rol).where(models.Rol.descripcion == descripcion))
+    db.add(models.UsuarioRol(id_usuario=id_usuario, id_rol=id_rol))
+    db.commit()
+
+
+def sembrar_mascotas(db, cantidad: int, fotos_por_mascota: int):
+    especie = models.Especie(nombre="Perro", estado=True)
+    raza = models.Raza(nombre="Mestizo", especie=especie, estado=True)
+    db.add_all([especie, raza])
+    db.flush()
+    for i in range(cantidad):
+        mascota = models.Mascota(nombre_mascota=f"Mascota {i}", id_especie=especie.id_especie, id_raza=raza.id_raza, estado=True)
+        mascota.fotos = [
+            models.FotoMascota(url=f"https://fotos.test/{i}/{n}.jpg", estado=True) for n in range(fotos_por_mascota)
+        ]
+        # Foto dada de baja: no debe aparecer en la respuesta
+        mascota.fotos.append(models.FotoMascota(url=f"https://fotos.test/{i}/baja.jpg", estado=False))
+        db.add(mascota)
+    db.commit()
@@ -0,0 +1,46 @@
+import io
+import os
+import pytest
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from starlette.datastructures import Headers
+from app.utils import almacen
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def media_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(almacen, "MEDIA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def imagen(formato: str) -> bytes:
+    salida = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(salida, formato)
+    return salida.getvalue()
+
+
+def subida(contenido: bytes, content_type: str) -> UploadFile:
+    return UploadFile(io.BytesIO(contenido), filename="foto", headers=Headers({"content-type": content_type}))
+
+
+# La extensión sale del formato real del contenido
+@pytest.mark.parametrize("formato, tipo, extension", [("PNG", "image/png", "png"), ("JPEG", "image/jpeg", "jpg"), ("WEBP", "image/webp", "webp")])
+async def test_guardar_subida_usa_el_formato_detectado(media_dir, formato, tipo, extension):
+    _, ruta = await almacen.guardar_subida(subida(imagen(formato), tipo))
+    assert ruta.endswith(f".{extension}")
+    assert os.path.exists(almacen.ruta_absoluta(ruta))
+
+
+# Un PNG declarado como JPEG, un GIF o algo que no es una imagen: 400 y no queda nada en el almacén
+@pytest.mark.parametrize("contenido, tipo", [
+    (imagen("PNG"), "image/jpeg"),
+    (imagen("GIF"), "image/gif"),
+    (b"<svg xmlns='http://www.w3.org/2000/svg'/>", "image/png"),
+])
+async def test_guardar_subida_rechaza_formato_invalido(media_dir, contenido, tipo):
+    with pytest.raises(HTTPException) as error:
+        await almacen.guardar_subida(subida(contenido, tipo))
+    assert error.value.status_code == 400
+    assert not any(archivos for _, _, archivos in os.walk(media_dir))
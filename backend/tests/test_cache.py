@@ -0,0 +1,46 @@
+import pytest
+from app.utils import cache
+from app.utils.cache import CacheCatalogos, VersionesLocales
+
+pytestmark = pytest.mark.anyio
+
+
+def cargador(contador: list, cuerpo: bytes = b"[]"):
+    async def cargar():
+        contador.append(1)
+        return cuerpo
+    return cargar
+
+
+async def test_claves_distintas_no_superan_el_maximo():
+    catalogos = CacheCatalogos(300, VersionesLocales(), max_entradas=3)
+    cargas = []
+    for id_especie in range(100):
+        await catalogos.obtener("razas", id_especie, cargador(cargas))
+    assert len(catalogos._entradas) == 3
+    assert len(cargas) == 100
+
+
+async def test_descarta_la_menos_usada():
+    catalogos = CacheCatalogos(300, VersionesLocales(), max_entradas=2)
+    cargas = []
+    await catalogos.obtener("razas", 1, cargador(cargas))
+    await catalogos.obtener("razas", 2, cargador(cargas))
+    await catalogos.obtener("razas", 1, cargador(cargas))  # 1 pasa a ser la más reciente
+    await catalogos.obtener("razas", 3, cargador(cargas))  # sale 2
+    assert list(catalogos._entradas) == [("razas", 1), ("razas", 3)]
+    await catalogos.obtener("razas", 1, cargador(cargas))
+    assert len(cargas) == 3
+
+
+async def test_entrada_vencida_se_quita_al_leer(monkeypatch):
+    catalogos = CacheCatalogos(10, VersionesLocales(), max_entradas=10)
+    ahora = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: ahora[0])
+    cargas = []
+    await catalogos.obtener("especies", None, cargador(cargas, b"[1]"))
+    ahora[0] += 11
+    entrada = await catalogos.obtener("especies", None, cargador(cargas, b"[2]"))
+    assert entrada.cuerpo == b"[2]"
+    assert len(cargas) == 2
+    assert len(catalogos._entradas) == 1
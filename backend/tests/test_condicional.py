@@ -0,0 +1,21 @@
+from datetime import datetime
+import pytest
+from starlette.requests import Request
+from app.utils.condicional import sin_cambios
+
+MODIFICADA = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def request_con(if_modified_since: str) -> Request:
+    return Request({"type": "http", "headers": [(b"if-modified-since", if_modified_since.encode())]})
+
+
+# "-0000" (zona desconocida) da un datetime sin tzinfo: se toma como UTC en lugar de fallar
+@pytest.mark.parametrize("cabecera, esperado", [
+    ("Wed, 01 May 2024 12:00:00 GMT", True),
+    ("Wed, 01 May 2024 12:00:00 -0000", True),
+    ("Wed, 01 May 2024 11:59:59 -0000", False),
+    ("no es una fecha", False),
+])
+def test_if_modified_since(cabecera, esperado):
+    assert sin_cambios(request_con(cabecera), '"etag"', MODIFICADA) is esperado
@@ -0,0 +1,59 @@
+from datetime import date, datetime, time, timedelta
+import pytest
+from app import models
+from app.auth.jwt_handler import crear_token
+
+pytestmark = pytest.mark.anyio
+
+
+def encabezado_voluntario(id_usuario: int = 1) -> dict:
+    token = crear_token({"sub": "vol", "id_usuario": id_usuario, "roles": ["Voluntario"], "modulos": {}})
+    return {"Authorization": f"Bearer {token}"}
+
+
+# Voluntario disponible todos los días de 9 a 18 y una solicitud heredada con entrevistador pero sin fecha
+def sembrar_agenda(db):
+    voluntario = models.Usuario(alias="vol", correo="vol@refugio.test", clave="x", estado=True)
+    voluntario.roles = [models.UsuarioRol(rol=models.Rol(descripcion="Voluntario", estado=True), estado=True)]
+    db.add(voluntario)
+    db.flush()
+    db.add_all([
+        models.DisponibilidadEntrevistador(id_usuario=voluntario.id_usuario, dia_semana=d,
+                                           hora_inicio=time(9), hora_fin=time(18), estado=True)
+        for d in range(7)
+    ])
+    db.add_all([
+        models.Adopcion(id_usuario=voluntario.id_usuario, id_entrevistador=voluntario.id_usuario,
+                        estado_adopcion="En revisión", fecha_entrevista=None, estado=True),
+    ])
+    perfil = models.PerfilAdopcion(persona=models.Persona(usuario=voluntario, nombre="Vol", apellido="Untario", estado=True), estado=True)
+    mascota = models.Mascota(nombre_mascota="Luna", estado=True)
+    db.add(models.Adopcion(perfil=perfil, mascota=mascota, id_usuario=voluntario.id_usuario, estado_adopcion="Pendiente", estado=True))
+    db.commit()
+
+
+async def test_horarios_libres_acepta_fecha_con_zona_y_sin_fecha_no_bloquea(db, cliente):
+    sembrar_agenda(db)
+    manana = date.today() + timedelta(days=1)
+
+    respuesta = await cliente.get("/entrevistas/horarios-libres", headers=encabezado_voluntario(), params={
+        "desde": f"{manana.isoformat()}T00:00:00Z", "dias": 1, "cantidad": 5
+    })
+
+    assert respuesta.status_code == 200
+    horarios = respuesta.json()
+    assert len(horarios) == 5
+    assert horarios[0]["inicio"] == f"{manana.isoformat()}T09:00:00"
+
+
+async def test_asignar_entrevista_guarda_fecha_con_zona_en_utc(db, cliente):
+    sembrar_agenda(db)
+    dia = (date.today() + timedelta(days=2)).isoformat()
+
+    respuesta = await cliente.put("/adopciones/2/asignar-entrevista", headers=encabezado_voluntario(), json={
+        "fecha_entrevista": f"{dia}T12:00:00-03:00", "id_entrevistador": 1, "duracion_minutos": 60
+    })
+
+    assert respuesta.status_code == 200
+    db.expire_all()
+    assert db.get(models.Adopcion, 2).fecha_entrevista == datetime.fromisoformat(f"{dia}T15:00:00")
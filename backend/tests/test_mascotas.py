@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import func, select
+from app import models
+from app.diagnostico_sql import presupuesto_consultas
+from tests.conftest import asignar_rol, bearer, iniciar_sesion, registrar, sembrar_mascotas, sembrar_roles
+
+pytestmark = pytest.mark.anyio
+
+
+# La página y las fotos activas de todas sus mascotas salen en dos sentencias, sin importar
+# cuántas mascotas y fotos haya (antes: 1 + N)
+@pytest.mark.parametrize("cantidad, fotos_por_mascota", [(1, 1), (10, 3), (50, 5)])
+async def test_listar_mascotas_cantidad_fija_de_sentencias(db, cliente, cantidad, fotos_por_mascota):
+    sembrar_mascotas(db, cantidad, fotos_por_mascota)
+
+    with presupuesto_consultas(2, "GET /mascotas/") as registro:
+        respuesta = await cliente.get("/mascotas/", params={"limite": 100})
+
+    assert respuesta.status_code == 200
+    assert registro.cantidad == 2
+    items = respuesta.json()["items"]
+    assert len(items) == cantidad
+    assert all(len(item["fotos"]) == fotos_por_mascota for item in items)
+    assert not any(foto["url"].endswith("baja.jpg") for item in items for foto in item["fotos"])
+
+
+async def test_obtener_mascota_cantidad_fija_de_sentencias(db, cliente):
+    sembrar_mascotas(db, 3, 4)
+
+    with presupuesto_consultas(2, "GET /mascotas/{id}") as registro:
+        respuesta = await cliente.get("/mascotas/2")
+
+    assert respuesta.status_code == 200
+    assert registro.cantidad == 2
+    assert len(respuesta.json()["fotos"]) == 4
+
+
+# Las fotos de una mascota dada de baja se pueden seguir eliminando
+async def test_eliminar_foto_de_mascota_dada_de_baja(db, cliente):
+    sembrar_roles(db)
+    sembrar_mascotas(db, 1, 1)
+    await registrar(cliente, "vol", "2001")
+    asignar_rol(db, 1, "Voluntario")
+    mascota = db.get(models.Mascota, 1)
+    mascota.estado = False
+    db.commit()
+    version = mascota.version
+    tokens = (await iniciar_sesion(cliente, "vol")).json()
+
+    respuesta = await cliente.delete("/mascotas/fotos/1", headers=bearer(tokens))
+
+    assert respuesta.status_code == 200
+    db.expire_all()
+    assert db.get(models.FotoMascota, 1).estado is False
+    assert db.get(models.Mascota, 1).version == version + 1
+
+
+# Un ítem con un valor más largo que su columna va a errores; el resto del lote se registra
+async def test_lote_con_valor_demasiado_largo(db, cliente):
+    sembrar_roles(db)
+    sembrar_mascotas(db, 0, 0)
+    await registrar(cliente, "vol", "2001")
+    asignar_rol(db, 1, "Voluntario")
+    tokens = (await iniciar_sesion(cliente, "vol")).json()
+    item = {"especie_id": 1, "raza_id": 1}
+
+    respuesta = await cliente.post("/mascotas/lote", headers=bearer(tokens), json={"mascotas": [
+        {**item, "nombre_mascota": "Luna"},
+        {**item, "nombre_mascota": "x" * 101},
+        {**item, "nombre_mascota": "Toby", "fotos": [{"url": "https://fotos.test/" + "y" * 255}]},
+        {**item, "nombre_mascota": "Milo", "sexo": "Macho", "fotos": [{"url": "https://fotos.test/milo.jpg"}]},
+    ]})
+
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert [c["indice"] for c in cuerpo["creadas"]] == [0, 3]
+    assert cuerpo["errores"] == [
+        {"indice": 1, "detalle": "nombre_mascota supera los 100 caracteres"},
+        {"indice": 2, "detalle": "fotos[0].url supera los 255 caracteres"},
+    ]
+    assert db.scalar(select(func.count()).select_from(models.Mascota)) == 2
+    assert db.scalar(select(func.count()).select_from(models.FotoMascota)) == 1
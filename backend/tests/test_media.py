@@ -0,0 +1,30 @@
+import os
+import pytest
+from app.routers import media
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def raiz(tmp_path, monkeypatch):
+    monkeypatch.setattr(media, "RAIZ", os.path.realpath(tmp_path))
+    os.makedirs(tmp_path / "originales" / "ab")
+    (tmp_path / "originales" / "ab" / "foto.jpg").write_bytes(b"jpg")
+    # Directorio con el nombre de la variante precomprimida
+    os.makedirs(tmp_path / "originales" / "ab" / "foto.jpg.br")
+    return tmp_path
+
+
+# Un directorio del almacén es un 404, no un IsADirectoryError en FileResponse
+@pytest.mark.parametrize("ruta", ["/media/originales", "/media/originales/ab"])
+async def test_directorio_responde_404(raiz, cliente, ruta):
+    assert (await cliente.get(ruta)).status_code == 404
+
+
+# Si la variante precomprimida es un directorio se sirve el archivo sin comprimir
+async def test_precomprimido_que_es_directorio_se_ignora(raiz, cliente):
+    respuesta = await cliente.get("/media/originales/ab/foto.jpg", headers={"Accept-Encoding": "br"})
+
+    assert respuesta.status_code == 200
+    assert "content-encoding" not in respuesta.headers
+    assert respuesta.content == b"jpg"
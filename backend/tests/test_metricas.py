@@ -0,0 +1,36 @@
+import pytest
+from prometheus_client import REGISTRY
+from tests.conftest import sembrar_mascotas
+
+pytestmark = pytest.mark.anyio
+
+
+def requests_atendidos(metodo: str, ruta: str, estado: str) -> float:
+    valor = REGISTRY.get_sample_value("refugio_http_requests_total", {"metodo": metodo, "ruta": ruta, "estado": estado})
+    return valor or 0.0
+
+
+# La etiqueta es la plantilla declarada en el router, no el path con los valores; los 404
+# sin ruta comparten una sola etiqueta
+async def test_etiqueta_ruta_es_la_plantilla(db, cliente):
+    sembrar_mascotas(db, 2, 1)
+    antes_mascota = requests_atendidos("GET", "/mascotas/{id_mascota}", "200")
+    antes_sin_ruta = requests_atendidos("GET", "sin_ruta", "404")
+
+    for id_mascota in (1, 2):
+        assert (await cliente.get(f"/mascotas/{id_mascota}")).status_code == 200
+    for path in ("/no-existe", "/otra/cosa/1"):
+        assert (await cliente.get(path)).status_code == 404
+
+    assert requests_atendidos("GET", "/mascotas/{id_mascota}", "200") == antes_mascota + 2
+    assert requests_atendidos("GET", "sin_ruta", "404") == antes_sin_ruta + 2
+    assert requests_atendidos("GET", "/mascotas/1", "200") == 0
+
+
+# Los parámetros {x:path} abarcan varios segmentos y siguen saliendo como una sola plantilla
+async def test_etiqueta_ruta_con_parametro_path(cliente):
+    antes = requests_atendidos("GET", "/media/{ruta:path}", "404")
+
+    assert (await cliente.get("/media/originales/ab/no-existe.jpg")).status_code == 404
+
+    assert requests_atendidos("GET", "/media/{ruta:path}", "404") == antes + 1
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import select
+from app import models
+from tests.conftest import bearer, iniciar_sesion, registrar, sembrar_roles
+
+pytestmark = pytest.mark.anyio
+
+
+# Los cambiar-* validan como PATCH /mi-persona: un nombre vacío o un DNI demasiado largo es un 422
+# sobre el campo del wrapper, no un 500 ni un valor guardado sin validar
+@pytest.mark.parametrize("ruta, cuerpo, campo", [
+    ("/personas/cambiar-nombre", {"nuevo_nombre": ""}, "nuevo_nombre"),
+    ("/personas/cambiar-apellido", {"nuevo_apellido": "x" * 51}, "nuevo_apellido"),
+    ("/personas/cambiar-dni", {"nuevo_dni": "9" * 21}, "nuevo_dni"),
+    ("/personas/cambiar-telefono", {"nuevo_telefono": "1" * 21}, "nuevo_telefono"),
+])
+async def test_cambiar_campo_invalido_responde_422(db, cliente, ruta, cuerpo, campo):
+    sembrar_roles(db)
+    await registrar(cliente, "ana", "1001")
+    tokens = (await iniciar_sesion(cliente, "ana")).json()
+
+    respuesta = await cliente.put(ruta, json=cuerpo, headers=bearer(tokens))
+
+    assert respuesta.status_code == 422
+    assert respuesta.json()["detail"][0]["loc"] == ["body", campo]
+    persona = db.scalar(select(models.Persona))
+    assert (persona.nombre, persona.apellido, persona.dni) == ("Ana", "Pérez", "1001")
+
+
+async def test_cambiar_nombre_valido(db, cliente):
+    sembrar_roles(db)
+    await registrar(cliente, "ana", "1001")
+    tokens = (await iniciar_sesion(cliente, "ana")).json()
+
+    respuesta = await cliente.put("/personas/cambiar-nombre", json={"nuevo_nombre": "Lucía"}, headers=bearer(tokens))
+
+    assert respuesta.status_code == 200
+    assert db.scalar(select(models.Persona.nombre)) == "Lucía"
@@ -0,0 +1,34 @@
+import pytest
+from tests.conftest import CLAVE, bearer, iniciar_sesion, registrar, sembrar_roles
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_cambiar_clave_cierra_las_demas_sesiones(db, cliente):
+    sembrar_roles(db)
+    await registrar(cliente, "ana", "1001")
+    actual = (await iniciar_sesion(cliente, "ana")).json()
+    otra = (await iniciar_sesion(cliente, "ana")).json()
+
+    respuesta = await cliente.put("/security/cambiar-clave", headers=bearer(actual),
+                                  json={"id_usuario": 1, "clave_actual": CLAVE, "nueva_clave": "Otra-456!"})
+    assert respuesta.status_code == 200
+
+    # La otra sesión ya no se renueva y su token de acceso dejó de valer
+    assert (await cliente.post("/security/refresh", json={"refresh_token": otra["refresh_token"]})).status_code == 401
+    assert (await cliente.get("/usuarios/me", headers=bearer(otra))).status_code == 401
+    # La sesión desde la que se cambió la clave se renueva y sigue funcionando
+    renovada = await cliente.post("/security/refresh", json={"refresh_token": actual["refresh_token"]})
+    assert renovada.status_code == 200
+    assert (await cliente.get("/usuarios/me", headers=bearer(renovada.json()))).status_code == 200
+
+
+async def test_usuario_dado_de_baja_no_inicia_sesion(db, cliente):
+    sembrar_roles(db)
+    await registrar(cliente, "beto", "1002")
+    tokens = (await iniciar_sesion(cliente, "beto")).json()
+
+    assert (await cliente.delete("/usuarios/1", headers=bearer(tokens))).status_code == 200
+
+    assert (await iniciar_sesion(cliente, "beto")).status_code == 401
+    assert (await cliente.post("/security/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 401
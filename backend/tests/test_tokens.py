@@ -0,0 +1,62 @@
+import hashlib
+import time
+from app.auth.dependencies import CacheTokens, RevocacionesLocales, RevocacionesRedis
+from app.auth.jwt_handler import crear_token
+
+
+# Lo mínimo de un cliente Redis que usa RevocacionesRedis, en memoria y sin vencimientos
+class RedisEnMemoria:
+    def __init__(self):
+        self.datos = {}
+
+    def mget(self, *claves):
+        return [self.datos.get(clave) for clave in claves]
+
+    def set(self, clave, valor, ex=None):
+        self.datos[clave] = str(valor).encode()
+
+    def scan_iter(self, patron):
+        return [clave for clave in list(self.datos) if clave.startswith(patron.rstrip("*"))]
+
+    def delete(self, clave):
+        self.datos.pop(clave, None)
+
+
+def revocaciones_redis(cliente) -> RevocacionesRedis:
+    revocaciones = RevocacionesRedis.__new__(RevocacionesRedis)
+    revocaciones._redis = cliente
+    return revocaciones
+
+
+def token_en_cache(cache: CacheTokens, payload: dict) -> dict:
+    digest = hashlib.sha256(crear_token(payload).encode()).hexdigest()
+    cache.guardar(digest, {**payload, "exp": time.time() + 900, "iat": time.time()})
+    return cache.obtener(digest)
+
+
+# Dos workers con su propia caché de claims: lo que revoca uno lo ve el otro en su próximo request
+def test_revocacion_compartida_entre_workers():
+    redis = RedisEnMemoria()
+    worker_a = CacheTokens(100, revocaciones_redis(redis))
+    worker_b = CacheTokens(100, revocaciones_redis(redis))
+    sesion = token_en_cache(worker_b, {"id_usuario": 1, "sid": 10})
+    otro_usuario = token_en_cache(worker_b, {"id_usuario": 2, "sid": 20})
+    assert not worker_b.revocado(sesion)
+
+    worker_a.revocar_sesion(10, time.time() + 900)
+    assert worker_b.revocado(sesion)
+    assert not worker_b.revocado(otro_usuario)
+
+    worker_a.revocar_usuario(2)
+    assert worker_b.revocado(otro_usuario)
+
+
+# Tokens emitidos después de revocar al usuario (p. ej. al volver a iniciar sesión) siguen valiendo
+def test_revocar_usuario_no_afecta_tokens_posteriores():
+    for revocaciones in (RevocacionesLocales(), revocaciones_redis(RedisEnMemoria())):
+        cache = CacheTokens(100, revocaciones)
+        anterior = token_en_cache(cache, {"id_usuario": 1, "sid": 1})
+        cache.revocar_usuario(1)
+        posterior = token_en_cache(cache, {"id_usuario": 1, "sid": 2})
+        assert cache.revocado(anterior)
+        assert not cache.revocado(posterior)
@@ -1,9 +1,14 @@
 import axios from "axios";
 const API_URL = "http://localhost:5000/mascotas";
 
-// Listar todas las mascotas
-export function getAllMascotas() {
-  return axios.get(`${API_URL}/`);
+// Listar mascotas (paginado: devuelve { items, siguiente_cursor })
+export function getAllMascotas(params = {}) {
+  return axios.get(`${API_URL}/`, { params });
+}
+
+// Buscar mascotas por texto libre (ordenadas por relevancia, mismo formato paginado)
+export function buscarMascotas(params = {}) {
+  return axios.get(`${API_URL}/buscar`, { params });
 }
 
 // Ver detalles de una mascota
@@ -1,6 +1,6 @@
 import { useState } from "react";
 import { useNavigate } from "react-router-dom";
-import { loginUser } from "../userService";
+import { guardarSesion, loginUser } from "../userService";
 import "./LoginForm.css";
 
 export default function LoginForm() {
@@ -14,13 +14,9 @@ export default function LoginForm() {
     setError("");
     try {
       const res = await loginUser({ alias, clave });
-      const { access_token } = res.data;
-      // Puedes ajustar el tiempo de expiración según tu backend (ejemplo: 1 hora)
-      const expiresInMinutes = 60;
-      const expiresAt = Date.now() + expiresInMinutes * 60 * 1000;
-      localStorage.setItem("token", access_token);
-      localStorage.setItem("token_expires_at", expiresAt.toString());
-      localStorage.setItem("alias", alias); 
+      localStorage.setItem("alias", alias);
+      // Guarda los tokens y programa la renovación antes de que venza el token de acceso
+      guardarSesion(res.data);
       navigate("/home");
     } catch (err) {
       setError("Credenciales incorrectas");
@@ -1,17 +1,27 @@
+import { useEffect, useState } from "react";
 import { Link, useNavigate } from "react-router-dom";
+import { limpiarSesion, logoutUser } from "../userService";
 import "./Navbar.css";
 
 export default function Navbar() {
   const navigate = useNavigate();
-  const token = localStorage.getItem("token");
-  const expiresAt = localStorage.getItem("token_expires_at");
+  const [, setVersionSesion] = useState(0);
+  // Se vuelve a dibujar al iniciar, renovar o cerrar la sesión
+  useEffect(() => {
+    const actualizar = () => setVersionSesion((v) => v + 1);
+    window.addEventListener("sesion", actualizar);
+    return () => window.removeEventListener("sesion", actualizar);
+  }, []);
   const alias = localStorage.getItem("alias");
-  const isLoggedIn = token && expiresAt && Date.now() < Number(expiresAt);
+  // La sesión sigue mientras haya refresh token: un token de acceso vencido se renueva
+  const isLoggedIn = Boolean(localStorage.getItem("token") && localStorage.getItem("refresh_token"));
 
   const handleLogout = () => {
-    localStorage.removeItem("token");
-    localStorage.removeItem("token_expires_at");
-    localStorage.removeItem("alias");
+    const refreshToken = localStorage.getItem("refresh_token");
+    if (refreshToken) {
+      logoutUser(refreshToken).catch(() => {});
+    }
+    limpiarSesion();
     navigate("/login");
   };
 
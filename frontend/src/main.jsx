@@ -2,6 +2,10 @@ import { StrictMode } from 'react'
 import { createRoot } from 'react-dom/client'
 import './index.css'
 import App from './App.jsx'
+import { programarRenovacion } from './userService'
+
+// Retoma la renovación del token de una sesión guardada
+programarRenovacion()
 
 createRoot(document.getElementById('root')).render(
   <StrictMode>
@@ -1,5 +1,5 @@
-import { useEffect, useState } from "react";
-import { getAllMascotas } from "../animalService";
+import { useEffect, useRef, useState } from "react";
+import { getAllMascotas, buscarMascotas } from "../animalService";
 import { Link } from "react-router-dom";
 import axios from "axios";
 import "./Adopcion.css";
@@ -10,9 +10,18 @@ type Mascota = {
   edad?: number;
   id_especie: number;
   id_raza: number;
-  fotos?: { url: string }[];
+  fotos?: { url: string; miniatura?: string }[];
 };
 
+// Las fotos subidas se sirven desde la API (/media/...); las URL externas se usan tal cual
+const urlFoto = (foto: { url: string; miniatura?: string }) => {
+  const url = foto.miniatura || foto.url;
+  return url.startsWith("/") ? `http://localhost:5000${url}` : url;
+};
+
+// Mascotas por página; el resto se pide con "Cargar más" siguiendo siguiente_cursor
+const POR_PAGINA = 20;
+
 type Especie = {
   id_especie: number;
   nombre: string;
@@ -26,6 +35,10 @@ type Raza = {
 
 export default function Adopcion() {
   const [mascotas, setMascotas] = useState<Mascota[]>([]);
+  const [siguienteCursor, setSiguienteCursor] = useState<string | null>(null);
+  const [cargando, setCargando] = useState(false);
+  // Descarta respuestas de filtros anteriores que lleguen tarde
+  const consultaActual = useRef(0);
   const [filtroNombre, setFiltroNombre] = useState("");
   const [especies, setEspecies] = useState<Especie[]>([]);
   const [razas, setRazas] = useState<Raza[]>([]);
@@ -34,28 +47,59 @@ export default function Adopcion() {
   const roles = JSON.parse(localStorage.getItem("roles") || "[]");
 
   useEffect(() => {
-    getAllMascotas().then((res) => setMascotas(res.data));
     axios
       .get("http://localhost:5000/especies/")
       .then((res) => setEspecies(res.data));
     axios.get("http://localhost:5000/razas/").then((res) => setRazas(res.data));
   }, []);
 
+  // Los filtros los resuelve el servidor; con 2 o más caracteres se usa la búsqueda
+  // (texto completo + errores de tipeo). Sin cursor se pide la primera página
+  const pedirPagina = (cursor?: string) => {
+    const texto = filtroNombre.trim();
+    const params = {
+      limite: POR_PAGINA,
+      id_especie: especieSeleccionada || undefined,
+      id_raza: razaSeleccionada || undefined,
+      cursor,
+    };
+    return texto.length >= 2
+      ? buscarMascotas({ ...params, q: texto })
+      : getAllMascotas(params);
+  };
+
+  useEffect(() => {
+    const consulta = ++consultaActual.current;
+    const espera = setTimeout(() => {
+      setCargando(true);
+      pedirPagina()
+        .then((res) => {
+          if (consulta !== consultaActual.current) return;
+          setMascotas(res.data.items);
+          setSiguienteCursor(res.data.siguiente_cursor);
+        })
+        .finally(() => consulta === consultaActual.current && setCargando(false));
+    }, 300);
+    return () => clearTimeout(espera);
+  }, [filtroNombre, especieSeleccionada, razaSeleccionada]);
+
+  const cargarMas = () => {
+    if (!siguienteCursor) return;
+    const consulta = consultaActual.current;
+    setCargando(true);
+    pedirPagina(siguienteCursor)
+      .then((res) => {
+        if (consulta !== consultaActual.current) return;
+        setMascotas((actuales) => [...actuales, ...res.data.items]);
+        setSiguienteCursor(res.data.siguiente_cursor);
+      })
+      .finally(() => consulta === consultaActual.current && setCargando(false));
+  };
+
   const razasFiltradas = especieSeleccionada
     ? razas.filter((r) => r.id_especie === Number(especieSeleccionada))
     : razas;
 
-  const mascotasFiltradas = mascotas.filter((m) => {
-    const coincideNombre = m.nombre_mascota
-      .toLowerCase()
-      .includes(filtroNombre.toLowerCase());
-    const coincideEspecie =
-      !especieSeleccionada || m.id_especie === Number(especieSeleccionada);
-    const coincideRaza =
-      !razaSeleccionada || m.id_raza === Number(razaSeleccionada);
-    return coincideNombre && coincideEspecie && coincideRaza;
-  });
-
   return (
     <div className="adopcion-container">
       <h2>Mascotas en adopción</h2>
@@ -102,16 +146,16 @@ export default function Adopcion() {
         )}
       </div>
       <div className="mascotas-list">
-        {mascotasFiltradas.length === 0 && (
+        {!cargando && mascotas.length === 0 && (
           <p>No hay mascotas que coincidan con la búsqueda.</p>
         )}
-        {mascotasFiltradas.map((m) => (
+        {mascotas.map((m) => (
           <div className="mascota-card" key={m.id_mascota}>
             <div className="mascota-img">
               <img
                 src={
                   m.fotos && m.fotos.length > 0
-                    ? m.fotos[0].url
+                    ? urlFoto(m.fotos[0])
                     : "/fondo_refugio.jpg"
                 }
                 alt={m.nombre_mascota}
@@ -159,6 +203,13 @@ export default function Adopcion() {
           </div>
         ))}
       </div>
+      {siguienteCursor && (
+        <div className="cargar-mas">
+          <button onClick={cargarMas} disabled={cargando}>
+            {cargando ? "Cargando..." : "Cargar más"}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -11,6 +11,93 @@ export function loginUser(data) {
   return axios.post(`${API_URL}/security/login`, data);
 }
 
+// Renueva el token de acceso; la respuesta trae un refresh token nuevo que reemplaza al anterior
+export function refreshSession(refreshToken) {
+  return axios.post(`${API_URL}/security/refresh`, { refresh_token: refreshToken });
+}
+
+export function logoutUser(refreshToken) {
+  return axios.post(`${API_URL}/security/logout`, { refresh_token: refreshToken });
+}
+
+// Sesión
+// Se renueva un minuto antes de que venza el token de acceso
+const MARGEN_RENOVACION_MS = 60 * 1000;
+const RUTAS_SIN_RENOVACION = ["/security/login", "/security/refresh", "/security/logout"];
+let renovacionEnCurso = null;
+let temporizadorRenovacion = null;
+
+// Guarda los tokens de /security/login o /security/refresh (el refresh token rota en cada renovación)
+export function guardarSesion({ access_token, refresh_token, expires_in }) {
+  localStorage.setItem("token", access_token);
+  localStorage.setItem("refresh_token", refresh_token);
+  localStorage.setItem("token_expires_at", (Date.now() + expires_in * 1000).toString());
+  programarRenovacion();
+  window.dispatchEvent(new Event("sesion"));
+}
+
+export function limpiarSesion() {
+  clearTimeout(temporizadorRenovacion);
+  localStorage.removeItem("token");
+  localStorage.removeItem("refresh_token");
+  localStorage.removeItem("token_expires_at");
+  localStorage.removeItem("alias");
+  window.dispatchEvent(new Event("sesion"));
+}
+
+// Una sola renovación a la vez: los 401 simultáneos esperan la misma. Solo si falla se cierra la sesión
+export function renovarSesion() {
+  const refreshToken = localStorage.getItem("refresh_token");
+  if (!refreshToken) {
+    return Promise.reject(new Error("Sin sesión"));
+  }
+  if (!renovacionEnCurso) {
+    renovacionEnCurso = refreshSession(refreshToken)
+      .then((res) => {
+        guardarSesion(res.data);
+        return res.data.access_token;
+      })
+      .catch((err) => {
+        limpiarSesion();
+        throw err;
+      })
+      .finally(() => {
+        renovacionEnCurso = null;
+      });
+  }
+  return renovacionEnCurso;
+}
+
+// Temporizador hasta poco antes de token_expires_at; al cargar la app con el token vencido renueva de inmediato
+export function programarRenovacion() {
+  clearTimeout(temporizadorRenovacion);
+  const expiresAt = Number(localStorage.getItem("token_expires_at"));
+  if (!localStorage.getItem("refresh_token") || !expiresAt) {
+    return;
+  }
+  const espera = Math.max(expiresAt - Date.now() - MARGEN_RENOVACION_MS, 0);
+  temporizadorRenovacion = setTimeout(() => renovarSesion().catch(() => {}), espera);
+}
+
+// Un 401 (token vencido o revocado) renueva la sesión y reintenta el request una vez con el token nuevo
+axios.interceptors.response.use(undefined, async (error) => {
+  const config = error.config;
+  const ruta = config?.url?.replace(API_URL, "");
+  if (
+    error.response?.status !== 401 ||
+    !config ||
+    config._reintentado ||
+    RUTAS_SIN_RENOVACION.includes(ruta) ||
+    !localStorage.getItem("refresh_token")
+  ) {
+    throw error;
+  }
+  const token = await renovarSesion();
+  config._reintentado = true;
+  config.headers.Authorization = `Bearer ${token}`;
+  return axios(config);
+});
+
 // Users functions
 export function miUser() {
   return axios.get(`${API_URL}/usuarios/me`);